@@ -0,0 +1,572 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from SambuAgent.dataDir import dataPath, openDatabase
+from SambuAgent.responseCache import state_versions
+from SambuAgent.telemetry import span
+from SambuAgent.toolJobs import current_chat, tool_jobs
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVITY_DB_PATH = os.environ.get("ACTIVITY_DB_PATH") or dataPath("sambu_activity.db")
+POLL_INTERVAL_SECONDS = float(os.environ.get("ACTIVITY_POLL_INTERVAL", "10"))
+# The node returns at most 100 transactions per page.
+PAGE_SIZE = int(os.environ.get("ACTIVITY_PAGE_SIZE", "100"))
+# Pages read per wallet per poll, so a long backfill does not starve the others.
+MAX_PAGES_PER_POLL = int(os.environ.get("ACTIVITY_MAX_PAGES", "10"))
+ACTIVITY_TIMEOUT_SECONDS = float(os.environ.get("ACTIVITY_TIMEOUT", "10"))
+# Module address of the KANA contracts; when unset, events are classified by name alone.
+KANA_CONTRACT_ADDRESS = os.environ.get("KANA_CONTRACT_ADDRESS", "").lower()
+# Wallets followed from the start, besides any added with followAccountActivity.
+CONFIGURED_WALLETS = [
+    address.strip().lower()
+    for address in [os.environ.get("WALLET_ADDRESS", "")]
+    + os.environ.get("ACTIVITY_WALLETS", "").split(",")
+    if address.strip()
+]
+
+# Checked in order against the event type name; the first match wins.
+EVENT_KINDS = (
+    ("withdraw", "withdrawal"),
+    ("deposit", "deposit"),
+    ("fill", "trade"),
+    ("trade", "trade"),
+    ("liquidat", "liquidation"),
+    ("funding", "funding"),
+    ("position", "position"),
+    ("order", "order"),
+)
+FRAMEWORK_EVENTS = ("0x1::coin::", "0x1::fungible_asset::")
+TRANSFER_KINDS = {"deposit": "transfer_in", "withdrawal": "transfer_out"}
+
+
+def eventKind(event_type: str) -> str | None:
+    """Activity kind of an event type, or None for events that are not about the account's funds or trades."""
+
+    module_address = event_type.split("::")[0].lower()
+    framework = event_type.startswith(FRAMEWORK_EVENTS)
+    if not framework and KANA_CONTRACT_ADDRESS and module_address != KANA_CONTRACT_ADDRESS:
+        return None
+    name = event_type.split("::")[-1].split("<")[0].lower()
+    for needle, kind in EVENT_KINDS:
+        if needle in name:
+            if framework:
+                # Coins moving in or out of the wallet itself, not the KANA account.
+                return TRANSFER_KINDS.get(kind)
+            return kind
+    return None
+
+
+def sameAddress(left: str, right: str) -> bool:
+    """Whether two account addresses are equal, ignoring case and leading zeros."""
+
+    try:
+        return int(left, 16) == int(right, 16)
+    except (TypeError, ValueError):
+        return False
+
+
+def eventHandles(wallet: str, resources: list) -> dict[int, int]:
+    """Creation number -> event count of every event handle held in the wallet's resources."""
+
+    handles = {}
+    pending = [resource.get("data") for resource in resources or []]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, list):
+            pending += value
+            continue
+        if not isinstance(value, dict):
+            continue
+        guid = (value.get("guid") or {}).get("id") if "counter" in value else None
+        if isinstance(guid, dict) and sameAddress(guid.get("addr"), wallet):
+            handles[int(guid["creation_num"])] = int(value["counter"])
+            continue
+        pending += value.values()
+    return handles
+
+
+def decodeTransaction(wallet: str, transaction: dict, handles=None) -> list[tuple]:
+    """
+    Activity rows for the relevant events of one committed transaction.
+
+    With handles, only the events emitted to those event handles of the
+    wallet are kept: the transaction was sent by someone else, and its other
+    events are about them.
+    """
+
+    payload = transaction.get("payload") or {}
+    function = payload.get("function", "")
+    version = int(transaction["version"])
+    # Node timestamps are in microseconds.
+    timestamp = int(transaction.get("timestamp", 0)) / 1_000_000
+    rows = []
+    for index, event in enumerate(transaction.get("events") or []):
+        if handles is not None:
+            guid = event.get("guid") or {}
+            if not sameAddress(guid.get("account_address"), wallet):
+                continue
+            if int(guid.get("creation_number", -1)) not in handles:
+                continue
+        event_type = event.get("type", "")
+        kind = eventKind(event_type)
+        if kind is None:
+            continue
+        data = event.get("data") or {}
+        amount = data.get("amount", data.get("size", data.get("value")))
+        market_id = data.get("market_id", data.get("marketId"))
+        rows.append(
+            (
+                wallet,
+                version,
+                index,
+                kind,
+                event_type,
+                None if market_id is None else int(market_id),
+                None if amount is None else str(amount),
+                json.dumps(data, default=str),
+                function,
+                transaction.get("hash"),
+                bool(transaction.get("success", True)),
+                timestamp,
+            )
+        )
+    return rows
+
+
+class ActivityStore:
+    """
+    SQLite record of decoded account activity and of how far each wallet and event stream was read.
+
+    The database is opened on first use, so importing the agent does not
+    create it.
+    """
+
+    def __init__(self, path: str = ACTIVITY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _db(self):
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        db = openDatabase(self.path)
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cursors (
+                wallet TEXT PRIMARY KEY,
+                next_sequence_number INTEGER NOT NULL,
+                synced_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS event_cursors (
+                wallet TEXT NOT NULL,
+                creation_number INTEGER NOT NULL,
+                next_sequence_number INTEGER NOT NULL,
+                PRIMARY KEY (wallet, creation_number)
+            );
+            CREATE TABLE IF NOT EXISTS activity (
+                wallet TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                event_index INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                market_id INTEGER,
+                amount TEXT,
+                data TEXT NOT NULL,
+                function TEXT,
+                transaction_hash TEXT,
+                success INTEGER NOT NULL,
+                timestamp REAL NOT NULL,
+                PRIMARY KEY (wallet, version, event_index)
+            );
+            CREATE INDEX IF NOT EXISTS activity_by_kind ON activity (wallet, kind, version);
+            """
+        )
+        db.commit()
+        return db
+
+    def cursor(self, wallet: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT next_sequence_number FROM cursors WHERE wallet = ?", (wallet,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def synced_at(self, wallet: str) -> float | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT synced_at FROM cursors WHERE wallet = ?", (wallet,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stream_cursor(self, wallet: str, creation_number: int) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT next_sequence_number FROM event_cursors WHERE wallet = ? AND creation_number = ?",
+                (wallet, creation_number),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def commit_events(
+        self, wallet: str, creation_number: int, next_sequence_number: int, rows: list[tuple]
+    ) -> list[tuple]:
+        """Store the activity of a page of stream events and move the stream's cursor past it; returns the rows added."""
+
+        added = []
+        with self._lock, self._db:
+            for row in rows:
+                # Events of transactions the wallet sent are already stored from its own cursor.
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO activity VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+                if inserted.rowcount:
+                    added.append(row)
+            self._db.execute(
+                """
+                INSERT INTO event_cursors (wallet, creation_number, next_sequence_number)
+                VALUES (?, ?, ?)
+                ON CONFLICT (wallet, creation_number) DO UPDATE SET
+                    next_sequence_number = excluded.next_sequence_number
+                """,
+                (wallet, creation_number, next_sequence_number),
+            )
+        return added
+
+    def commit_page(self, wallet: str, next_sequence_number: int, rows: list[tuple]) -> int:
+        """Store a page of activity and move the cursor past it in one transaction."""
+
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO activity VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            added = self._db.total_changes - before
+            self._db.execute(
+                """
+                INSERT INTO cursors (wallet, next_sequence_number, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT (wallet) DO UPDATE SET
+                    next_sequence_number = excluded.next_sequence_number,
+                    synced_at = excluded.synced_at
+                """,
+                (wallet, next_sequence_number, time.time()),
+            )
+        return added
+
+    def query(self, wallet: str, kinds: list[str], market_id: int, since: float, limit: int) -> list:
+        sql = "SELECT * FROM activity WHERE wallet = ? AND timestamp >= ?"
+        params: list = [wallet, since]
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        if market_id:
+            sql += " AND market_id = ?"
+            params.append(market_id)
+        sql += " ORDER BY version DESC, event_index DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [self._row(row) for row in rows]
+
+    @staticmethod
+    def _row(row) -> dict:
+        (_, version, _, kind, event_type, market_id, amount, data, function, txn_hash, success, timestamp) = row
+        return {
+            "Kind": kind,
+            "Event Type": event_type,
+            "Market ID": market_id,
+            "Amount": amount,
+            "Data": json.loads(data),
+            "Function": function,
+            "Transaction Hash": txn_hash,
+            "Version": version,
+            "Success": bool(success),
+            "Timestamp": int(timestamp),
+        }
+
+
+class ActivityIndexer:
+    """
+    Follow wallets' transactions on the Aptos node and keep a local activity log.
+
+    Each wallet has a cursor, the next account sequence number to read, so a
+    poll only asks the node for transactions sent since the last one. Those
+    are only the transactions the wallet sent, so the event handles held in
+    its resources (such as the CoinStore deposit and withdraw events) are
+    followed too, each from its own cursor: they also see transactions sent
+    by others, like incoming transfers. The relevant events are decoded into
+    the store together with the cursors, and every new row is passed to the
+    subscribers: chats that asked to be told and in-process callbacks.
+
+    Module events emitted in other accounts' transactions, such as fills
+    against the wallet's orders, keeper-run funding and liquidations, and
+    fungible asset deposits, belong to no handle of the wallet and are not
+    seen; trade history still has to come from KANA.
+    """
+
+    def __init__(self, store: ActivityStore | None = None):
+        self.store = store or ActivityStore()
+        self.wallets: set[str] = set(CONFIGURED_WALLETS)
+        # wallet -> chats to message about new activity
+        self.chats: dict[str, set] = {}
+        # Async callables (wallet, rows) run for every batch of new activity.
+        self.subscribers = []
+        self._loop = None
+        self._node_url = None
+        self.client = None
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._monitor = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        node_url = f"{os.environ.get('APTOS_BASE_URL')}"
+        if self._loop is not loop or self._node_url != node_url:
+            # The client and locks belong to the loop that created them.
+            self._loop = loop
+            self._node_url = node_url
+            self.client = httpx.AsyncClient(timeout=ACTIVITY_TIMEOUT_SECONDS)
+            self._locks = {}
+
+    def follow(self, wallet: str, chat_id=None) -> None:
+        self.wallets.add(wallet)
+        if chat_id is not None:
+            self.chats.setdefault(wallet, set()).add(chat_id)
+
+    def unfollow(self, wallet: str, chat_id=None) -> bool:
+        chats = self.chats.get(wallet, set())
+        chats.discard(chat_id)
+        if chats:
+            # Another chat still wants this wallet's activity.
+            return True
+        self.chats.pop(wallet, None)
+        if wallet not in self.wallets:
+            return False
+        self.wallets.discard(wallet)
+        return True
+
+    async def page(self, wallet: str, start: int) -> list:
+        """The wallet's sent transactions from an account sequence number on."""
+
+        transactions = await self.get(
+            f"/accounts/{wallet}/transactions", start=start, limit=PAGE_SIZE
+        )
+        return transactions or []
+
+    async def get(self, path: str, **params):
+        with span("http_fetch"):
+            response = await self.client.get(f"{self._node_url}{path}", params=params)
+        if response.status_code == 404:
+            # The account or event stream does not exist on chain yet.
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def sync_streams(self, wallet: str) -> list:
+        """Read new events from the wallet's event handles; returns the new activity rows."""
+
+        resources = await self.get(f"/accounts/{wallet}/resources", limit=9999)
+        handles = eventHandles(wallet, resources)
+        transactions = {}
+        new_rows = []
+        for creation_number, counter in sorted(handles.items()):
+            for _ in range(MAX_PAGES_PER_POLL):
+                start = self.store.stream_cursor(wallet, creation_number)
+                if start >= counter:
+                    # The handle's counter says nothing new was emitted.
+                    break
+                events = await self.get(
+                    f"/accounts/{wallet}/events/{creation_number}",
+                    start=start,
+                    limit=PAGE_SIZE,
+                ) or []
+                versions = [
+                    int(event["version"])
+                    for event in events
+                    if int(event["version"]) not in transactions
+                ]
+                fetched = await asyncio.gather(
+                    *(self.get(f"/transactions/by_version/{version}") for version in versions)
+                )
+                transactions.update(zip(versions, fetched))
+                rows = []
+                next_sequence_number = start
+                for event in events:
+                    next_sequence_number = max(
+                        next_sequence_number, int(event["sequence_number"]) + 1
+                    )
+                for version in dict.fromkeys(int(event["version"]) for event in events):
+                    if transactions.get(version):
+                        rows += decodeTransaction(
+                            wallet, transactions[version], {creation_number}
+                        )
+                new_rows += self.store.commit_events(
+                    wallet, creation_number, next_sequence_number, rows
+                )
+                if len(events) < PAGE_SIZE:
+                    break
+        return new_rows
+
+    async def sync(self, wallet: str) -> list:
+        """Read the wallet's new transactions and events from their cursors; returns the new activity rows."""
+
+        self._bind_loop()
+        async with self._locks.setdefault(wallet, asyncio.Lock()):
+            new_rows = []
+            for _ in range(MAX_PAGES_PER_POLL):
+                start = self.store.cursor(wallet)
+                transactions = await self.page(wallet, start)
+                rows = []
+                next_sequence_number = start
+                for transaction in transactions:
+                    next_sequence_number = max(
+                        next_sequence_number, int(transaction["sequence_number"]) + 1
+                    )
+                    rows += decodeTransaction(wallet, transaction)
+                added = self.store.commit_page(wallet, next_sequence_number, rows)
+                if added:
+                    new_rows += rows
+                if len(transactions) < PAGE_SIZE:
+                    break
+            new_rows += await self.sync_streams(wallet)
+        if new_rows:
+            await self.publish(wallet, new_rows)
+        return new_rows
+
+    async def publish(self, wallet: str, rows: list) -> None:
+        state_versions.bump("account")
+        for subscriber in self.subscribers:
+            try:
+                await subscriber(wallet, rows)
+            except Exception as e:
+                logger.warning("Activity subscriber failed for %s: %s", wallet, e)
+
+        chats = self.chats.get(wallet)
+        if tool_jobs.notifier is None or not chats:
+            return
+        lines = [
+            f"- {row[3]}"
+            + (f" in market {row[5]}" if row[5] is not None else "")
+            + (f", amount {row[6]}" if row[6] is not None else "")
+            + ("" if row[10] else " (failed)")
+            for row in rows[-10:]
+        ]
+        more = f"\n...and {len(rows) - 10} earlier" if len(rows) > 10 else ""
+        text = f"New activity on {wallet[:10]}...:\n" + "\n".join(lines) + more
+        for chat_id in chats:
+            try:
+                await tool_jobs.notifier(chat_id, text)
+            except Exception as e:
+                logger.warning("Could not notify chat %s about %s: %s", chat_id, wallet, e)
+
+    async def poll(self) -> None:
+        wallets = sorted(self.wallets)
+        results = await asyncio.gather(
+            *(self.sync(wallet) for wallet in wallets), return_exceptions=True
+        )
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, Exception):
+                logger.warning("Activity poll failed for %s: %s", wallet, result)
+
+    async def run(self) -> None:
+        while self.wallets:
+            await self.poll()
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    def ensure_monitor(self) -> None:
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self.run())
+
+
+activity_indexer = ActivityIndexer()
+
+
+async def followAccountActivity(wallet_address: str, notify: bool) -> dict:
+    """
+    Start following a wallet's deposits, withdrawals, incoming and outgoing transfers and other KANA activity it sends.
+
+    Args:
+        wallet_address (str): The wallet address.
+        notify (bool): If True, message this chat whenever new activity is found.
+
+    Returns:
+        dict: A dictionary containing how many activity records were indexed so far.
+    """
+
+    try:
+        wallet = wallet_address.lower()
+        activity_indexer.follow(wallet, current_chat.get() if notify else None)
+        new_rows = await activity_indexer.sync(wallet)
+        activity_indexer.ensure_monitor()
+        return {
+            "Following": wallet,
+            "New Activity Records": len(new_rows),
+            "Next Sequence Number": activity_indexer.store.cursor(wallet),
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def unfollowAccountActivity(wallet_address: str) -> dict:
+    """
+    Stop following a wallet's activity and stop messaging this chat about it.
+
+    Args:
+        wallet_address (str): The wallet address.
+
+    Returns:
+        dict: A dictionary confirming the wallet is no longer followed.
+    """
+
+    if not activity_indexer.unfollow(wallet_address.lower(), current_chat.get()):
+        return {"Error": f"{wallet_address} is not being followed."}
+    return {"Unfollowed": wallet_address}
+
+
+async def getAccountActivity(
+    wallet_address: str, kinds: list[str], market_id: int, days: float, limit: int
+) -> dict:
+    """
+    Get a wallet's indexed activity from the local store: KANA deposits, withdrawals and orders the wallet sent, and coins moving in and out of the wallet (transfer_in, transfer_out). Fills, funding and liquidations caused by other accounts' transactions are not indexed; use getTradeHistory for trades.
+
+    Args:
+        wallet_address (str): The wallet address.
+        kinds (list[str]): Kinds to include, e.g. ["deposit", "withdrawal"] or ["trade"]; empty for all.
+        market_id (int): The market ID, or 0 for every market.
+        days (float): How many days back to look; 0 for the whole history.
+        limit (int): The maximum number of records, newest first.
+
+    Returns:
+        dict: A dictionary containing the activity records and when the wallet was last synced.
+    """
+
+    try:
+        wallet = wallet_address.lower()
+        if wallet not in activity_indexer.wallets or activity_indexer.store.synced_at(wallet) is None:
+            # Not followed, or never read: catch up from the cursor before answering.
+            await activity_indexer.sync(wallet)
+        activity_indexer.ensure_monitor()
+        since = time.time() - float(days) * 86400 if days else 0.0
+        return {
+            "Account Activity": activity_indexer.store.query(
+                wallet, list(kinds or []), int(market_id), since, int(limit) or 50
+            ),
+            "Synced At": int(activity_indexer.store.synced_at(wallet) or 0),
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
@@ -13,6 +13,9 @@ from aptos_sdk.transactions import (
 from aptos_sdk.bcs import Serializer
 from aptos_sdk.type_tag import TypeTag, StructTag
 
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
 load_dotenv()
 
 
@@ -23,7 +26,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url, params, headers):
         try:
-            response = requests.get(api_url, params=params, headers=headers)
+            with span("http_fetch"):
+                response = requests.get(api_url, params=params, headers=headers)
             response.raise_for_status()
             return response.json().get("data")
         except requests.RequestException as e:
@@ -40,6 +44,7 @@ class AptosTransactionHandler:
             for arg, serializer in zip(arguments, types)
         ]
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             module, function_id = (
@@ -67,11 +72,15 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction = await self.rest_client.create_bcs_signed_transaction(
-                self.account, transaction_payload
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(signed_transaction)
-            await self.rest_client.wait_for_transaction(txn_hash)
+            with span("sign"):
+                signed_transaction = await self.rest_client.create_bcs_signed_transaction(
+                    self.account, transaction_payload
+                )
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(signed_transaction)
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import re
+
+import httpx
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, toNumber
+from SambuAgent.SambuTools.sambuAPI import ASSET_TYPE, getNetProfileBalance
+from SambuAgent.telemetry import span
+
+load_dotenv()
+
+
+BALANCE_TIMEOUT_SECONDS = float(os.environ.get("BALANCE_TIMEOUT", "10"))
+# Node reads in flight at once, across every wallet and asset of a pass.
+BALANCE_CONCURRENCY = int(os.environ.get("BALANCE_CONCURRENCY", "16"))
+# Sheets are kept for this many block heights; older ones are dropped.
+BALANCE_CACHE_BLOCKS = int(os.environ.get("BALANCE_CACHE_BLOCKS", "4"))
+
+COIN_STORE = re.compile(r"^0x0*1::coin::CoinStore<(.+)>$")
+# Decimals of assets that never need a lookup.
+KNOWN_DECIMALS = {ASSET_TYPE: 8, "0xa": 8}
+
+
+class BalanceReader:
+    """
+    Read many assets for many wallets in one pass against the Aptos node.
+
+    A pass reads the ledger info once and pins every read to that ledger
+    version, so the sheet is consistent. Each wallet's resources are fetched
+    in one call, which covers every coin it holds; only assets missing from
+    it (fungible assets, migrated coins) are read with the balance endpoint.
+    Results are cached per block height, so repeated requests within a block
+    cost one ledger info call.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._node_url = None
+        self.client = None
+        self.decimals: dict[str, int | None] = dict(KNOWN_DECIMALS)
+        # block height -> (wallet, asset) -> raw balance
+        self.balances: dict[int, dict[tuple[str, str], int]] = {}
+        self.trading: dict[int, dict[str, object]] = {}
+        self._semaphore = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        node_url = f"{os.environ.get('APTOS_BASE_URL')}"
+        if self._loop is not loop or self._node_url != node_url:
+            # The client and semaphore belong to the loop that created them.
+            self._loop = loop
+            self._node_url = node_url
+            self.client = httpx.AsyncClient(timeout=BALANCE_TIMEOUT_SECONDS)
+            self._semaphore = asyncio.Semaphore(BALANCE_CONCURRENCY)
+            self.balances = {}
+            self.trading = {}
+
+    async def get(self, path: str, **params):
+        async with self._semaphore:
+            with span("http_fetch"):
+                response = await self.client.get(f"{self._node_url}{path}", params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def ledger(self) -> tuple[int, int]:
+        info = await self.get("")
+        return int(info["block_height"]), int(info["ledger_version"])
+
+    async def coin_stores(self, wallet: str, version: int) -> dict[str, int]:
+        """Every CoinStore balance of a wallet, from one resources call."""
+
+        resources = await self.get(
+            f"/accounts/{wallet}/resources", ledger_version=version, limit=9999
+        )
+        balances = {}
+        for resource in resources or []:
+            match = COIN_STORE.match(resource.get("type", ""))
+            if match:
+                balances[match.group(1)] = int(resource["data"]["coin"]["value"])
+        return balances
+
+    async def balance(self, wallet: str, asset: str, version: int) -> int:
+        """Coin or fungible asset balance from the node's balance endpoint."""
+
+        value = await self.get(
+            f"/accounts/{wallet}/balance/{asset}", ledger_version=version
+        )
+        return int(value or 0)
+
+    async def wallet_balances(self, wallet: str, assets: list[str], version: int) -> dict:
+        try:
+            stores = await self.coin_stores(wallet, version)
+        except Exception:
+            stores = {}
+        missing = [asset for asset in assets if asset not in stores]
+        values = await asyncio.gather(
+            *(self.balance(wallet, asset, version) for asset in missing)
+        )
+        return {
+            **{asset: stores[asset] for asset in assets if asset in stores},
+            **dict(zip(missing, values)),
+        }
+
+    async def asset_decimals(self, asset: str) -> int | None:
+        if asset in self.decimals:
+            return self.decimals[asset]
+        decimals = None
+        try:
+            if "::" in asset:
+                info = await self.get(
+                    f"/accounts/{asset.split('::')[0]}/resource/0x1::coin::CoinInfo<{asset}>"
+                )
+            else:
+                info = await self.get(f"/accounts/{asset}/resource/0x1::fungible_asset::Metadata")
+            if info is not None:
+                decimals = int(info["data"]["decimals"])
+        except Exception:
+            # Unknown decimals only cost the normalized figure; try again next pass.
+            return None
+        self.decimals[asset] = decimals
+        return decimals
+
+    async def trading_balance(self, wallet: str):
+        response = await asyncio.to_thread(getNetProfileBalance, wallet)
+        if "Error" in response:
+            raise RuntimeError(response["Error"])
+        return apiData(response, "Net Profile Balance")
+
+    async def read(self, wallets: list[str], assets: list[str], trading_account: bool) -> dict:
+        self._bind_loop()
+        block_height, version = await self.ledger()
+        cached = self.balances.setdefault(block_height, {})
+        cached_trading = self.trading.setdefault(block_height, {})
+        for height in sorted(self.balances)[:-BALANCE_CACHE_BLOCKS]:
+            self.balances.pop(height, None)
+            self.trading.pop(height, None)
+
+        stale = [
+            wallet
+            for wallet in wallets
+            if any((wallet, asset) not in cached for asset in assets)
+        ]
+        wanted_trading = [
+            wallet for wallet in wallets if trading_account and wallet not in cached_trading
+        ]
+        results = await asyncio.gather(
+            *(self.wallet_balances(wallet, assets, version) for wallet in stale),
+            *(self.trading_balance(wallet) for wallet in wanted_trading),
+            *(self.asset_decimals(asset) for asset in assets),
+            return_exceptions=True,
+        )
+        errors = []
+        for wallet, result in zip(stale, results):
+            if isinstance(result, Exception):
+                errors.append(f"{wallet}: {result}")
+                continue
+            for asset, value in result.items():
+                cached[(wallet, asset)] = value
+        for wallet, result in zip(wanted_trading, results[len(stale) :]):
+            if isinstance(result, Exception):
+                errors.append(f"{wallet} trading account: {result}")
+                continue
+            cached_trading[wallet] = result
+
+        sheet = {}
+        totals: dict[str, float] = {}
+        for wallet in wallets:
+            entry = {}
+            for asset in assets:
+                raw = cached.get((wallet, asset))
+                if raw is None:
+                    continue
+                decimals = self.decimals.get(asset)
+                amount = raw / 10**decimals if decimals is not None else None
+                entry[asset] = {"Raw": raw, "Decimals": decimals, "Balance": amount}
+                if amount is not None:
+                    totals[asset] = totals.get(asset, 0.0) + amount
+            sheet[wallet] = {"Assets": entry}
+            if wallet in cached_trading:
+                trading = cached_trading[wallet]
+                sheet[wallet]["Trading Account Balance"] = (
+                    toNumber(trading, "balance", "netBalance")
+                    if isinstance(trading, dict)
+                    else toNumber({"balance": trading}, "balance")
+                )
+
+        return {
+            "Block Height": block_height,
+            "Ledger Version": version,
+            "Wallets": sheet,
+            "Totals": {asset: round(total, 8) for asset, total in totals.items()},
+            "Errors": errors,
+        }
+
+
+balance_reader = BalanceReader()
+
+
+async def getBalanceSheet(
+    wallet_addresses: list[str], asset_types: list[str], include_trading_account: bool
+) -> dict:
+    """
+    Get the on-chain balances of several assets for several wallets in one call.
+
+    Args:
+        wallet_addresses (list[str]): The wallet addresses.
+        asset_types (list[str]): Coin types or fungible asset addresses, e.g. "0x1::aptos_coin::AptosCoin". Empty for APT only.
+        include_trading_account (bool): If True, also include each wallet's KANA trading account balance.
+
+    Returns:
+        dict: A dictionary containing each wallet's raw and decimal-adjusted balances, totals per asset, and the block height they were read at.
+    """
+
+    try:
+        wallets = list(dict.fromkeys(address.lower() for address in wallet_addresses))
+        assets = list(dict.fromkeys(asset_types or [ASSET_TYPE]))
+        return {
+            "Balance Sheet": await balance_reader.read(
+                wallets, assets, include_trading_account
+            )
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
@@ -16,8 +16,8 @@ load_dotenv("../.env")
 
 
 # Network configuration
-NODE_URL = "https://fullnode.devnet.aptoslabs.com/v1"
-FAUCET_URL = "https://faucet.devnet.aptoslabs.com"
+NODE_URL = os.environ.get("APTOS_NODE_URL", "https://fullnode.devnet.aptoslabs.com/v1")
+FAUCET_URL = os.environ.get("APTOS_FAUCET_URL", "https://faucet.devnet.aptoslabs.com")
 
 rest_client = RestClient(NODE_URL)
 faucet_client = FaucetClient(FAUCET_URL, rest_client)
@@ -13,6 +13,14 @@ import requests
 from dotenv import load_dotenv
 from typing import Any, List
 
+from SambuAgent.SambuTools.orderBatcher import (
+    CANCEL_FIELDS, PLACE_FIELDS,
+    batchResult,
+    order_batcher,
+)
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
 load_dotenv()
 
 
@@ -24,7 +32,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url: str, json_data: dict, headers: dict) -> dict:
         try:
-            response = requests.post(api_url, json=json_data, headers=headers)
+            with span("http_fetch"):
+                response = requests.post(api_url, json=json_data, headers=headers)
             response.raise_for_status()
             payload_data = response.json().get("data")
             if payload_data is None:
@@ -67,6 +76,7 @@ class AptosTransactionHandler:
             print(f"Error creating transaction arguments: {e}")
             raise
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             function_information = payload["function"].split("::")
@@ -98,15 +108,19 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction_request = (
-                await self.rest_client.create_bcs_signed_transaction(
-                    sender=self.account, payload=transaction_payload
+            with span("sign"):
+                signed_transaction_request = (
+                    await self.rest_client.create_bcs_signed_transaction(
+                        sender=self.account, payload=transaction_payload
+                    )
                 )
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(
-                signed_transaction=signed_transaction_request
-            )
-            await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(
+                    signed_transaction=signed_transaction_request
+                )
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -144,7 +158,7 @@ async def cancelAndPlaceMultipleOrders(
         dict: Transaction submission result.
     """
 
-    NODE_URL = f"{os.environ.get('APTOS_BASE_URL')}/v1"
+    NODE_URL = f"{os.environ.get('APTOS_BASE_URL')}"
     rest_client = RestClient(NODE_URL)
 
     private_key_hex = private_key
@@ -169,14 +183,7 @@ async def cancelAndPlaceMultipleOrders(
 
     HEADERS = {"x-api-key": os.environ.get("KANA_API_KEY")}
     handler = AptosTransactionHandler(rest_client, account)
-
-    payload_data = handler.fetch_payload(API_URL, BODY, HEADERS)
-
-    if not payload_data:
-        return {"Error": "Failed to fetch payload data."}
-
-    # Ensure argumentTypes is included in payload_data
-    payload_data["argumentTypes"] = [
+    ARGUMENT_TYPES = [
         Serializer.u64,  # marketId
         Serializer.sequence_serializer(Serializer.u128),
         Serializer.sequence_serializer(Serializer.bool),
@@ -192,9 +199,10 @@ async def cancelAndPlaceMultipleOrders(
     ]
 
     try:
-        transaction_payload = handler.create_transaction_payload(payload_data)
-
-        txn_hash = await handler.submit_transaction(transaction_payload)
-        return {"Transaction submitted successfully. Transaction hash": txn_hash}
+        # Large batches are split into gas- and size-bounded transactions.
+        summary = await order_batcher.submit(
+            handler, API_URL, BODY, HEADERS, ARGUMENT_TYPES, [CANCEL_FIELDS, PLACE_FIELDS]
+        )
+        return batchResult(summary)
     except Exception as e:
         return {"Error": f"An error occurred:, {e}"}
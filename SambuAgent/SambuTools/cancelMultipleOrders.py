@@ -13,6 +13,15 @@ import requests
 from dotenv import load_dotenv
 from typing import Any, List
 
+from SambuAgent.SambuTools.orderBatcher import (
+    CANCEL_FIELDS,
+    batchResult,
+    order_batcher,
+)
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
 load_dotenv()
 
 
@@ -24,7 +33,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url, json_data, headers):
         try:
-            response = requests.post(api_url, json=json_data, headers=headers)
+            with span("http_fetch"):
+                response = requests.post(api_url, json=json_data, headers=headers)
             response.raise_for_status()
             payload_data = response.json().get("data")
             if payload_data is None:
@@ -56,6 +66,7 @@ class AptosTransactionHandler:
             print(f"Error creating transaction arguments: {e}")
             raise
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             function_information = payload["function"].split("::")
@@ -81,15 +92,19 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction_request = (
-                await self.rest_client.create_bcs_signed_transaction(
-                    sender=self.account, payload=transaction_payload
+            with span("sign"):
+                signed_transaction_request = (
+                    await self.rest_client.create_bcs_signed_transaction(
+                        sender=self.account, payload=transaction_payload
+                    )
                 )
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(
-                signed_transaction=signed_transaction_request
-            )
-            await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(
+                    signed_transaction=signed_transaction_request
+                )
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -115,7 +130,7 @@ async def cancelMultipleOrders(
         dict: Transaction submission result.
     """
 
-    NODE_URL = f"{os.getenv('APTOS_BASE_URL')}/v1"
+    NODE_URL = f"{os.getenv('APTOS_BASE_URL')}"
     rest_client = RestClient(NODE_URL)
     private_key_hex = private_key
     if private_key_hex.startswith("0x"):
@@ -131,20 +146,20 @@ async def cancelMultipleOrders(
     }
     HEADERS = {"x-api-key": os.environ.get("KANA_API_KEY")}
     handler = AptosTransactionHandler(rest_client, account)
-    payload_data = handler.fetch_payload(API_URL, BODY, HEADERS)
-    if not payload_data:
-        return {"Error": "Failed to fetch payload data."}
+    ARGUMENT_TYPES = [
+        Serializer.u64,
+        Serializer.sequence_serializer(Serializer.u128),
+        Serializer.sequence_serializer(Serializer.bool),
+    ]
 
     try:
-        payload_data["argumentTypes"] = [
-            Serializer.u64,
-            Serializer.sequence_serializer(Serializer.u128),
-            Serializer.sequence_serializer(Serializer.bool),
-        ]
-        transaction_payload = handler.create_transaction_payload(payload_data)
-
-        txn_hash = await handler.submit_transaction(transaction_payload)
-        return {f"Transaction submitted successfully. Transaction hash": txn_hash}
-
+        # Large batches are split into gas- and size-bounded transactions.
+        summary = await order_batcher.submit(
+            handler, API_URL, BODY, HEADERS, ARGUMENT_TYPES, [CANCEL_FIELDS]
+        )
+        if summary["Orders Committed"]:
+            # Cancelled orders no longer hold a risk reservation.
+            risk_engine.refresh_later(str(account.address()), market_id)
+        return batchResult(summary)
     except Exception as e:
         return {"Error": f"An error occurred:, {e}"}
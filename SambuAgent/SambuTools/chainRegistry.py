@@ -0,0 +1,261 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+
+SOURCE_PATH = Path(__file__).parent.joinpath("chains_mini.json")
+REGISTRY_PATH = Path(
+    os.environ.get("CHAIN_REGISTRY_PATH", str(SOURCE_PATH.with_suffix(".bin")))
+)
+
+MAGIC = b"SCHN"
+VERSION = 1
+# magic, version, record count, string count, string blob size, list entry count
+HEADER = struct.Struct("<4sHIIII")
+# chainId, networkId, name, shortName, infoURL, currency name, currency symbol,
+# currency decimals, rpc list start, rpc count, faucets list start, faucets count
+RECORD = struct.Struct("<qqIIIIIIIHIH")
+U32 = struct.Struct("<I")
+
+
+def compileRegistry(source: Path = SOURCE_PATH, target: Path = REGISTRY_PATH) -> Path:
+    """
+    Compile chains_mini.json into the binary registry read by ChainRegistry.
+
+    Layout after the header:
+      - fixed-width records, in source order;
+      - record numbers sorted by chainId (u32 each), for binary search;
+      - string end offsets (u32 each) followed by the interned UTF-8 blob;
+      - list entries (u32 string ids) referenced by the records' rpc and
+        faucets fields.
+    """
+
+    with open(source, "r") as file:
+        chains = json.load(file)
+
+    strings: dict[str, int] = {}
+    lists = []
+
+    def intern(value) -> int:
+        value = "" if value is None else str(value)
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    def internList(values) -> tuple[int, int]:
+        start = len(lists)
+        lists.extend(intern(value) for value in values or [])
+        return start, len(lists) - start
+
+    records = bytearray()
+    for chain in chains:
+        currency = chain.get("nativeCurrency") or {}
+        rpc_start, rpc_count = internList(chain.get("rpc"))
+        faucet_start, faucet_count = internList(chain.get("faucets"))
+        records += RECORD.pack(
+            int(chain["chainId"]),
+            int(chain.get("networkId") or 0),
+            intern(chain.get("name")),
+            intern(chain.get("shortName")),
+            intern(chain.get("infoURL")),
+            intern(currency.get("name")),
+            intern(currency.get("symbol")),
+            int(currency.get("decimals") or 0),
+            rpc_start,
+            rpc_count,
+            faucet_start,
+            faucet_count,
+        )
+
+    order = sorted(range(len(chains)), key=lambda index: int(chains[index]["chainId"]))
+
+    blob = bytearray()
+    ends = []
+    for value in strings:
+        blob += value.encode()
+        ends.append(len(blob))
+
+    target = Path(target)
+    handle, temporary = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(chains), len(strings), len(blob), len(lists)))
+        file.write(records)
+        file.write(struct.pack(f"<{len(order)}I", *order))
+        file.write(struct.pack(f"<{len(ends)}I", *ends))
+        file.write(blob)
+        file.write(struct.pack(f"<{len(lists)}I", *lists))
+    os.replace(temporary, target)
+    return target
+
+
+class ChainRegistry:
+    """
+    Read-only view of the compiled chain registry.
+
+    The file is memory-mapped and nothing is decoded up front: a lookup
+    unpacks only the records (and strings) it returns, so a fresh process
+    pays no JSON parse and keeps no per-chain objects alive.
+    """
+
+    def __init__(self, path: Path = REGISTRY_PATH):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, string_count, blob_size, list_count = (
+            HEADER.unpack_from(self._mmap, 0)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} chain registry.")
+        self._records = HEADER.size
+        self._order = self._records + self.count * RECORD.size
+        self._ends = self._order + self.count * U32.size
+        self._blob = self._ends + string_count * U32.size
+        self._lists = self._blob + blob_size
+        self.size = self._lists + list_count * U32.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, string_id: int) -> str:
+        start = 0
+        if string_id:
+            start = U32.unpack_from(self._mmap, self._ends + (string_id - 1) * U32.size)[0]
+        end = U32.unpack_from(self._mmap, self._ends + string_id * U32.size)[0]
+        return self._mmap[self._blob + start : self._blob + end].decode()
+
+    def strings(self, start: int, count: int) -> list[str]:
+        ids = struct.unpack_from(f"<{count}I", self._mmap, self._lists + start * U32.size)
+        return [self.string(string_id) for string_id in ids]
+
+    def chain_id(self, index: int) -> int:
+        return struct.unpack_from("<q", self._mmap, self._records + index * RECORD.size)[0]
+
+    def record(self, index: int) -> dict:
+        (
+            chain_id,
+            network_id,
+            name,
+            short_name,
+            info_url,
+            currency_name,
+            currency_symbol,
+            decimals,
+            rpc_start,
+            rpc_count,
+            faucet_start,
+            faucet_count,
+        ) = RECORD.unpack_from(self._mmap, self._records + index * RECORD.size)
+        return {
+            "name": self.string(name),
+            "chainId": chain_id,
+            "shortName": self.string(short_name),
+            "networkId": network_id,
+            "nativeCurrency": {
+                "name": self.string(currency_name),
+                "symbol": self.string(currency_symbol),
+                "decimals": decimals,
+            },
+            "rpc": self.strings(rpc_start, rpc_count),
+            "faucets": self.strings(faucet_start, faucet_count),
+            "infoURL": self.string(info_url),
+        }
+
+    def chain_ids(self) -> list[int]:
+        return [self.chain_id(index) for index in range(self.count)]
+
+    def find(self, chain_id: int) -> dict | None:
+        """Binary search the chainId-sorted index."""
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            index = U32.unpack_from(self._mmap, self._order + middle * U32.size)[0]
+            value = self.chain_id(index)
+            if value == chain_id:
+                return self.record(index)
+            if value < chain_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def search(self, text: str, limit: int = 20) -> list[dict]:
+        """Chains whose name or short name contains `text`, case-insensitively."""
+
+        text = text.lower()
+        found = []
+        for index in range(self.count):
+            offset = self._records + index * RECORD.size
+            name, short_name = struct.unpack_from("<II", self._mmap, offset + 16)
+            if text in self.string(name).lower() or text in self.string(short_name).lower():
+                found.append(self.record(index))
+                if len(found) >= limit:
+                    break
+        return found
+
+    def records(self) -> list[dict]:
+        return [self.record(index) for index in range(self.count)]
+
+
+_registry = None
+
+
+def chainRegistry() -> ChainRegistry:
+    """Open the registry, compiling it first if it is missing or older than the JSON."""
+
+    global _registry
+    if _registry is None:
+        path = REGISTRY_PATH
+        if not path.exists() or path.stat().st_mtime < SOURCE_PATH.stat().st_mtime:
+            try:
+                compileRegistry(SOURCE_PATH, path)
+            except OSError:
+                # Read-only install: compile into the temp directory instead.
+                path = compileRegistry(
+                    SOURCE_PATH, Path(tempfile.gettempdir()).joinpath("chains_mini.bin")
+                )
+        _registry = ChainRegistry(path)
+    return _registry
+
+
+def getChainById(chain_id: int) -> dict:
+    """
+    Look up one EVM chain in the chain registry by its chain ID.
+
+    Args:
+        chain_id (int): The chain ID, e.g. 1 for Ethereum Mainnet.
+
+    Returns:
+        dict: A dictionary containing the chain's name, currency, RPC endpoints and faucets.
+    """
+
+    try:
+        chain = chainRegistry().find(int(chain_id))
+        if chain is None:
+            return {"Error": f"No chain with ID {chain_id}."}
+        return {"Chain": chain}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def searchChains(name: str) -> dict:
+    """
+    Search the chain registry by chain name or short name.
+
+    Args:
+        name (str): Part of the chain's name or short name, e.g. "polygon".
+
+    Returns:
+        dict: A dictionary containing up to 20 matching chains.
+    """
+
+    try:
+        return {"Chains": chainRegistry().search(name)}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+if __name__ == "__main__":
+    print(f"Compiled {compileRegistry()}")
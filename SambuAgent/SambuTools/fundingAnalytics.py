@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.sambuAPI import getFundingHistory
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, toNumber
+from SambuAgent.SambuTools.timeSeries import toSeconds
+
+load_dotenv()
+
+
+# A wallet's history is only downloaded again once the local copy is this old.
+SYNC_TTL_SECONDS = float(os.environ.get("FUNDING_SYNC_TTL", "300"))
+SECONDS_PER_YEAR = 365 * 86400
+
+
+class FundingLedger:
+    """
+    Funding payments of one wallet in one market, oldest first.
+
+    Besides the raw columns it keeps running totals (net, paid and received),
+    so the sum over any time range is two bisects and a subtraction instead of
+    a pass over the payments.
+    """
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.payments = array("d")
+        # Running totals with a leading zero: total[i] covers payments[:i].
+        self.net = array("d", [0.0])
+        self.paid = array("d", [0.0])
+        self.received = array("d", [0.0])
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def last_timestamp(self) -> float:
+        return self.timestamps[-1] if self.timestamps else 0.0
+
+    def extend(self, payments: list[tuple[float, float]]) -> int:
+        """Append payments newer than the last one kept; returns how many were new."""
+
+        last = self.last_timestamp
+        new = sorted(payment for payment in payments if payment[0] > last)
+        for timestamp, amount in new:
+            self.timestamps.append(timestamp)
+            self.payments.append(amount)
+            self.net.append(self.net[-1] + amount)
+            self.paid.append(self.paid[-1] + min(amount, 0.0))
+            self.received.append(self.received[-1] + max(amount, 0.0))
+        return len(new)
+
+    def summary(self, start: float, end: float) -> dict:
+        low = bisect_left(self.timestamps, start)
+        high = bisect_right(self.timestamps, end)
+        count = high - low
+        net = self.net[high] - self.net[low]
+        paid = self.paid[high] - self.paid[low]
+        received = self.received[high] - self.received[low]
+        # Annualize over the time actually covered, not a window reaching back before the history.
+        span = end - max(start, self.timestamps[low]) if count else 0.0
+        return {
+            "Payments": count,
+            "Net Funding": round(net, 8),
+            "Paid": round(-paid, 8),
+            "Received": round(received, 8),
+            # Positive when funding cost money over the period.
+            "Funding Cost": round(-net, 8),
+            "Annualized Cost": round(-net * SECONDS_PER_YEAR / span, 8) if span > 0 else None,
+            "Average Payment": round(net / count, 8) if count else None,
+            "First Payment": int(self.timestamps[low]) if count else None,
+            "Last Payment": int(self.timestamps[high - 1]) if count else None,
+        }
+
+
+def parseFundingRows(rows) -> dict[int, list[tuple[float, float]]]:
+    """Group KANA funding rows into (timestamp, amount) payments per market."""
+
+    markets: dict[int, list[tuple[float, float]]] = {}
+    for row in rows if isinstance(rows, list) else []:
+        if not isinstance(row, dict):
+            continue
+        timestamp = toSeconds(toNumber(row, "timestamp", "time", "ts", "created_at"))
+        if not timestamp:
+            continue
+        market_id = int(toNumber(row, "market_id", "marketId"))
+        amount = toNumber(row, "funding_fee", "fundingFee", "funding", "amount")
+        markets.setdefault(market_id, []).append((timestamp, amount))
+    return markets
+
+
+class FundingStore:
+    """Per-wallet funding ledgers, refreshed from KANA at most every SYNC_TTL_SECONDS."""
+
+    def __init__(self, sync_ttl: float = SYNC_TTL_SECONDS):
+        self.sync_ttl = sync_ttl
+        self.ledgers: dict[str, dict[int, FundingLedger]] = {}
+        self.synced_at: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def sync(self, wallet_address: str, force: bool = False) -> int:
+        """Merge new funding payments into the wallet's ledgers; returns how many were new."""
+
+        lock = self._locks.setdefault(wallet_address, asyncio.Lock())
+        async with lock:
+            synced_at = self.synced_at.get(wallet_address, 0.0)
+            if not force and time.monotonic() - synced_at < self.sync_ttl:
+                return 0
+            response = await asyncio.to_thread(getFundingHistory, wallet_address)
+            if "Error" in response:
+                raise RuntimeError(response["Error"])
+            ledgers = self.ledgers.setdefault(wallet_address, {})
+            added = 0
+            for market_id, payments in parseFundingRows(
+                apiData(response, "Funding History")
+            ).items():
+                added += ledgers.setdefault(market_id, FundingLedger()).extend(payments)
+            self.synced_at[wallet_address] = time.monotonic()
+            return added
+
+    def summary(self, wallet_address: str, market_id: int, start: float, end: float) -> dict:
+        ledgers = self.ledgers.get(wallet_address, {})
+        if market_id:
+            ledgers = {market_id: ledgers[market_id]} if market_id in ledgers else {}
+        markets = {
+            str(market): ledger.summary(start, end) for market, ledger in sorted(ledgers.items())
+        }
+        net = sum(market["Net Funding"] for market in markets.values())
+        first = min(
+            (market["First Payment"] for market in markets.values() if market["Payments"]),
+            default=end,
+        )
+        span = end - max(start, first)
+        return {
+            "Period Start": int(start),
+            "Period End": int(end),
+            "Payments": sum(market["Payments"] for market in markets.values()),
+            "Net Funding": round(net, 8),
+            "Funding Cost": round(-net, 8),
+            "Annualized Cost": round(-net * SECONDS_PER_YEAR / span, 8) if span > 0 else None,
+            "Markets": markets,
+        }
+
+
+funding_store = FundingStore()
+
+
+async def getFundingSummary(wallet_address: str, market_id: int, days: float) -> dict:
+    """
+    Summarize the funding a wallet paid and received: net cost, annualized cost and payment count.
+
+    Args:
+        wallet_address (str): The wallet address.
+        market_id (int): The market ID, or 0 for every market.
+        days (float): How many days back to summarize, e.g. 30; 0 for the whole history.
+
+    Returns:
+        dict: A dictionary containing the funding totals for the period, overall and per market.
+    """
+
+    try:
+        await funding_store.sync(wallet_address)
+        end = time.time()
+        if days:
+            start = end - float(days) * 86400
+        else:
+            ledgers = funding_store.ledgers.get(wallet_address, {}).values()
+            start = min((ledger.timestamps[0] for ledger in ledgers if len(ledger)), default=end)
+        return {
+            "Funding Summary": funding_store.summary(wallet_address, int(market_id), start, end)
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
@@ -13,6 +13,10 @@ from aptos_sdk.transactions import (
 from aptos_sdk.bcs import Serializer
 from aptos_sdk.type_tag import TypeTag, StructTag
 
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
 load_dotenv()
 
 
@@ -23,7 +27,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url, params, headers):
         try:
-            response = requests.get(api_url, params=params, headers=headers)
+            with span("http_fetch"):
+                response = requests.get(api_url, params=params, headers=headers)
             response.raise_for_status()
             return response.json().get("data")
         except requests.RequestException as e:
@@ -40,6 +45,7 @@ class AptosTransactionHandler:
             for arg, serializer in zip(arguments, types)
         ]
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             module, function_id = (
@@ -67,11 +73,15 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction = await self.rest_client.create_bcs_signed_transaction(
-                self.account, transaction_payload
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(signed_transaction)
-            await self.rest_client.wait_for_transaction(txn_hash)
+            with span("sign"):
+                signed_transaction = await self.rest_client.create_bcs_signed_transaction(
+                    self.account, transaction_payload
+                )
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(signed_transaction)
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -94,7 +104,7 @@ async def limitOrder(
         private_key (str): The private key of the user.
         market_id (int): The ID of the market.
         trade_side (bool): True for long, False for short.
-        direction (bool): True for buy, False for sell.
+        direction (bool): True to close part of the position on that side, False to open or add to it.
         size (int): The size of the order.
         price (int): The price of the order.
         leverage (int): The leverage of the order.
@@ -111,6 +121,15 @@ async def limitOrder(
         private_key_hex = private_key_hex[2:]
     private_key_bytes = bytes.fromhex(private_key_hex)
     account = Account.load_key(private_key_bytes)
+
+    wallet = str(account.address())
+    await risk_engine.prepare(wallet, market_id)
+    rejection = risk_engine.check_order(
+        wallet, market_id, size, price, leverage, trade_side=trade_side, reduce_only=direction
+    )
+    if rejection:
+        return {"Error": f"Order rejected by risk check: {rejection}"}
+
     rest_client = RestClient(NODE_URL)
 
     API_URL = f"{os.environ.get('KANA_BASE_URL')}/placeLimitOrder"
@@ -154,6 +173,12 @@ async def limitOrder(
         transaction_payload = handler.create_transaction_payload(payload_data)
 
         txn_hash = await handler.submit_transaction(transaction_payload)
+        if not risk_engine.reduces(wallet, market_id, trade_side, direction):
+            # The resting order counts against the limits until it fills or is cancelled.
+            risk_engine.reserve(
+                wallet, market_id, risk_engine.order_notional(market_id, size, price) or 0.0
+            )
+        risk_engine.refresh_later(wallet, market_id)
 
         return {"Transaction submitted successfully. Hash": txn_hash}
 
@@ -0,0 +1,242 @@
+import asyncio
+import os
+
+from aptos_sdk.async_client import RestClient
+from aptos_sdk.transactions import RawTransaction, SignedTransaction
+from dotenv import load_dotenv
+
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
+load_dotenv()
+
+
+# Upper bound on orders per transaction, whatever the gas estimate allows.
+MAX_ORDERS_PER_CHUNK = int(os.environ.get("BATCH_MAX_ORDERS", "25"))
+# Share of max_gas_amount and of the transaction size limit a chunk may use.
+GAS_HEADROOM = float(os.environ.get("BATCH_GAS_HEADROOM", "0.8"))
+MAX_TRANSACTION_BYTES = int(os.environ.get("BATCH_MAX_BYTES", "64000"))
+
+# Per-order request fields of the KANA multi-order endpoints, sliced together.
+CANCEL_FIELDS = ["cancelOrderIds", "orderSides"]
+PLACE_FIELDS = ["orderTypes", "tradeSides", "directions", "sizes", "prices", "leverages"]
+
+
+class OrderBatcher:
+    """
+    Split a multi-order request into chunks that each fit in one transaction.
+
+    The first chunk is simulated unsigned to measure gas and size per order,
+    and halved while the simulation runs out of gas; the rest of the orders
+    are chunked against those numbers. All chunks are signed with
+    consecutive sequence numbers and submitted back to back, and only then are
+    their confirmations awaited together, so a large grid costs roughly one
+    confirmation round trip instead of one per chunk.
+    """
+
+    def __init__(self, max_orders: int = MAX_ORDERS_PER_CHUNK):
+        self.max_orders = max_orders
+        # Last measured gas per order, by KANA endpoint.
+        self.gas_per_order: dict[str, float] = {}
+
+    @staticmethod
+    def chunk_body(body: dict, groups: list[list[str]], start: int, end: int) -> dict:
+        chunk = dict(body)
+        for fields in groups:
+            for field in fields:
+                chunk[field] = body[field][start:end]
+        return chunk
+
+    @staticmethod
+    def order_count(body: dict, groups: list[list[str]]) -> int:
+        return max(len(body[fields[0]]) for fields in groups)
+
+    def chunk_size(
+        self, rest_client: RestClient, gas_per_order: float, bytes_per_order: float
+    ) -> int:
+        size = self.max_orders
+        if gas_per_order:
+            max_gas = rest_client.client_config.max_gas_amount
+            size = min(size, int(max_gas * GAS_HEADROOM / gas_per_order))
+        if bytes_per_order:
+            size = min(size, int(MAX_TRANSACTION_BYTES * GAS_HEADROOM / bytes_per_order))
+        return max(size, 1)
+
+    async def build(self, handler, api_url, body, headers, argument_types, sequence_number):
+        """Unsigned transaction for one chunk; it is signed only once it is known to fit."""
+
+        payload_data = await asyncio.to_thread(handler.fetch_payload, api_url, body, headers)
+        if not payload_data:
+            raise ValueError("Failed to fetch payload data.")
+        payload_data["argumentTypes"] = argument_types
+        transaction_payload = handler.create_transaction_payload(payload_data)
+        return await handler.rest_client.create_bcs_transaction(
+            handler.account, transaction_payload, sequence_number
+        )
+
+    @staticmethod
+    def sign(handler, raw_transaction: RawTransaction) -> SignedTransaction:
+        with span("sign"):
+            return SignedTransaction(
+                raw_transaction, handler.account.sign_transaction(raw_transaction)
+            )
+
+    async def simulate(self, handler, raw_transaction: RawTransaction) -> dict:
+        # Fullnodes reject simulations carrying a valid signature, so this one
+        # goes out with the zero signature simulate_transaction puts on it.
+        with span("simulate"):
+            result = await handler.rest_client.simulate_transaction(
+                raw_transaction, handler.account
+            )
+        return result[0] if isinstance(result, list) else result
+
+    async def measure(
+        self, handler, api_url, body, headers, argument_types, groups, size, sequence_number
+    ):
+        """
+        Simulate the first chunk, halving it while it runs out of gas.
+
+        Returns the chunk's order count, its signed transaction and the gas it used.
+        """
+
+        count = self.order_count(body, groups)
+        first_count = min(size, count)
+        while True:
+            raw_transaction = await self.build(
+                handler, api_url, self.chunk_body(body, groups, 0, first_count), headers,
+                argument_types, sequence_number,
+            )
+            outcome = await self.simulate(handler, raw_transaction)
+            if outcome.get("success", False):
+                return first_count, self.sign(handler, raw_transaction), float(
+                    outcome.get("gas_used", 0)
+                )
+            vm_status = str(outcome.get("vm_status", ""))
+            if "OUT_OF_GAS" not in vm_status.upper() or first_count == 1:
+                raise ValueError(f"Simulation failed: {vm_status}")
+            first_count = max(first_count // 2, 1)
+
+    async def submit(
+        self,
+        handler,
+        api_url: str,
+        body: dict,
+        headers: dict,
+        argument_types: list,
+        groups: list[list[str]],
+    ) -> dict:
+        """
+        Submit `body` in as few chunks as fit, returning per-chunk outcomes.
+
+        Args:
+            handler: The tool's AptosTransactionHandler; its fetch_payload turns
+                a chunk body into an entry function payload.
+            api_url (str): The KANA endpoint building the payload.
+            body (dict): The full request body.
+            headers (dict): KANA request headers.
+            argument_types (list): Serializers of the entry function arguments.
+            groups (list[list[str]]): Groups of body fields sliced together, e.g.
+                CANCEL_FIELDS and PLACE_FIELDS. Chunk i takes the i-th slice of
+                every group.
+        """
+
+        rest_client = handler.rest_client
+        endpoint = api_url.rstrip("/").rsplit("/", 1)[-1]
+        count = self.order_count(body, groups)
+        sequence_number = await rest_client.account_sequence_number(handler.account.address())
+
+        # Size the first chunk from the last estimate, then measure it.
+        size = self.chunk_size(rest_client, self.gas_per_order.get(endpoint, 0), 0)
+        first_count, first, gas_used = await self.measure(
+            handler, api_url, body, headers, argument_types, groups, size, sequence_number
+        )
+        gas_per_order = gas_used / max(first_count, 1)
+        bytes_per_order = len(first.bytes()) / max(first_count, 1)
+        self.gas_per_order[endpoint] = gas_per_order
+
+        size = self.chunk_size(rest_client, gas_per_order, bytes_per_order)
+        if size < first_count:
+            # The measured chunk is too big; rechunk everything, it was never submitted.
+            first_count = 0
+        bounds = [(0, first_count)] if first_count else []
+        bounds += [(start, min(start + size, count)) for start in range(first_count, count, size)]
+
+        rest = await asyncio.gather(
+            *(
+                self.build(
+                    handler, api_url, self.chunk_body(body, groups, start, end), headers,
+                    argument_types, sequence_number + index,
+                )
+                for index, (start, end) in enumerate(bounds)
+                if index or not first_count
+            ),
+            return_exceptions=True,
+        )
+        rest = [
+            raw if isinstance(raw, Exception) else self.sign(handler, raw) for raw in rest
+        ]
+        signed = [first, *rest] if first_count else rest
+
+        chunks = []
+        submitted = []
+        stopped = False
+        for (start, end), transaction in zip(bounds, signed):
+            chunk = {"Orders": [start, end]}
+            chunks.append(chunk)
+            if stopped:
+                # A sequence number gap would leave every later chunk stuck in the mempool.
+                chunk["Status"] = "Not submitted"
+                continue
+            try:
+                if isinstance(transaction, Exception):
+                    raise transaction
+                with span("submit"):
+                    chunk["Transaction hash"] = await rest_client.submit_bcs_transaction(transaction)
+                recordSubmission(chunk["Transaction hash"])
+                submitted.append(chunk)
+            except Exception as e:
+                chunk["Status"] = f"Failed: {e}"
+                stopped = True
+
+        async def confirm(chunk):
+            try:
+                await rest_client.wait_for_transaction(chunk["Transaction hash"])
+                chunk["Status"] = "Committed"
+            except Exception as e:
+                chunk["Status"] = f"Failed: {e}"
+
+        with span("confirm"):
+            await asyncio.gather(*(confirm(chunk) for chunk in submitted))
+
+        committed = sum(
+            chunk["Orders"][1] - chunk["Orders"][0]
+            for chunk in chunks
+            if chunk["Status"] == "Committed"
+        )
+        return {
+            "Orders": count,
+            "Orders Committed": committed,
+            "Transactions": len(chunks),
+            "Gas Per Order": round(gas_per_order, 2),
+            "Chunks": chunks,
+        }
+
+
+order_batcher = OrderBatcher()
+
+
+def batchResult(summary: dict) -> dict:
+    """Keep the single-transaction reply shape when everything fit in one chunk."""
+
+    chunks = summary["Chunks"]
+    if len(chunks) == 1:
+        if chunks[0]["Status"] == "Committed":
+            return {
+                "Transaction submitted successfully. Transaction hash": chunks[0][
+                    "Transaction hash"
+                ]
+            }
+        return {"Error": f"An error occurred:, {chunks[0]['Status']}"}
+    if summary["Orders Committed"] == 0:
+        return {"Error": "No chunk was committed.", "Batch": summary}
+    return {"Batch Submitted": summary}
@@ -0,0 +1,249 @@
+import asyncio
+import os
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.cancelAndPlaceMultipleOrders import (
+    cancelAndPlaceMultipleOrders,
+)
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, toBool, toNumber
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.SambuTools.sambuAPI import getOrdersFromContract
+from SambuAgent.SambuTools.transactionPool import accountKey
+from SambuAgent.telemetry import isErrorResult
+
+load_dotenv()
+
+
+# Prices and sizes are compared after rounding, so "101.50" from the API equals 101.5.
+PRECISION = int(os.environ.get("RECONCILE_PRECISION", "8"))
+
+
+def levelKey(trade_side, direction, price: float, size: float) -> tuple:
+    return (trade_side, direction, round(price, PRECISION), round(size, PRECISION))
+
+
+def parseOpenOrders(orders_data) -> list[dict]:
+    """Normalize KANA open-order rows; a side or direction the API leaves out stays None."""
+
+    rows = orders_data if isinstance(orders_data, list) else []
+    orders = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        order_id = row.get("order_id", row.get("orderId", row.get("id")))
+        if order_id is None:
+            continue
+        trade_side = row.get("trade_side", row.get("tradeSide"))
+        direction = row.get("direction")
+        orders.append(
+            {
+                "order_id": int(order_id),
+                "trade_side": None if trade_side is None else toBool(trade_side),
+                "direction": None if direction is None else toBool(direction),
+                "price": toNumber(row, "price"),
+                "size": toNumber(row, "remaining_size", "remainingSize", "size"),
+            }
+        )
+    return orders
+
+
+def diffOrders(current: list[dict], targets: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    Work out the smallest change from the open orders to the target levels.
+
+    An open order that already sits at a target's side, direction, price and
+    size is kept, once per matching target; everything else is cancelled and
+    the unmatched targets are placed. KANA has no amend, so an order whose
+    size changed is a cancel plus a place.
+    """
+
+    wanted = defaultdict(list)
+    for target in targets:
+        key = levelKey(target["trade_side"], target["direction"], target["price"], target["size"])
+        wanted[key].append(target)
+
+    cancels = []
+    for order in current:
+        key = levelKey(order["trade_side"], order["direction"], order["price"], order["size"])
+        candidates = [
+            candidate
+            for candidate in wanted
+            if candidate[2:] == key[2:]
+            and key[0] in (None, candidate[0])
+            and key[1] in (None, candidate[1])
+            and wanted[candidate]
+        ]
+        if candidates:
+            wanted[candidates[0]].pop()
+        else:
+            cancels.append(order)
+
+    places = [target for levels in wanted.values() for target in levels]
+    return cancels, places
+
+
+def targetLevels(prices, sizes, trade_sides, directions) -> list[dict]:
+    if not len(prices) == len(sizes) == len(trade_sides) == len(directions):
+        raise ValueError("prices, sizes, trade_sides and directions must have the same length.")
+    return [
+        {
+            "trade_side": bool(trade_side),
+            "direction": bool(direction),
+            "price": float(price),
+            "size": float(size),
+        }
+        for price, size, trade_side, direction in zip(prices, sizes, trade_sides, directions)
+    ]
+
+
+async def planOrders(wallet_address: str, market_id: int, targets: list[dict]) -> tuple:
+    """
+    Fetch the open orders and diff them against the targets.
+
+    Returns the cancels, the places and the plan reported to the user. An
+    order to cancel whose side the API left out is not cancelled, since
+    KANA needs the side and guessing it could cancel the wrong order; it is
+    reported instead.
+    """
+
+    response = await asyncio.to_thread(getOrdersFromContract, market_id, wallet_address)
+    if "Error" in response:
+        raise RuntimeError(response["Error"])
+    current = parseOpenOrders(apiData(response, "Open Orders From Contract"))
+
+    cancels, places = diffOrders(current, targets)
+    unknown = [order for order in cancels if order["trade_side"] is None]
+    cancels = [order for order in cancels if order["trade_side"] is not None]
+    plan = {
+        "Orders Kept": len(current) - len(cancels) - len(unknown),
+        "Orders To Cancel": [order["order_id"] for order in cancels],
+        "Orders To Place": places,
+    }
+    if unknown:
+        plan["Orders Left Open (side unknown, cancel them manually)"] = [
+            order["order_id"] for order in unknown
+        ]
+    return cancels, places, plan
+
+
+async def planReconcile(
+    wallet_address: str,
+    market_id: int,
+    prices: list[float],
+    sizes: list[float],
+    trade_sides: list[bool],
+    directions: list[bool],
+) -> dict:
+    """
+    Preview what reconcileOrders would cancel and place, without submitting anything.
+
+    Args:
+        wallet_address (str): The wallet address of the account.
+        market_id (int): Market ID.
+        prices (list[float]): Target price of each level.
+        sizes (list[float]): Target size of each level.
+        trade_sides (list[bool]): Trade side of each level, True for long and False for short.
+        directions (list[bool]): Direction of each level.
+
+    Returns:
+        dict: The orders that would be kept, cancelled and placed.
+    """
+
+    try:
+        targets = targetLevels(prices, sizes, trade_sides, directions)
+        _, _, plan = await planOrders(wallet_address, market_id, targets)
+        return {"Reconciliation Plan": plan}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+async def reconcileOrders(
+    private_key: str,
+    market_id: int,
+    prices: list[float],
+    sizes: list[float],
+    trade_sides: list[bool],
+    directions: list[bool],
+    leverage: int,
+) -> dict:
+    """
+    Bring an account's open orders in a market to a target set of price levels.
+
+    The current open orders are fetched and compared with the targets locally;
+    orders already at a target level are left alone, and only the difference is
+    cancelled and placed. The placed orders go through the same risk check as
+    placeMultipleOrders, with the cancelled orders' notional freed first. Use
+    planReconcile to preview the changes first.
+
+    Args:
+        private_key (str): Private key of the account.
+        market_id (int): Market ID.
+        prices (list[float]): Target price of each level.
+        sizes (list[float]): Target size of each level.
+        trade_sides (list[bool]): Trade side of each level, True for long and False for short.
+        directions (list[bool]): Direction of each level.
+        leverage (int): Leverage of the placed orders.
+
+    Returns:
+        dict: The orders kept, cancelled and placed, and the transaction results.
+    """
+
+    try:
+        targets = targetLevels(prices, sizes, trade_sides, directions)
+        wallet = accountKey(private_key)
+        cancels, places, plan = await planOrders(wallet, market_id, targets)
+        if not (cancels or places):
+            return {"Reconciliation Plan": plan}
+
+        place_sizes = [level["size"] for level in places]
+        place_prices = [level["price"] for level in places]
+        place_sides = [level["trade_side"] for level in places]
+        place_directions = [level["direction"] for level in places]
+        await risk_engine.prepare(wallet, market_id)
+        rejection = risk_engine.check_orders(
+            wallet,
+            market_id,
+            place_sizes,
+            place_prices,
+            [leverage] * len(places),
+            place_sides,
+            place_directions,
+            released=risk_engine.resting_notional(market_id, cancels),
+        )
+        if rejection:
+            return {
+                "Reconciliation Plan": plan,
+                "Error": f"Orders rejected by risk check: {rejection}",
+            }
+
+        # cancelAndPlaceMultipleOrders pairs cancels with places in as few
+        # gas-bounded transactions as the diff needs.
+        result = await cancelAndPlaceMultipleOrders(
+            private_key,
+            market_id,
+            [order["order_id"] for order in cancels],
+            [order["trade_side"] for order in cancels],
+            # Reconciled levels are resting limit orders.
+            [True] * len(places),
+            place_sides,
+            place_directions,
+            place_sizes,
+            place_prices,
+            [leverage] * len(places),
+        )
+        if not isErrorResult(result):
+            # Counted against the limits until the open orders are read again.
+            risk_engine.reserve(
+                wallet,
+                market_id,
+                risk_engine.orders_notional(
+                    wallet, market_id, place_sizes, place_prices, place_sides, place_directions
+                ),
+            )
+        risk_engine.refresh_later(wallet, market_id)
+        return {"Reconciliation Plan": plan, "Transaction Result": result}
+
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
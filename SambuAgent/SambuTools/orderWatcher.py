@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, toNumber
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.SambuTools.sambuAPI import getOrdersFromContract, getOrdersStatusById
+from SambuAgent.responseCache import state_versions
+from SambuAgent.toolJobs import current_chat, tool_jobs
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# Orders are polled every FAST seconds right after placement or a change,
+# backing off by BACKOFF per quiet poll up to SLOW seconds.
+FAST_INTERVAL_SECONDS = float(os.environ.get("ORDER_WATCH_FAST_INTERVAL", "2"))
+SLOW_INTERVAL_SECONDS = float(os.environ.get("ORDER_WATCH_SLOW_INTERVAL", "60"))
+BACKOFF = float(os.environ.get("ORDER_WATCH_BACKOFF", "1.5"))
+MAX_EVENTS = int(os.environ.get("ORDER_WATCH_MAX_EVENTS", "200"))
+
+
+def orderStatus(data) -> str:
+    """Reduce a KANA order status answer to open, filled or cancelled."""
+
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    status = data.get("status", data.get("orderStatus", "")) if isinstance(data, dict) else data
+    status = str(status).lower()
+    if "cancel" in status:
+        return "cancelled"
+    if "fill" in status and "partial" not in status:
+        return "filled"
+    return "open"
+
+
+def openOrders(data) -> dict[int, float]:
+    """Open order ID to remaining size, from a getOrdersFromContract answer."""
+
+    orders = {}
+    for row in data if isinstance(data, list) else []:
+        if not isinstance(row, dict):
+            continue
+        order_id = row.get("order_id", row.get("orderId", row.get("id")))
+        if order_id is not None:
+            orders[int(order_id)] = toNumber(row, "remaining_size", "remainingSize", "size")
+    return orders
+
+
+class WatchedOrder:
+    __slots__ = (
+        "order_id",
+        "market_id",
+        "wallet_address",
+        "chat_id",
+        "status",
+        "remaining_size",
+        "interval",
+        "next_poll_at",
+        "added_at",
+        "polls",
+    )
+
+    def __init__(self, order_id: int, market_id: int, wallet_address: str | None, chat_id=None):
+        self.order_id = order_id
+        self.market_id = market_id
+        self.wallet_address = wallet_address
+        self.chat_id = chat_id
+        self.status = "open"
+        self.remaining_size = None
+        self.interval = FAST_INTERVAL_SECONDS
+        self.next_poll_at = time.monotonic()
+        self.added_at = time.time()
+        self.polls = 0
+
+    def schedule(self, changed: bool) -> None:
+        if changed:
+            self.interval = FAST_INTERVAL_SECONDS
+        else:
+            self.interval = min(self.interval * BACKOFF, SLOW_INTERVAL_SECONDS)
+        self.next_poll_at = time.monotonic() + self.interval
+
+    def describe(self) -> dict:
+        return {
+            "Order ID": self.order_id,
+            "Market ID": self.market_id,
+            "Wallet Address": self.wallet_address,
+            "Status": self.status,
+            "Remaining Size": self.remaining_size,
+            "Poll Interval (s)": round(self.interval, 1),
+            "Polls": self.polls,
+            "Watched Since": int(self.added_at),
+        }
+
+
+class OrderWatcher:
+    """
+    Follow many orders until they are filled or cancelled.
+
+    Due orders are polled together: one getOrdersFromContract call per market
+    and wallet covers all of that wallet's orders there, and only orders that
+    left the open list are looked up one by one to tell a fill from a cancel.
+    Orders without a wallet fall back to a status call each. Watches are
+    kept per chat, so several chats can follow the same order; it is still
+    polled once, and every event is pushed to each chat that asked for it.
+    """
+
+    def __init__(self):
+        # (market ID, order ID, chat ID) -> watch
+        self.orders: dict[tuple[int, int, object], WatchedOrder] = {}
+        # (chat ID, event record) pairs, newest last.
+        self.events: deque = deque(maxlen=MAX_EVENTS)
+        self._monitor = None
+        self._wake = None
+
+    def watch(self, market_id: int, order_ids: list[int], wallet_address: str | None) -> list:
+        chat_id = current_chat.get()
+        added = []
+        for order_id in order_ids:
+            key = (int(market_id), int(order_id), chat_id)
+            order = self.orders.get(key)
+            if order is None:
+                order = self.orders[key] = WatchedOrder(
+                    int(order_id), int(market_id), wallet_address or None, chat_id
+                )
+            added.append(order)
+        if self._wake is not None:
+            self._wake.set()
+        return added
+
+    def unwatch(self, order_ids: list[int], chat_id) -> int:
+        wanted = {int(order_id) for order_id in order_ids}
+        keys = [key for key in self.orders if key[1] in wanted and key[2] == chat_id]
+        for key in keys:
+            del self.orders[key]
+        return len(keys)
+
+    def watched_by(self, chat_id) -> list[WatchedOrder]:
+        return [order for key, order in self.orders.items() if key[2] == chat_id]
+
+    def events_for(self, chat_id) -> list[dict]:
+        return [record for owner, record in self.events if owner == chat_id]
+
+    async def status(self, order: WatchedOrder) -> str:
+        response = await asyncio.to_thread(
+            getOrdersStatusById, order.market_id, str(order.order_id)
+        )
+        if "Error" in response:
+            raise RuntimeError(response["Error"])
+        return orderStatus(apiData(response, "Order Status By Id"))
+
+    async def poll_group(self, market_id: int, wallet_address: str, orders: list) -> list:
+        response = await asyncio.to_thread(getOrdersFromContract, market_id, wallet_address)
+        if "Error" in response:
+            raise RuntimeError(response["Error"])
+        still_open = openOrders(apiData(response, "Open Orders From Contract"))
+
+        # Chats watching the same order share one status lookup.
+        gone = {
+            order.order_id: order for order in orders if order.order_id not in still_open
+        }
+        statuses = await asyncio.gather(*(self.status(order) for order in gone.values()))
+        updates = dict(zip(gone, statuses))
+        events = []
+        for order in orders:
+            if order.order_id in updates:
+                # Off the book but still reported open: the status lags, ask again next poll.
+                status = updates[order.order_id]
+                events.append((order, None if status == "open" else status, None))
+                continue
+            remaining = still_open[order.order_id]
+            if order.remaining_size is not None and remaining < order.remaining_size:
+                events.append((order, "partially filled", remaining))
+            else:
+                events.append((order, None, remaining))
+        return events
+
+    async def poll_single(self, orders: list) -> list:
+        status = await self.status(orders[0])
+        return [
+            (order, None if status == "open" else status, order.remaining_size)
+            for order in orders
+        ]
+
+    async def poll(self) -> None:
+        now = time.monotonic()
+        due = [order for order in self.orders.values() if order.next_poll_at <= now]
+        groups: dict[tuple, list] = {}
+        singles: dict[tuple, list] = {}
+        for order in due:
+            if order.wallet_address:
+                groups.setdefault((order.market_id, order.wallet_address), []).append(order)
+            else:
+                singles.setdefault((order.market_id, order.order_id), []).append(order)
+
+        results = await asyncio.gather(
+            *(
+                self.poll_group(market_id, wallet, orders)
+                for (market_id, wallet), orders in groups.items()
+            ),
+            *(self.poll_single(orders) for orders in singles.values()),
+            return_exceptions=True,
+        )
+        polled = list(groups.values()) + list(singles.values())
+        for orders, result in zip(polled, results):
+            if isinstance(result, Exception):
+                logger.warning("Order status poll failed: %s", result)
+                for order in orders:
+                    order.schedule(False)
+                continue
+            for order, event, remaining in result:
+                order.polls += 1
+                if remaining is not None:
+                    order.remaining_size = remaining
+                if event:
+                    await self.emit(order, event)
+                order.schedule(bool(event))
+
+    async def emit(self, order: WatchedOrder, event: str) -> None:
+        order.status = event
+        record = {**order.describe(), "Event": event, "At": int(time.time())}
+        self.events.append((order.chat_id, record))
+        state_versions.bump("account")
+        if event in ("filled", "cancelled"):
+            self.orders.pop((order.market_id, order.order_id, order.chat_id), None)
+        if order.wallet_address:
+            # A fill changes the position and a cancel frees the order's reservation.
+            risk_engine.refresh_later(order.wallet_address, order.market_id)
+
+        if tool_jobs.notifier is None or order.chat_id is None:
+            return
+        text = f"Order {order.order_id} in market {order.market_id} was {event}."
+        if event == "partially filled":
+            text += f" Remaining size: {order.remaining_size}."
+        try:
+            await tool_jobs.notifier(order.chat_id, text)
+        except Exception as e:
+            logger.warning(
+                "Could not notify chat %s about order %s: %s", order.chat_id, order.order_id, e
+            )
+
+    async def run(self) -> None:
+        """Poll due orders, then sleep until the next one is due or a new order is watched."""
+
+        self._wake = asyncio.Event()
+        while self.orders:
+            self._wake.clear()
+            await self.poll()
+            if not self.orders:
+                break
+            delay = min(order.next_poll_at for order in self.orders.values()) - time.monotonic()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(delay, 0.05))
+            except asyncio.TimeoutError:
+                pass
+        self._wake = None
+
+    def ensure_monitor(self) -> None:
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self.run())
+
+
+order_watcher = OrderWatcher()
+
+
+async def watchOrders(market_id: int, order_ids: list[int], wallet_address: str) -> dict:
+    """
+    Follow orders until they are filled or cancelled, and message the user when that happens.
+
+    Args:
+        market_id (int): The ID of the market the orders are in.
+        order_ids (list[int]): The IDs of the orders to follow.
+        wallet_address (str): The wallet address that placed the orders.
+
+    Returns:
+        dict: A dictionary containing the orders now being watched.
+    """
+
+    try:
+        orders = order_watcher.watch(market_id, order_ids, wallet_address)
+        order_watcher.ensure_monitor()
+        return {"Watched Orders": [order.describe() for order in orders]}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def unwatchOrders(order_ids: list[int]) -> dict:
+    """
+    Stop following orders in this chat.
+
+    Args:
+        order_ids (list[int]): The IDs of the orders to stop following.
+
+    Returns:
+        dict: A dictionary containing how many orders were removed.
+    """
+
+    return {"Orders Unwatched": order_watcher.unwatch(order_ids, current_chat.get())}
+
+
+def getWatchedOrders() -> dict:
+    """
+    List the orders this chat is following and their most recent events.
+
+    Returns:
+        dict: A dictionary containing the watched orders and recent fill and cancel events.
+    """
+
+    chat_id = current_chat.get()
+    return {
+        "Watched Orders": [order.describe() for order in order_watcher.watched_by(chat_id)],
+        "Recent Events": order_watcher.events_for(chat_id)[-20:],
+    }
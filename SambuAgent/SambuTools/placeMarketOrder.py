@@ -1,6 +1,9 @@
 import asyncio
 import os
-import requests
+import time
+from collections import OrderedDict
+
+import httpx
 from aptos_sdk.account import Account
 from aptos_sdk.async_client import RestClient
 from aptos_sdk.transactions import (
@@ -10,64 +13,281 @@ from aptos_sdk.transactions import (
 )
 from aptos_sdk.bcs import Serializer
 from aptos_sdk.type_tag import TypeTag, StructTag
+
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.responseCache import state_versions
+from SambuAgent.telemetry import span
 from dotenv import load_dotenv
-from typing import List
 
 load_dotenv()
 
 
-class AptosTransactionHandler:
-    def __init__(self, rest_client: RestClient, account: Account):
-        self.rest_client = rest_client
-        self.account = account
+# How long a payload template learned from KANA is reused before asking again.
+TEMPLATE_TTL_SECONDS = float(os.environ.get("MARKET_ORDER_TEMPLATE_TTL", "60"))
+SIGNER_CACHE_SIZE = int(os.environ.get("MARKET_ORDER_SIGNER_CACHE", "64"))
+KANA_TIMEOUT_SECONDS = float(os.environ.get("MARKET_ORDER_KANA_TIMEOUT", "10"))
 
-    def fetch_payload(self, api_url: str, params: dict, headers: dict) -> dict | None:
-        try:
-            response = requests.get(api_url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json().get("data")
-        except requests.RequestException as e:
-            print(f"Error fetching payload: {e}")
+
+def parseArguments(arguments: list) -> list:
+    """KANA returns every argument as a string; the bools are the trade side and direction."""
+
+    return [
+        int(arguments[0]),
+        str(arguments[1]).lower() == "true",
+        str(arguments[2]).lower() == "true",
+        *map(int, arguments[3:]),
+    ]
+
+
+@span("payload_build")
+def buildPayload(function: str, type_arguments: list[str], arguments: list) -> TransactionPayload:
+    module, function_id = "::".join(function.split("::")[:-1]), function.split("::")[-1]
+    serializers = [Serializer.u64, Serializer.bool, Serializer.bool] + [Serializer.u64] * (
+        len(arguments) - 3
+    )
+    return TransactionPayload(
+        payload=EntryFunction.natural(
+            module,
+            function_id,
+            [TypeTag(StructTag.from_str(argument)) for argument in type_arguments],
+            [
+                TransactionArgument(argument, serializer)
+                for argument, serializer in zip(arguments, serializers)
+            ],
+        )
+    )
+
+
+def isSequenceError(error: Exception) -> bool:
+    return "SEQUENCE_NUMBER" in str(error).upper()
+
+
+class PayloadTemplate:
+    """
+    Reusable shape of one market's placeMarketOrder payload.
+
+    KANA returns (market, trade side, direction, size in lots, leverage,
+    take profit, stop loss). Once one answer has been seen, only the size
+    needs scaling, so later orders in the market with the same trade side,
+    direction and leverage are built locally. Any other order asks KANA.
+    """
+
+    __slots__ = (
+        "function",
+        "type_arguments",
+        "trade_side",
+        "direction",
+        "leverage",
+        "lots_per_unit",
+        "tail",
+        "learned_at",
+    )
+
+    def __init__(
+        self, function, type_arguments, trade_side, direction, leverage, lots_per_unit, tail
+    ):
+        self.function = function
+        self.type_arguments = type_arguments
+        self.trade_side = trade_side
+        self.direction = direction
+        self.leverage = leverage
+        self.lots_per_unit = lots_per_unit
+        self.tail = tail
+        self.learned_at = time.monotonic()
+
+    @classmethod
+    def learn(cls, data: dict, market_id, trade_side, direction, size, leverage):
+        arguments = parseArguments(data["functionArguments"])
+        # Only learn from an answer whose layout is the one described above.
+        if (
+            len(arguments) < 5
+            or arguments[:3] != [int(market_id), bool(trade_side), bool(direction)]
+            or arguments[4] != int(leverage)
+            or not size
+        ):
             return None
+        return cls(
+            data["function"],
+            data["typeArguments"],
+            bool(trade_side),
+            bool(direction),
+            int(leverage),
+            arguments[3] / size,
+            arguments[5:],
+        )
 
-    def create_transaction_payload(self, payload: dict) -> TransactionPayload:
-        try:
-            module, function_id = (
-                "::".join(payload["function"].split("::")[:-1]),
-                payload["function"].split("::")[-1],
+    def fresh(self) -> bool:
+        return time.monotonic() - self.learned_at < TEMPLATE_TTL_SECONDS
+
+    def matches(self, trade_side, direction, leverage) -> bool:
+        """True if an order has the parameters this template was learned from."""
+
+        return (bool(trade_side), bool(direction), int(leverage)) == (
+            self.trade_side,
+            self.direction,
+            self.leverage,
+        )
+
+    def arguments(self, market_id, trade_side, direction, size, leverage) -> list:
+        lots = round(size * self.lots_per_unit)
+        return [int(market_id), bool(trade_side), bool(direction), lots, int(leverage), *self.tail]
+
+
+class MarketOrderPipeline:
+    """
+    Keep what a market order needs warm between calls.
+
+    The Aptos and KANA clients (and their connection pools and cached chain
+    ID) live as long as the event loop, loaded accounts are kept so the key
+    is not parsed again, sequence numbers are tracked locally (and read from
+    chain again when another write used one), and payloads
+    come from a per-market template. A warm order is signed and submitted
+    with a single round trip to the node.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._node_url = None
+        self.rest_client = None
+        self.kana_client = None
+        self.accounts: OrderedDict[str, Account] = OrderedDict()
+        self.sequence_numbers: dict[str, int] = {}
+        self.templates: dict[int, PayloadTemplate] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._confirmations: set[asyncio.Task] = set()
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        node_url = f"{os.environ.get('APTOS_BASE_URL')}"
+        if self._loop is not loop or self._node_url != node_url:
+            # Clients and locks belong to the loop that created them.
+            self._loop = loop
+            self._node_url = node_url
+            self.rest_client = RestClient(node_url)
+            self.kana_client = httpx.AsyncClient(timeout=KANA_TIMEOUT_SECONDS)
+            self.sequence_numbers = {}
+            self._locks = {}
+
+    def account(self, private_key: str) -> Account:
+        account = self.accounts.get(private_key)
+        if account is None:
+            private_key_hex = private_key[2:] if private_key.startswith("0x") else private_key
+            account = Account.load_key(bytes.fromhex(private_key_hex))
+            self.accounts[private_key] = account
+            while len(self.accounts) > SIGNER_CACHE_SIZE:
+                self.accounts.popitem(last=False)
+        else:
+            self.accounts.move_to_end(private_key)
+        return account
+
+    async def payload(self, market_id, trade_side, direction, size, leverage) -> TransactionPayload:
+        self._bind_loop()
+        template = self.templates.get(int(market_id))
+        if (
+            template is not None
+            and template.fresh()
+            and template.matches(trade_side, direction, leverage)
+        ):
+            return buildPayload(
+                template.function,
+                template.type_arguments,
+                template.arguments(market_id, trade_side, direction, size, leverage),
             )
-            type_arguments = [
-                TypeTag(StructTag.from_str(arg)) for arg in payload["typeArguments"]
-            ]
-            function_arguments = [
-                TransactionArgument(arg, serializer)
-                for arg, serializer in zip(
-                    payload["functionArguments"], payload["argumentTypes"]
-                )
-            ]
-
-            return TransactionPayload(
-                payload=EntryFunction.natural(
-                    module, function_id, type_arguments, function_arguments
-                )
+
+        with span("http_fetch"):
+            response = await self.kana_client.get(
+                f"{os.environ.get('KANA_BASE_URL')}/placeMarketOrder",
+                params={
+                    "marketId": market_id,
+                    "tradeSide": str(bool(trade_side)).lower(),
+                    "direction": str(bool(direction)).lower(),
+                    "size": size,
+                    "leverage": leverage,
+                },
+                headers={"x-api-key": os.environ.get("KANA_API_KEY")},
             )
-        except Exception as e:
-            print(f"Error creating transaction payload: {e}")
-            raise
+        response.raise_for_status()
+        data = response.json().get("data")
+        if not data:
+            raise ValueError("Failed to fetch payload data.")
 
-    async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
+        template = PayloadTemplate.learn(data, market_id, trade_side, direction, size, leverage)
+        if template is not None:
+            self.templates[int(market_id)] = template
+        else:
+            # KANA's answer no longer has the layout the template relies on.
+            self.forget(market_id)
+        return buildPayload(
+            data["function"], data["typeArguments"], parseArguments(data["functionArguments"])
+        )
+
+    def forget(self, market_id) -> None:
+        """Drop a market's template so its next order asks KANA again."""
+
+        self.templates.pop(int(market_id), None)
+
+    async def submit(self, account: Account, payload: TransactionPayload) -> str:
+        """Sign with the next local sequence number and submit, without waiting."""
+
+        self._bind_loop()
+        address = account.address()
+        key = str(address)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            sequence_number = self.sequence_numbers.get(key)
+            for attempt in range(2):
+                try:
+                    if sequence_number is None:
+                        sequence_number = await self.rest_client.account_sequence_number(address)
+                    with span("sign"):
+                        signed_transaction = await self.rest_client.create_bcs_signed_transaction(
+                            account, payload, sequence_number=sequence_number
+                        )
+                    with span("submit"):
+                        txn_hash = await self.rest_client.submit_bcs_transaction(
+                            signed_transaction
+                        )
+                    break
+                except Exception as e:
+                    # The local count may be stale; read it from the chain next time.
+                    self.sequence_numbers.pop(key, None)
+                    if attempt or not isSequenceError(e):
+                        raise
+                    # Another write for this account (a limit order, a deposit, a
+                    # batch or another process) used the number; retry once from chain.
+                    sequence_number = None
+            self.sequence_numbers[key] = sequence_number + 1
+        recordSubmission(txn_hash)
+        return txn_hash
+
+    async def confirm(self, account: Account, txn_hash: str, market_id: int) -> None:
         try:
-            signed_txn = await self.rest_client.create_bcs_signed_transaction(
-                sender=self.account, payload=transaction_payload
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(
-                signed_transaction=signed_txn
-            )
-            await self.rest_client.wait_for_transaction(txn_hash)
-            return txn_hash
-        except Exception as e:
-            print(f"Error during transaction submission: {e}")
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash)
+        except Exception:
+            # An expired transaction never used its sequence number.
+            self.sequence_numbers.pop(str(account.address()), None)
+            self.forget(market_id)
             raise
+        finally:
+            state_versions.bump("account")
+            # The fill, or its absence, replaces the order's risk reservation.
+            risk_engine.refresh_later(str(account.address()), market_id)
+
+    def confirm_later(self, account: Account, txn_hash: str, market_id: int) -> None:
+        async def confirm():
+            try:
+                await self.confirm(account, txn_hash, market_id)
+            except Exception as e:
+                print(f"Market order {txn_hash} was not confirmed: {e}")
+
+        # The loop only keeps weak references to tasks.
+        task = asyncio.create_task(confirm())
+        self._confirmations.add(task)
+        task.add_done_callback(self._confirmations.discard)
+
+
+market_orders = MarketOrderPipeline()
 
 
 async def placeMarketOrder(
@@ -77,6 +297,7 @@ async def placeMarketOrder(
     direction: bool,
     size: int,
     leverage: int,
+    wait_for_confirmation: bool = True,
 ) -> dict:
     """
     Place a market order.
@@ -85,55 +306,49 @@ async def placeMarketOrder(
         private_key (str): The private key of the user.
         market_id (int): The ID of the market.
         trade_side (bool): True for long, False for short.
-        direction (bool): True for buy, False for sell.
+        direction (bool): True to close part of the position on that side, False to open or add to it.
         size (int): The size of the order.
         leverage (int): The leverage of the order.
+        wait_for_confirmation (bool): If False, return as soon as the transaction is submitted.
 
     Returns:
         dict: A dictionary containing the result of the transaction.
     """
 
-    NODE_URL = f"{os.environ.get('APTOS_BASE_URL')}/v1"
-    API_URL = f"{os.environ.get('KANA_BASE_URL')}/placeMarketOrder"
-    HEADERS = {"x-api-key": os.environ.get("KANA_API_KEY")}
-    PARAMS = {
-        "marketId": market_id,
-        "tradeSide": trade_side,
-        "direction": direction,
-        "size": size,
-        "leverage": leverage,
-    }
+    if not private_key:
+        return {"Error": "A private key is required to place a market order."}
 
-    rest_client = RestClient(NODE_URL)
-    private_key = private_key.lstrip("0x")
+    try:
+        account = market_orders.account(private_key)
+        wallet = str(account.address())
 
-    if not private_key:
-        return {"Error": "PTOS_PRIVATEKEY is missing in .env file."}
+        await risk_engine.prepare(wallet, market_id)
+        rejection = risk_engine.check_order(
+            wallet, market_id, size, None, leverage, trade_side=trade_side, reduce_only=direction
+        )
+        if rejection:
+            return {"Error": f"Order rejected by risk check: {rejection}"}
 
-    account = Account.load_key(bytes.fromhex(private_key))
-    handler = AptosTransactionHandler(rest_client, account)
+        transaction_payload = await market_orders.payload(
+            market_id, trade_side, direction, size, leverage
+        )
+        try:
+            txn_hash = await market_orders.submit(account, transaction_payload)
+        except Exception:
+            # The payload may have come from a stale template.
+            market_orders.forget(market_id)
+            raise
+        if not risk_engine.reduces(wallet, market_id, trade_side, direction):
+            # Counted against the limits until the positions are read again.
+            risk_engine.reserve(
+                wallet, market_id, risk_engine.order_notional(market_id, size, None) or 0.0
+            )
 
-    payload_data = handler.fetch_payload(API_URL, PARAMS, HEADERS)
-    if not payload_data:
-        return {"Error": "Failed to fetch payload data."}
+        if not wait_for_confirmation:
+            market_orders.confirm_later(account, txn_hash, market_id)
+            return {"Transaction submitted, not yet confirmed. Hash": txn_hash}
 
-    try:
-        payload_data["functionArguments"] = [
-            int(payload_data["functionArguments"][0]),
-            payload_data["functionArguments"][1].lower() == "true",
-            payload_data["functionArguments"][2].lower() == "true",
-            *map(int, payload_data["functionArguments"][3:]),
-        ]
-
-        payload_data["argumentTypes"] = [
-            Serializer.u64,
-            Serializer.bool,
-            Serializer.bool,
-        ] + [Serializer.u64] * (len(payload_data["functionArguments"]) - 3)
-
-        transaction_payload = handler.create_transaction_payload(payload_data)
-
-        txn_hash = await handler.submit_transaction(transaction_payload)
+        await market_orders.confirm(account, txn_hash, market_id)
         return {"Transaction submitted successfully. Hash": txn_hash}
 
     except Exception as e:
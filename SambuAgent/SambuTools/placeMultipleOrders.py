@@ -9,6 +9,15 @@ from aptos_sdk.transactions import (
 )
 from aptos_sdk.bcs import Serializer
 from aptos_sdk.type_tag import TypeTag, StructTag
+
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.SambuTools.orderBatcher import (
+    PLACE_FIELDS,
+    batchResult,
+    order_batcher,
+)
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
 import requests
 from dotenv import load_dotenv
 from typing import Any, List
@@ -24,7 +33,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url: str, json_data: dict, headers: dict) -> dict:
         try:
-            response = requests.post(api_url, json=json_data, headers=headers)
+            with span("http_fetch"):
+                response = requests.post(api_url, json=json_data, headers=headers)
             response.raise_for_status()
             payload_data = response.json().get("data")
             if payload_data is None:
@@ -60,6 +70,7 @@ class AptosTransactionHandler:
             print(f"Error creating transaction arguments: {e}")
             raise
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             function_information = payload["function"].split("::")
@@ -85,15 +96,19 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction_request = (
-                await self.rest_client.create_bcs_signed_transaction(
-                    sender=self.account, payload=transaction_payload
+            with span("sign"):
+                signed_transaction_request = (
+                    await self.rest_client.create_bcs_signed_transaction(
+                        sender=self.account, payload=transaction_payload
+                    )
                 )
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(
-                signed_transaction=signed_transaction_request
-            )
-            await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(
+                    signed_transaction=signed_transaction_request
+                )
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -127,13 +142,22 @@ async def placeMultipleOrders(
         dict: Transaction submission result.
     """
 
-    NODE_URL = f"{os.environ.get('APTOS_BASE_URL')}/v1"
+    NODE_URL = f"{os.environ.get('APTOS_BASE_URL')}"
     rest_client = RestClient(NODE_URL)
     private_key_hex = private_key
     if private_key_hex.startswith("0x"):
         private_key_hex = private_key_hex[2:]
     private_key_bytes = bytes.fromhex(private_key_hex)
     account = Account.load_key(private_key_bytes)
+
+    wallet = str(account.address())
+    await risk_engine.prepare(wallet, market_id)
+    rejection = risk_engine.check_orders(
+        wallet, market_id, sizes, prices, leverage, trade_sides, directions
+    )
+    if rejection:
+        return {"Error": f"Orders rejected by risk check: {rejection}"}
+
     API_URL = f"{os.environ.get('KANA_BASE_URL')}/placeMultipleOrders"
     BODY = {
         "marketId": market_id,
@@ -146,27 +170,34 @@ async def placeMultipleOrders(
     }
     HEADERS = {"x-api-key": os.environ.get("KANA_API_KEY")}
     handler = AptosTransactionHandler(rest_client, account)
-    payload_data = handler.fetch_payload(API_URL, BODY, HEADERS)
-    if not payload_data:
-        return {"Error": "Failed to fetch payload data."}
+    ARGUMENT_TYPES = [
+        Serializer.u64,
+        Serializer.sequence_serializer(Serializer.bool),
+        Serializer.sequence_serializer(Serializer.bool),
+        Serializer.sequence_serializer(Serializer.bool),
+        Serializer.sequence_serializer(Serializer.u64),
+        Serializer.sequence_serializer(Serializer.u64),
+        Serializer.sequence_serializer(Serializer.u64),
+        Serializer.sequence_serializer(Serializer.u8),
+        Serializer.sequence_serializer(Serializer.u64),
+        Serializer.sequence_serializer(Serializer.u64),
+    ]
 
     try:
-        payload_data["argumentTypes"] = [
-            Serializer.u64,
-            Serializer.sequence_serializer(Serializer.bool),
-            Serializer.sequence_serializer(Serializer.bool),
-            Serializer.sequence_serializer(Serializer.bool),
-            Serializer.sequence_serializer(Serializer.u64),
-            Serializer.sequence_serializer(Serializer.u64),
-            Serializer.sequence_serializer(Serializer.u64),
-            Serializer.sequence_serializer(Serializer.u8),
-            Serializer.sequence_serializer(Serializer.u64),
-            Serializer.sequence_serializer(Serializer.u64),
-        ]
-        transaction_payload = handler.create_transaction_payload(payload_data)
-
-        txn_hash = await handler.submit_transaction(transaction_payload)
-        return {"Transaction submitted successfully. Transaction hash": txn_hash}
-
+        # Large batches are split into gas- and size-bounded transactions.
+        summary = await order_batcher.submit(
+            handler, API_URL, BODY, HEADERS, ARGUMENT_TYPES, [PLACE_FIELDS]
+        )
+        if summary["Orders Committed"]:
+            # Resting orders count against the limits until they fill or are cancelled.
+            risk_engine.reserve(
+                wallet,
+                market_id,
+                risk_engine.orders_notional(
+                    wallet, market_id, sizes, prices, trade_sides, directions
+                ),
+            )
+            risk_engine.refresh_later(wallet, market_id)
+        return batchResult(summary)
     except Exception as e:
         return {"Error": f"An error occurred:, {e}"}
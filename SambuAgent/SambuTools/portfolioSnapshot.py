@@ -0,0 +1,259 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.sambuAPI import (
+    getWalletAptBalance,
+    getNetProfileBalance,
+    getProfileAddress,
+    getPositions,
+    getAllOpenOrderIds,
+    getMarketPrice,
+)
+
+load_dotenv()
+
+
+SNAPSHOT_TTL_SECONDS = float(os.environ.get("PORTFOLIO_SNAPSHOT_TTL", "5"))
+
+
+class TTLCache:
+    """Small dictionary cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key, value) -> None:
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            self._entries = {
+                k: entry for k, entry in self._entries.items() if entry[0] >= now
+            }
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+snapshot_cache = TTLCache(SNAPSHOT_TTL_SECONDS)
+
+
+def apiData(response: dict, key: str):
+    """Unwrap the KANA `data` field from a sambuAPI response, or None on error."""
+
+    body = response.get(key) if isinstance(response, dict) else None
+    if isinstance(body, dict) and "data" in body:
+        return body["data"]
+    return body
+
+
+def toNumber(row: dict, *names: str, default: float = 0.0) -> float:
+    for name in names:
+        value = row.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return default
+
+
+def toBool(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() == "true"
+    return bool(value)
+
+
+def markPrice(price_data) -> float:
+    """Mid of best bid and ask, falling back to whichever price field is present."""
+
+    if isinstance(price_data, (int, float, str)):
+        return toNumber({"price": price_data}, "price")
+    if not isinstance(price_data, dict):
+        return 0.0
+    ask = toNumber(price_data, "bestAskPrice", "best_ask_price")
+    bid = toNumber(price_data, "bestBidPrice", "best_bid_price")
+    if ask and bid:
+        return (ask + bid) / 2
+    return ask or bid or toNumber(price_data, "price", "marketPrice", "lastPrice")
+
+
+def parsePositions(positions_data) -> list[dict]:
+    """Normalize KANA position rows into plain numeric dictionaries."""
+
+    rows = positions_data if isinstance(positions_data, list) else []
+    positions = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        size = toNumber(row, "size", "positionSize")
+        if not size:
+            continue
+        positions.append(
+            {
+                "market_id": int(toNumber(row, "market_id", "marketId")),
+                "is_long": toBool(row.get("trade_side", row.get("tradeSide", True))),
+                "size": size,
+                "entry_price": toNumber(row, "entry_price", "entryPrice", "price"),
+                "margin": toNumber(row, "margin"),
+                "leverage": toNumber(row, "leverage", default=1.0),
+                "liquidation_price": toNumber(row, "liq_price", "liqPrice"),
+            }
+        )
+    return positions
+
+
+def unrealizedPnl(position: dict, mark: float) -> float:
+    move = mark - position["entry_price"]
+    return move * position["size"] if position["is_long"] else -move * position["size"]
+
+
+async def fetchPortfolioData(wallet_address: str, market_ids: list[int]) -> dict:
+    """Run every account and per-market read concurrently on worker threads."""
+
+    account_calls = [
+        asyncio.to_thread(getWalletAptBalance, wallet_address),
+        asyncio.to_thread(getNetProfileBalance, wallet_address),
+        asyncio.to_thread(getProfileAddress, wallet_address),
+    ]
+    market_calls = []
+    for market_id in market_ids:
+        market_calls += [
+            asyncio.to_thread(getPositions, market_id, wallet_address),
+            asyncio.to_thread(getAllOpenOrderIds, market_id, wallet_address),
+            asyncio.to_thread(getMarketPrice, market_id),
+        ]
+
+    results = await asyncio.gather(*account_calls, *market_calls)
+    apt_balance, net_balance, profile_address = results[:3]
+    markets = {}
+    for index, market_id in enumerate(market_ids):
+        positions, open_orders, price = results[3 + index * 3 : 6 + index * 3]
+        markets[market_id] = {
+            "positions": positions,
+            "open_orders": open_orders,
+            "price": price,
+        }
+
+    return {
+        "apt_balance": apt_balance,
+        "net_balance": net_balance,
+        "profile_address": profile_address,
+        "markets": markets,
+    }
+
+
+def buildSnapshot(wallet_address: str, raw: dict) -> dict:
+    errors = [
+        response["Error"]
+        for response in (raw["apt_balance"], raw["net_balance"], raw["profile_address"])
+        if "Error" in response
+    ]
+
+    net_balance = apiData(raw["net_balance"], "Net Profile Balance")
+    if isinstance(net_balance, dict):
+        available = toNumber(net_balance, "balance", "netBalance")
+    else:
+        available = toNumber({"balance": net_balance}, "balance")
+
+    markets = {}
+    total_pnl = total_margin = total_notional = 0.0
+    for market_id, responses in raw["markets"].items():
+        for response in responses.values():
+            if "Error" in response:
+                errors.append(f"Market {market_id}: {response['Error']}")
+
+        mark = markPrice(apiData(responses["price"], "Market Price"))
+        positions = []
+        market_pnl = 0.0
+        for position in parsePositions(apiData(responses["positions"], "Positions")):
+            price = mark or position["entry_price"]
+            pnl = unrealizedPnl(position, price)
+            margin = position["margin"] or (
+                position["size"] * position["entry_price"] / max(position["leverage"], 1)
+            )
+            market_pnl += pnl
+            total_margin += margin
+            total_notional += position["size"] * price
+            positions.append(
+                {
+                    "Side": "long" if position["is_long"] else "short",
+                    "Size": position["size"],
+                    "Entry Price": position["entry_price"],
+                    "Unrealized PnL": round(pnl, 8),
+                    "Margin": round(margin, 8),
+                    "Leverage": position["leverage"],
+                    "Liquidation Price": position["liquidation_price"],
+                }
+            )
+        total_pnl += market_pnl
+
+        markets[str(market_id)] = {
+            "Mark Price": mark,
+            "Positions": positions,
+            "Open Order IDs": apiData(responses["open_orders"], "Open Order IDs") or [],
+            "Unrealized PnL": round(market_pnl, 8),
+        }
+
+    equity = available + total_margin + total_pnl
+    return {
+        "Wallet": wallet_address,
+        "Profile Address": apiData(raw["profile_address"], "Profile Address"),
+        "APT Balance": apiData(raw["apt_balance"], "Wallet Aptos Balance"),
+        "Net Profile Balance": net_balance,
+        "Markets": markets,
+        "Totals": {
+            "Unrealized PnL": round(total_pnl, 8),
+            "Margin Used": round(total_margin, 8),
+            "Notional Exposure": round(total_notional, 8),
+            "Margin Usage": round(total_margin / equity, 6) if equity > 0 else None,
+        },
+        "Errors": errors,
+        "As Of": int(time.time()),
+    }
+
+
+async def getPortfolioSnapshot(wallet_address: str, market_ids: list[int]) -> dict:
+    """
+    Get balances, positions, open orders and prices for a wallet in one call.
+
+    Args:
+        wallet_address (str): The wallet address.
+        market_ids (list[int]): IDs of the markets to include.
+
+    Returns:
+        dict: A dictionary containing the portfolio snapshot with unrealized PnL and margin usage.
+    """
+
+    try:
+        key = (wallet_address.lower(), tuple(sorted(set(market_ids))))
+        snapshot = snapshot_cache.get(key)
+        if snapshot is not None:
+            return {"Portfolio Snapshot": snapshot, "Cached": True}
+
+        raw = await fetchPortfolioData(wallet_address, list(key[1]))
+        snapshot = buildSnapshot(wallet_address, raw)
+        if not snapshot["Errors"]:
+            snapshot_cache.set(key, snapshot)
+
+        return {"Portfolio Snapshot": snapshot, "Cached": False}
+
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
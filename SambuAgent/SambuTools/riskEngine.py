@@ -0,0 +1,579 @@
+import asyncio
+import logging
+import os
+from array import array
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.sambuAPI import (
+    fetchMarketInfo,
+    getNetProfileBalance,
+    getOrdersFromContract,
+    getPositions,
+    getMarketPrice,
+)
+from SambuAgent.SambuTools.portfolioSnapshot import (
+    apiData,
+    markPrice,
+    parsePositions,
+    toNumber,
+)
+from SambuAgent.responseCache import state_versions
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+MAX_LEVERAGE = float(os.environ.get("RISK_MAX_LEVERAGE", "20"))
+# Zero disables the corresponding notional limit.
+MAX_POSITION_NOTIONAL = float(os.environ.get("RISK_MAX_POSITION_NOTIONAL", "0"))
+MAX_TOTAL_EXPOSURE = float(os.environ.get("RISK_MAX_TOTAL_EXPOSURE", "0"))
+
+
+def marketUnits(info, market_id: int) -> tuple[float, float]:
+    """
+    Base units per lot and quote units per tick of a market, from getMarketInfo.
+
+    Order sizes are whole lots and limit prices whole ticks, so the notional of
+    an order in account units is lots * base per lot * price, where a limit
+    price is ticks * quote per tick / base per lot.
+    """
+
+    rows = info if isinstance(info, list) else [info]
+    row = next(
+        (
+            row
+            for row in rows
+            if isinstance(row, dict) and str(row.get("market_id", market_id)) == str(market_id)
+        ),
+        {},
+    )
+    base_per_lot = toNumber(row, "lot_size", "lotSize", default=1.0) / 10 ** toNumber(
+        row, "base_decimals", "baseDecimals"
+    )
+    quote_per_tick = toNumber(row, "tick_size", "tickSize", default=1.0) / 10 ** toNumber(
+        row, "quote_decimals", "quoteDecimals"
+    )
+    return base_per_lot, quote_per_tick
+
+
+class RiskEngine:
+    """
+    Local mark-to-market of open positions.
+
+    Positions live in parallel `array('d')` columns indexed by slot; each
+    wallet keeps running totals (exposure, unrealized PnL, margin) that are
+    adjusted by the delta of every price tick, so pre-trade checks only read
+    a handful of numbers.
+
+    Exposure is in account units. Orders are converted from lots and ticks
+    with each market's lot and tick sizes. Open orders reserve their notional:
+    resting ones as read from KANA with the positions, and just-submitted ones
+    until the market is read again, which happens once they confirm and
+    whenever a watched order fills or is cancelled. Orders that close part of
+    a held position are never counted against the limits.
+    """
+
+    def __init__(
+        self,
+        max_leverage: float = MAX_LEVERAGE,
+        max_position_notional: float = MAX_POSITION_NOTIONAL,
+        max_total_exposure: float = MAX_TOTAL_EXPOSURE,
+    ):
+        self.max_leverage = max_leverage
+        self.max_position_notional = max_position_notional
+        self.max_total_exposure = max_total_exposure
+
+        self.sizes = array("d")
+        self.signs = array("d")  # +1 long, -1 short
+        self.entries = array("d")
+        self.margins = array("d")
+        self.leverages = array("d")
+        self.liquidations = array("d")
+        self.marks = array("d")
+        self.pnls = array("d")
+
+        self._slots: dict[tuple, int] = {}
+        self._owners: list = []
+        self._free: list[int] = []
+        self._market_slots: dict[int, set] = {}
+        self._wallet_slots: dict[str, set] = {}
+
+        self._exposure: dict[str, float] = {}
+        self._market_exposure: dict[tuple, float] = {}
+        self._pnl: dict[str, float] = {}
+        self._margin: dict[str, float] = {}
+        self._balance: dict[str, float] = {}
+        self._reserved: dict[tuple, float] = {}
+        self._reserved_total: dict[str, float] = {}
+        # wallet -> markets whose positions and open orders have been read
+        self._loaded: dict[str, set] = {}
+        self.last_prices: dict[int, float] = {}
+        # market ID -> (base units per lot, quote units per tick)
+        self.market_units: dict[int, tuple[float, float]] = {}
+        self._refreshes: set = set()
+
+    def _add_totals(self, slot: int, factor: float) -> None:
+        wallet, market_id, _ = self._owners[slot]
+        notional = self.sizes[slot] * self.marks[slot] * factor
+        self._exposure[wallet] = self._exposure.get(wallet, 0.0) + notional
+        self._market_exposure[(wallet, market_id)] = (
+            self._market_exposure.get((wallet, market_id), 0.0) + notional
+        )
+        self._pnl[wallet] = self._pnl.get(wallet, 0.0) + self.pnls[slot] * factor
+        self._margin[wallet] = (
+            self._margin.get(wallet, 0.0) + self.margins[slot] * factor
+        )
+
+    def upsert_position(self, wallet: str, position: dict) -> None:
+        wallet = wallet.lower()
+        market_id = position["market_id"]
+        key = (wallet, market_id, position["is_long"])
+        mark = self.last_prices.get(market_id) or position["entry_price"]
+        leverage = max(position["leverage"], 1.0)
+        sign = 1.0 if position["is_long"] else -1.0
+        liquidation = position["liquidation_price"] or (
+            position["entry_price"] * (1 - sign / leverage)
+        )
+        values = (
+            position["size"],
+            sign,
+            position["entry_price"],
+            position["margin"] or position["size"] * position["entry_price"] / leverage,
+            leverage,
+            liquidation,
+            mark,
+            sign * (mark - position["entry_price"]) * position["size"],
+        )
+        columns = (
+            self.sizes,
+            self.signs,
+            self.entries,
+            self.margins,
+            self.leverages,
+            self.liquidations,
+            self.marks,
+            self.pnls,
+        )
+
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._add_totals(slot, -1.0)
+        elif self._free:
+            slot = self._free.pop()
+            self._owners[slot] = key
+        else:
+            slot = len(self.sizes)
+            for column in columns:
+                column.append(0.0)
+            self._owners.append(key)
+
+        for column, value in zip(columns, values):
+            column[slot] = value
+        self._slots[key] = slot
+        self._market_slots.setdefault(market_id, set()).add(slot)
+        self._wallet_slots.setdefault(wallet, set()).add(slot)
+        self._add_totals(slot, 1.0)
+
+    def remove_position(self, wallet: str, market_id: int, is_long: bool) -> None:
+        key = (wallet.lower(), market_id, is_long)
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._add_totals(slot, -1.0)
+        self._market_slots[market_id].discard(slot)
+        self._wallet_slots[key[0]].discard(slot)
+        self._owners[slot] = None
+        self.sizes[slot] = 0.0
+        self._free.append(slot)
+
+    def load_wallet(
+        self,
+        wallet: str,
+        market_ids: list[int],
+        positions: list[dict],
+        balance: float | None = None,
+    ) -> None:
+        """Replace the wallet's positions in the given markets with a fresh set."""
+
+        wallet = wallet.lower()
+        for slot in list(self._wallet_slots.get(wallet, ())):
+            owner = self._owners[slot]
+            if owner[1] in market_ids:
+                self.remove_position(*owner)
+        for market_id in market_ids:
+            # Fresh positions already include what the reservations stood for.
+            self._set_reserved(wallet, market_id, 0.0)
+        self._loaded.setdefault(wallet, set()).update(market_ids)
+        for position in positions:
+            self.upsert_position(wallet, position)
+        if balance is not None:
+            self._balance[wallet] = balance
+
+    def update_price(self, market_id: int, price: float) -> None:
+        """Re-mark every position in a market and fold the deltas into the wallet totals."""
+
+        if price <= 0:
+            return
+        if self.last_prices.get(market_id) != price:
+            state_versions.bump("market", market_id)
+        self.last_prices[market_id] = price
+        for slot in self._market_slots.get(market_id, ()):
+            wallet = self._owners[slot][0]
+            old_notional = self.sizes[slot] * self.marks[slot]
+            old_pnl = self.pnls[slot]
+            self.marks[slot] = price
+            self.pnls[slot] = (
+                self.signs[slot] * (price - self.entries[slot]) * self.sizes[slot]
+            )
+            notional_delta = self.sizes[slot] * price - old_notional
+            self._exposure[wallet] += notional_delta
+            self._market_exposure[(wallet, market_id)] += notional_delta
+            self._pnl[wallet] += self.pnls[slot] - old_pnl
+
+    def position_metrics(self, slot: int) -> dict:
+        wallet, market_id, is_long = self._owners[slot]
+        notional = self.sizes[slot] * self.marks[slot]
+        mark = self.marks[slot]
+        return {
+            "Market ID": market_id,
+            "Side": "long" if is_long else "short",
+            "Size": self.sizes[slot],
+            "Entry Price": self.entries[slot],
+            "Mark Price": mark,
+            "Unrealized PnL": round(self.pnls[slot], 8),
+            "Margin Ratio": (
+                round((self.margins[slot] + self.pnls[slot]) / notional, 6)
+                if notional
+                else None
+            ),
+            "Liquidation Price": self.liquidations[slot],
+            "Liquidation Distance": (
+                round(abs(mark - self.liquidations[slot]) / mark, 6) if mark else None
+            ),
+            "Exposure": round(notional, 8),
+        }
+
+    def wallet_summary(self, wallet: str) -> dict:
+        wallet = wallet.lower()
+        return {
+            "Exposure": round(self._exposure.get(wallet, 0.0), 8),
+            "Unrealized PnL": round(self._pnl.get(wallet, 0.0), 8),
+            "Margin Used": round(self._margin.get(wallet, 0.0), 8),
+            "Reserved By Open Orders": round(self.reserved(wallet), 8),
+            "Available Balance": self._balance.get(wallet),
+            "Positions": [
+                self.position_metrics(slot)
+                for slot in sorted(self._wallet_slots.get(wallet, ()))
+            ],
+        }
+
+    def tracked(self, wallet: str) -> bool:
+        wallet = wallet.lower()
+        return wallet in self._balance or bool(self._loaded.get(wallet))
+
+    def reduces(self, wallet: str, market_id: int, trade_side, reduce_only: bool) -> bool:
+        """Whether an order only closes part of a position the wallet holds on that side."""
+
+        if not reduce_only or trade_side is None:
+            return False
+        slot = self._slots.get((wallet.lower(), market_id, bool(trade_side)))
+        return slot is not None and self.sizes[slot] > 0
+
+    def limited(self, wallet: str) -> bool:
+        """Whether any check needs an order's notional: a limit is set or the balance is known."""
+
+        return bool(
+            self.max_position_notional
+            or self.max_total_exposure
+            or wallet.lower() in self._balance
+        )
+
+    def order_notional(self, market_id: int, size: float, price: float | None) -> float | None:
+        """Notional of an order in account units, or None if the market's units or price are unknown."""
+
+        units = self.market_units.get(market_id)
+        if units is None:
+            return None
+        base_per_lot, quote_per_tick = units
+        if price:
+            price = price * quote_per_tick / base_per_lot
+        else:
+            price = self.last_prices.get(market_id)
+        if not price:
+            return None
+        return size * base_per_lot * price
+
+    def _set_reserved(self, wallet: str, market_id: int, notional: float) -> None:
+        previous = self._reserved.pop((wallet, market_id), 0.0)
+        if notional:
+            self._reserved[(wallet, market_id)] = notional
+        self._reserved_total[wallet] = self._reserved_total.get(wallet, 0.0) + notional - previous
+
+    def reserve(self, wallet: str, market_id: int, notional: float) -> None:
+        wallet = wallet.lower()
+        self._set_reserved(
+            wallet, market_id, self._reserved.get((wallet, market_id), 0.0) + notional
+        )
+
+    def reserved(self, wallet: str, market_id: int | None = None) -> float:
+        wallet = wallet.lower()
+        if market_id is None:
+            return self._reserved_total.get(wallet, 0.0)
+        return self._reserved.get((wallet, market_id), 0.0)
+
+    def orders_notional(
+        self,
+        wallet: str,
+        market_id: int,
+        sizes: list[float],
+        prices: list,
+        trade_sides: list,
+        directions: list,
+    ) -> float:
+        """Notional a batch of orders adds, leaving out the ones that close a held position."""
+
+        return sum(
+            self.order_notional(market_id, size, price) or 0.0
+            for size, price, trade_side, direction in zip(sizes, prices, trade_sides, directions)
+            if not self.reduces(wallet, market_id, trade_side, direction)
+        )
+
+    async def prepare(self, wallet: str, market_id: int) -> None:
+        """Read what a check of an order in this market needs and is missing."""
+
+        if not self.limited(wallet):
+            return
+        if market_id not in self._loaded.get(wallet.lower(), ()):
+            # Held positions and resting orders, so closes and open orders are counted right.
+            await self.refresh(wallet, market_id)
+        calls = {}
+        if market_id not in self.market_units:
+            calls["info"] = asyncio.to_thread(fetchMarketInfo, market_id)
+        if not self.last_prices.get(market_id):
+            calls["price"] = asyncio.to_thread(getMarketPrice, market_id)
+        results = dict(zip(calls, await asyncio.gather(*calls.values())))
+        info = results.get("info")
+        if info is not None and "Error" not in info:
+            self.market_units[market_id] = marketUnits(apiData(info, "getMarketInfo"), market_id)
+        price = results.get("price")
+        if price is not None and "Error" not in price:
+            self.update_price(market_id, markPrice(apiData(price, "Market Price")))
+
+    def check_order(
+        self,
+        wallet: str,
+        market_id: int,
+        size: float,
+        price: float | None,
+        leverage: float,
+        pending_notional: float = 0.0,
+        trade_side: bool | None = None,
+        reduce_only: bool = False,
+    ) -> str | None:
+        """
+        Constant-time pre-trade check.
+
+        Args:
+            trade_side (bool | None): True for long, False for short.
+            reduce_only (bool): The order closes part of a position on that side,
+                which is KANA's direction=True. It passes when such a position
+                is held, since it can only lower exposure.
+
+        Returns:
+            str | None: The reason the order is rejected, or None if it passes.
+        """
+
+        wallet = wallet.lower()
+        if self.reduces(wallet, market_id, trade_side, reduce_only):
+            return None
+        if leverage <= 0:
+            return "Leverage must be positive."
+        if self.max_leverage and leverage > self.max_leverage:
+            return f"Leverage {leverage} exceeds the limit of {self.max_leverage}."
+
+        if not self.limited(wallet):
+            return None
+        notional = self.order_notional(market_id, size, price)
+        if notional is None:
+            return (
+                f"No price or lot and tick sizes known for market {market_id}, "
+                "so the order cannot be checked against the risk limits."
+            )
+        notional += pending_notional
+
+        if self.max_position_notional and (
+            self._market_exposure.get((wallet, market_id), 0.0)
+            + self.reserved(wallet, market_id)
+            + notional
+            > self.max_position_notional
+        ):
+            return (
+                f"Position notional in market {market_id} would exceed "
+                f"{self.max_position_notional}."
+            )
+        if self.max_total_exposure and (
+            self._exposure.get(wallet, 0.0) + self.reserved(wallet) + notional
+            > self.max_total_exposure
+        ):
+            return f"Total exposure would exceed {self.max_total_exposure}."
+
+        balance = self._balance.get(wallet)
+        if balance is not None and notional / leverage > balance:
+            return (
+                f"Required margin {round(notional / leverage, 8)} exceeds the "
+                f"available balance {balance}."
+            )
+        return None
+
+    def check_orders(
+        self,
+        wallet: str,
+        market_id: int,
+        sizes: list[float],
+        prices: list[float],
+        leverages: list[float],
+        trade_sides: list | None = None,
+        directions: list | None = None,
+        released: float = 0.0,
+    ) -> str | None:
+        """
+        Check a batch of orders in one market, accumulating their notional.
+
+        released is notional the same batch frees first, such as the resting
+        orders it cancels.
+        """
+
+        trade_sides = trade_sides or [None] * len(sizes)
+        directions = directions or [False] * len(sizes)
+        pending = -released
+        for size, price, leverage, trade_side, direction in zip(
+            sizes, prices, leverages, trade_sides, directions
+        ):
+            rejection = self.check_order(
+                wallet,
+                market_id,
+                size,
+                price,
+                leverage,
+                pending_notional=pending,
+                trade_side=trade_side,
+                reduce_only=direction,
+            )
+            if rejection:
+                return rejection
+            if not self.reduces(wallet, market_id, trade_side, direction):
+                pending += self.order_notional(market_id, size, price) or 0.0
+        return None
+
+    def resting_notional(self, market_id: int, orders: list[dict]) -> float:
+        """Notional of a market's open orders, leaving out the ones that close a position."""
+
+        return sum(
+            self.order_notional(market_id, order["size"], order["price"]) or 0.0
+            for order in orders
+            if not order["direction"]
+        )
+
+    async def sync(self, wallet: str, market_ids: list[int]) -> None:
+        """Load a wallet's positions, open orders, balance and market prices from KANA."""
+
+        # orderReconciler places orders, which import this module.
+        from SambuAgent.SambuTools.orderReconciler import parseOpenOrders
+
+        calls = [asyncio.to_thread(getNetProfileBalance, wallet)]
+        for market_id in market_ids:
+            calls += [
+                asyncio.to_thread(getMarketPrice, market_id),
+                asyncio.to_thread(getPositions, market_id, wallet),
+                asyncio.to_thread(getOrdersFromContract, market_id, wallet),
+                # Lot and tick sizes do not change; read them once per market.
+                asyncio.to_thread(fetchMarketInfo, market_id)
+                if market_id not in self.market_units
+                else asyncio.sleep(0),
+            ]
+        results = await asyncio.gather(*calls)
+
+        positions = []
+        open_orders = {}
+        for index, market_id in enumerate(market_ids):
+            price, market_positions, orders, info = results[1 + index * 4 : 5 + index * 4]
+            for response in (price, market_positions, orders):
+                if "Error" in response:
+                    raise RuntimeError(response["Error"])
+            if info is not None and "Error" not in info:
+                self.market_units[market_id] = marketUnits(
+                    apiData(info, "getMarketInfo"), market_id
+                )
+            self.update_price(market_id, markPrice(apiData(price, "Market Price")))
+            for position in parsePositions(apiData(market_positions, "Positions")):
+                position["market_id"] = market_id
+                positions.append(position)
+            open_orders[market_id] = parseOpenOrders(
+                apiData(orders, "Open Orders From Contract")
+            )
+
+        balance = None
+        if "Error" not in results[0]:
+            net_balance = apiData(results[0], "Net Profile Balance")
+            if isinstance(net_balance, dict):
+                balance = toNumber(net_balance, "balance", "netBalance")
+            else:
+                balance = toNumber({"balance": net_balance}, "balance")
+
+        self.load_wallet(wallet, market_ids, positions, balance)
+        for market_id, orders in open_orders.items():
+            self.reserve(wallet, market_id, self.resting_notional(market_id, orders))
+
+    async def refresh(self, wallet: str, market_id: int) -> None:
+        try:
+            await self.sync(wallet, [market_id])
+        except Exception as e:
+            logger.warning("Risk refresh failed for %s in market %s: %s", wallet, market_id, e)
+
+    def refresh_later(self, wallet: str, market_id: int) -> None:
+        """Re-read a tracked wallet's positions and open orders in a market, in the background."""
+
+        if not self.tracked(wallet):
+            return
+        task = asyncio.get_running_loop().create_task(self.refresh(wallet, market_id))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+
+risk_engine = RiskEngine()
+
+
+async def syncRiskPositions(wallet_address: str, market_ids: list[int]) -> dict:
+    """
+    Load a wallet's positions, balance and market prices into the local risk engine.
+
+    Args:
+        wallet_address (str): The wallet address.
+        market_ids (list[int]): IDs of the markets to load.
+
+    Returns:
+        dict: A dictionary containing the wallet's risk summary.
+    """
+
+    try:
+        await risk_engine.sync(wallet_address, market_ids)
+        return {"Risk Summary": risk_engine.wallet_summary(wallet_address)}
+
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def getRiskSummary(wallet_address: str) -> dict:
+    """
+    Get exposure, margin ratio and liquidation distance of a wallet's tracked positions.
+
+    Args:
+        wallet_address (str): The wallet address.
+
+    Returns:
+        dict: A dictionary containing the wallet's risk summary.
+    """
+
+    return {"Risk Summary": risk_engine.wallet_summary(wallet_address)}
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.chainRegistry import chainRegistry
+
+load_dotenv()
+
+
+PROBE_TIMEOUT_SECONDS = float(os.environ.get("RPC_PROBE_TIMEOUT", "3"))
+PROBE_CONCURRENCY = int(os.environ.get("RPC_PROBE_CONCURRENCY", "16"))
+PROBE_INTERVAL_SECONDS = float(os.environ.get("RPC_PROBE_INTERVAL", "60"))
+# Weight of the newest probe in the rolling latency and success averages.
+SMOOTHING = float(os.environ.get("RPC_PROBE_SMOOTHING", "0.3"))
+
+CHAIN_ID_REQUEST = {"jsonrpc": "2.0", "method": "eth_chainId", "params": [], "id": 1}
+
+
+def probeable(url: str) -> bool:
+    """Plain HTTP(S) endpoints without an API key placeholder."""
+
+    return url.startswith(("http://", "https://")) and "${" not in url
+
+
+class EndpointScore:
+    __slots__ = (
+        "url",
+        "latency",
+        "success_rate",
+        "probes",
+        "failures",
+        "last_error",
+        "last_probed",
+    )
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None
+        self.success_rate = None
+        self.probes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_probed = 0.0
+
+    def update(self, ok: bool, latency: float, error: str | None = None) -> None:
+        self.probes += 1
+        self.last_probed = time.time()
+        self.last_error = error
+        if not ok:
+            self.failures += 1
+        success = 1.0 if ok else 0.0
+        if self.success_rate is None:
+            self.success_rate = success
+        else:
+            self.success_rate += SMOOTHING * (success - self.success_rate)
+        if ok:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += SMOOTHING * (latency - self.latency)
+
+    @property
+    def score(self) -> float:
+        """Expected seconds per successful call; lower is better."""
+
+        if not self.success_rate or self.latency is None:
+            return float("inf")
+        return self.latency / self.success_rate
+
+    def describe(self) -> dict:
+        return {
+            "URL": self.url,
+            "Latency (s)": round(self.latency, 4) if self.latency is not None else None,
+            "Success Rate": round(self.success_rate or 0.0, 3),
+            "Score": round(self.score, 4) if self.score != float("inf") else None,
+            "Probes": self.probes,
+            "Failures": self.failures,
+            "Last Error": self.last_error,
+        }
+
+
+class RpcProber:
+    """
+    Measure and rank RPC endpoints of the chains in the registry.
+
+    Each probe is an `eth_chainId` call; an endpoint only counts as healthy if
+    it answers in time with the chain ID it is listed under. Scores are
+    rolling averages, so one slow answer does not bury a good endpoint.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = PROBE_CONCURRENCY,
+        timeout: float = PROBE_TIMEOUT_SECONDS,
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.scores: dict[str, EndpointScore] = {}
+        self.endpoints: dict[int, list[str]] = {}
+        self.watched: set[int] = set()
+        self._monitor = None
+
+    async def probe(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, chain_id: int, url: str
+    ) -> EndpointScore:
+        score = self.scores.get(url)
+        if score is None:
+            score = self.scores[url] = EndpointScore(url)
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                response = await client.post(url, json=CHAIN_ID_REQUEST)
+                latency = time.perf_counter() - started_at
+                response.raise_for_status()
+                reported = int(response.json()["result"], 16)
+                if reported != chain_id:
+                    score.update(False, latency, f"Reports chain {reported}")
+                else:
+                    score.update(True, latency)
+            except Exception as e:
+                score.update(False, time.perf_counter() - started_at, f"{type(e).__name__}: {e}")
+        return score
+
+    async def probe_urls(self, chain_id: int, urls: list[str]) -> list[EndpointScore]:
+        """Probe the given endpoints for a chain with bounded concurrency."""
+
+        urls = [url for url in dict.fromkeys(urls) if probeable(url)]
+        self.endpoints[chain_id] = urls
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return list(
+                await asyncio.gather(
+                    *(self.probe(client, semaphore, chain_id, url) for url in urls)
+                )
+            )
+
+    async def probe_chain(self, chain_id: int) -> list[EndpointScore]:
+        chain = chainRegistry().find(chain_id)
+        if chain is None:
+            raise ValueError(f"No chain with ID {chain_id}.")
+        return await self.probe_urls(chain_id, chain["rpc"])
+
+    def best(self, chain_id: int, count: int = 3) -> list[EndpointScore]:
+        scores = [self.scores[url] for url in self.endpoints.get(chain_id, ()) if url in self.scores]
+        ranked = sorted(scores, key=lambda score: score.score)
+        return [score for score in ranked if score.score != float("inf")][:count]
+
+    def fresh(self, chain_id: int, max_age: float = PROBE_INTERVAL_SECONDS) -> bool:
+        urls = self.endpoints.get(chain_id)
+        if not urls:
+            return False
+        now = time.time()
+        return all(
+            url in self.scores and now - self.scores[url].last_probed < max_age for url in urls
+        )
+
+    async def run(self, interval: float = PROBE_INTERVAL_SECONDS) -> None:
+        while self.watched:
+            for chain_id in sorted(self.watched):
+                try:
+                    await self.probe_chain(chain_id)
+                except Exception as e:
+                    print(f"Error probing chain {chain_id}: {e}")
+            await asyncio.sleep(interval)
+
+    def ensure_monitor(self, interval: float = PROBE_INTERVAL_SECONDS) -> None:
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self.run(interval))
+
+
+rpc_prober = RpcProber()
+
+
+async def getBestRpcEndpoints(chain_id: int, count: int) -> dict:
+    """
+    Rank a chain's RPC endpoints by measured latency and reachability.
+
+    Args:
+        chain_id (int): The chain ID, e.g. 1 for Ethereum Mainnet.
+        count (int): How many endpoints to return.
+
+    Returns:
+        dict: A dictionary containing the best endpoints, fastest reliable first.
+    """
+
+    try:
+        chain_id = int(chain_id)
+        if not rpc_prober.fresh(chain_id):
+            await rpc_prober.probe_chain(chain_id)
+        probed = rpc_prober.endpoints.get(chain_id, [])
+        return {
+            "Best RPC Endpoints": [score.describe() for score in rpc_prober.best(chain_id, count or 3)],
+            "Endpoints Probed": len(probed),
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+async def watchRpcEndpoints(chain_ids: list[int]) -> dict:
+    """
+    Keep probing the RPC endpoints of chains in the background so rankings stay current.
+
+    Args:
+        chain_ids (list[int]): The chain IDs to watch.
+
+    Returns:
+        dict: A dictionary containing the chains now being watched.
+    """
+
+    try:
+        for chain_id in chain_ids:
+            if chainRegistry().find(int(chain_id)) is None:
+                return {"Error": f"No chain with ID {chain_id}."}
+        rpc_prober.watched.update(int(chain_id) for chain_id in chain_ids)
+        rpc_prober.ensure_monitor()
+        return {"Watched Chains": sorted(rpc_prober.watched)}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
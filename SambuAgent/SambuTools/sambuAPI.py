@@ -2,6 +2,7 @@ import requests, os, json
 from pathlib import Path
 
 from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
 
 from aptos_sdk.async_client import FaucetClient, RestClient
 from aptos_sdk.transactions import (
@@ -14,6 +15,10 @@ from aptos_sdk.bcs import Serializer
 
 from dotenv import load_dotenv
 
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+from SambuAgent.SambuTools.chainRegistry import chainRegistry
+
 load_dotenv("../.env")
 
 
@@ -23,8 +28,8 @@ USER_ADDRESS = f"{os.environ.get('WALLET_ADDRESS')}"
 APTOS_URL = f"{os.environ.get('APTOS_BASE_URL')}"
 ASSET_TYPE = "0x1::aptos_coin::AptosCoin"
 
-NODE_URL = "https://fullnode.devnet.aptoslabs.com/v1"
-FAUCET_URL = "https://faucet.devnet.aptoslabs.com"
+NODE_URL = os.environ.get("APTOS_NODE_URL", "https://fullnode.devnet.aptoslabs.com/v1")
+FAUCET_URL = os.environ.get("APTOS_FAUCET_URL", "https://faucet.devnet.aptoslabs.com")
 
 rest_client = RestClient(NODE_URL)
 faucet_client = FaucetClient(FAUCET_URL, rest_client)
@@ -32,9 +37,9 @@ faucet_client = FaucetClient(FAUCET_URL, rest_client)
 
 def getChainIdsAndData() -> dict:
     try:
-        ChainIDs = list()
-        with open(Path(__file__).parent.joinpath("chains_mini.json"), "r") as file:
-            data = json.load(file)
+        registry = chainRegistry()
+        ChainIDs = registry.chain_ids()
+        data = registry.records()
 
         repsonse = {"ChainIds": ChainIDs, "Chains Data": data}
 
@@ -140,15 +145,19 @@ async def signAndSendTransaction(sender_address: str, amount: int) -> dict:
             ],
         )
 
-        signed_transaction = await rest_client.create_bcs_signed_transaction(
-            account.address(),  # Account with the private key
-            TransactionPayload(entry_function),  # The payload from our transaction
-            sequence_number=sequence_number,  # Use the same sequence number as before
-        )
+        with span("sign"):
+            signed_transaction = await rest_client.create_bcs_signed_transaction(
+                account.address(),  # Account with the private key
+                TransactionPayload(entry_function),  # The payload from our transaction
+                sequence_number=sequence_number,  # Use the same sequence number as before
+            )
 
-        tx_hash = await rest_client.submit_bcs_transaction(signed_transaction)
+        with span("submit"):
+            tx_hash = await rest_client.submit_bcs_transaction(signed_transaction)
+        recordSubmission(tx_hash)
 
-        await rest_client.wait_for_transaction(tx_hash)
+        with span("confirm"):
+            await rest_client.wait_for_transaction(tx_hash)
 
         # Get the transaction details to check its status
         transaction_details = await rest_client.transaction_by_hash(tx_hash)
@@ -177,7 +186,7 @@ async def fundAccount(wallet_address: str, amount: int) -> dict:
 
 
 async def getAccountBalance(wallet_address: str) -> dict:
-    balance = await rest_client.account_balance(Account.load_key(wallet_address))
+    balance = await rest_client.account_balance(AccountAddress.from_str(wallet_address))
 
     return {"Balance in Octas": balance}
 
@@ -196,9 +205,10 @@ def fetchMarketInfo(market_id: int) -> dict:
     try:
         params = {"marketId": market_id}
         headers = {"x-api-key": API_KEY}
-        response = requests.get(
-            f"{BASE_URL}/getMarketInfo", params=params, headers=headers
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getMarketInfo", params=params, headers=headers
+            )
         response.raise_for_status()
         get_market_info = response.json()
         return {"getMarketInfo": get_market_info}
@@ -210,9 +220,10 @@ def perpMarketInfo(market_id: int) -> dict:
     try:
         params = {"marketId": market_id}
         headers = {"x-api-key": API_KEY}
-        response = requests.get(
-            f"{BASE_URL}/getPerpetualAssetsInfo", params=params, headers=headers
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getPerpetualAssetsInfo", params=params, headers=headers
+            )
         response.raise_for_status()
         perp_market_info = response.json()
         return {"Perp market Info": perp_market_info}
@@ -225,10 +236,11 @@ def getWalletBalance(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{APTOS_URL}/accounts/{USER_ADDRESS}/balance/{ASSET_TYPE}",
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{APTOS_URL}/accounts/{wallet_address}/balance/{ASSET_TYPE}",
+                headers=headers,
+            )
         response.raise_for_status()
         walletBalance = response.json()
         return {"Wallet Balance": walletBalance}
@@ -241,11 +253,12 @@ def getWalletAptBalance(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getAccountAptBalance",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getAccountAptBalance",
+                params=params,
+                headers=headers,
+            )
 
         response.raise_for_status()
         walletAptosBalance = response.json()
@@ -278,11 +291,12 @@ def getProfileAddress(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getProfileAddress",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getProfileAddress",
+                params=params,
+                headers=headers,
+            )
 
         response.raise_for_status()
         profileAddress = response.json()
@@ -296,11 +310,12 @@ def getNetProfileBalance(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getNetProfileBalance",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getNetProfileBalance",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         netProfileBalance = response.json()
         return {"Net Profile Balance": netProfileBalance}
@@ -313,11 +328,12 @@ def getTradeHistory(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getTradeHistory",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getTradeHistory",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         tradeHistory = response.json()
         return {"Trade History": tradeHistory}
@@ -330,11 +346,12 @@ def getMarketPrice(market_id: int) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id}
 
-        response = requests.get(
-            f"{BASE_URL}/getMarketPrice",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getMarketPrice",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         marketPrice = response.json()
         return {"Market Price": marketPrice}
@@ -347,11 +364,12 @@ def getLastExecutedPrice(market_id: int) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id}
 
-        response = requests.get(
-            f"{BASE_URL}/getLastPlacedPrice",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getLastPlacedPrice",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         marketPrice = response.json()
         return {"Market Price": marketPrice}
@@ -364,11 +382,12 @@ def getAllOpenOrderIds(market_id: int, wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getAllOpenOrderIds",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getAllOpenOrderIds",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         openOrderIds = response.json()
         return {"Open Order IDs": openOrderIds}
@@ -381,11 +400,12 @@ def getPositions(market_id: int, wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getPositions",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getPositions",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         positons = response.json()
         return {"Positions": positons}
@@ -394,15 +414,27 @@ def getPositions(market_id: int, wallet_address: str) -> dict:
 
 
 def getFills(market_id: int, wallet_address: str) -> dict:
+    """
+    Get the fills of a wallet's orders in a market.
+
+    Args:
+        market_id (int): The market ID.
+        wallet_address (str): The wallet address.
+
+    Returns:
+        dict: A dictionary containing the fills.
+    """
+
     try:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getFills",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getFills",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         fills = response.json()
         return {"Fills": fills}
@@ -411,15 +443,27 @@ def getFills(market_id: int, wallet_address: str) -> dict:
 
 
 def getOrdersFromContract(market_id: int, wallet_address: str) -> dict:
+    """
+    Get a wallet's open orders in a market, with price and size, as stored in the contract.
+
+    Args:
+        market_id (int): The market ID.
+        wallet_address (str): The wallet address.
+
+    Returns:
+        dict: A dictionary containing the open orders.
+    """
+
     try:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getOpenOrdersFromContract",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getOpenOrdersFromContract",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         open_orders_from_contract = response.json()
         return {"Open Orders From Contract": open_orders_from_contract}
@@ -428,15 +472,27 @@ def getOrdersFromContract(market_id: int, wallet_address: str) -> dict:
 
 
 def getOrdersStatusById(market_id: int, order_id: str) -> dict:
+    """
+    Get the status of one order.
+
+    Args:
+        market_id (int): The market ID.
+        order_id (str): The order ID.
+
+    Returns:
+        dict: A dictionary containing the order status.
+    """
+
     try:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "orderId": order_id}
 
-        response = requests.get(
-            f"{BASE_URL}/fetchOrderStatusById",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/fetchOrderStatusById",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         order_status_by_id = response.json()
         return {"Order Status By Id": order_status_by_id}
@@ -459,11 +515,12 @@ def getFundingHistory(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getFundingHistory",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getFundingHistory",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         funding_history = response.json()
         return {"Funding History": funding_history}
@@ -476,11 +533,12 @@ def getPositionsFromContract(market_id: int, wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"marketId": market_id, "userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getPositionsFromContract",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getPositionsFromContract",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         open_orders_from_contract = response.json()
         return {"Open Orders From Contract": open_orders_from_contract}
@@ -492,9 +550,10 @@ def getAllTrades(market_id: int) -> dict:
     try:
         params = {"marketId": market_id}
         headers = {"x-api-key": API_KEY}
-        response = requests.get(
-            f"{BASE_URL}/getAllTrades", params=params, headers=headers
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getAllTrades", params=params, headers=headers
+            )
         response.raise_for_status()
         get_all_trades = response.json()
         return {"Get All Trades": get_all_trades}
@@ -507,38 +566,14 @@ def getDepositAndWithdrawHistory(wallet_address: str) -> dict:
         headers = {"x-api-key": API_KEY}
         params = {"userAddress": wallet_address}
 
-        response = requests.get(
-            f"{BASE_URL}/getDepositAndWithdrawHistory",
-            params=params,
-            headers=headers,
-        )
+        with span("http_fetch"):
+            response = requests.get(
+                f"{BASE_URL}/getDepositAndWithdrawHistory",
+                params=params,
+                headers=headers,
+            )
         response.raise_for_status()
         depositAndWithdrawHistory = response.json()
         return {"Deposit And Withdraw History": depositAndWithdrawHistory}
     except requests.exceptions.RequestException as error:
         return {"Error": f"An error occurred:, {error}"}
-
-
-def placeMarketOrder(
-    market_id: str, trade_side: bool, direction: bool, size: int, leverage: int
-) -> dict:
-    try:
-        headers = {"x-api-key": API_KEY}
-        params = {
-            "marketId": market_id,
-            "tradeSide": trade_side,
-            "direction": direction,
-            "size": size,
-            "leverage": leverage,
-        }
-
-        response = requests.get(
-            f"{BASE_URL}/placeMarketOrder",
-            params=params,
-            headers=headers,
-        )
-        response.raise_for_status()
-        marketOrder = response.json()
-        return {"Market Order": marketOrder}
-    except requests.exceptions.RequestException as error:
-        return {"Error": f"An error occurred:, {error}"}
@@ -0,0 +1,445 @@
+import asyncio
+import math
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.sambuAPI import getAllTrades, getMarketPrice
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, markPrice, toNumber
+
+load_dotenv()
+
+
+# Candle sizes kept for every market, in seconds.
+RESOLUTIONS = (60, 300, 900, 3600, 14400, 86400)
+MAX_SAMPLES = int(os.environ.get("TIMESERIES_MAX_SAMPLES", "200000"))
+MAX_CANDLES = int(os.environ.get("TIMESERIES_MAX_CANDLES", "5000"))
+POLL_INTERVAL_SECONDS = float(os.environ.get("TIMESERIES_POLL_INTERVAL", "15"))
+# Directory for the sample files; empty keeps the store in memory. A file is
+# rewritten with the samples still held in memory once it has grown past
+# MAX_SAMPLES records since the last rewrite.
+STORE_DIR = os.environ.get("TIMESERIES_DIR", "")
+
+# Each persisted sample is three doubles: timestamp, price, size.
+RECORD_WIDTH = 3
+
+
+def toSeconds(value: float) -> float:
+    """KANA timestamps come in seconds or milliseconds."""
+
+    return value / 1000 if value > 1e12 else value
+
+
+class CandleSeries:
+    """OHLCV candles of one resolution in parallel typed arrays, updated per sample."""
+
+    def __init__(self, resolution: int, max_candles: int = MAX_CANDLES):
+        self.resolution = resolution
+        self.max_candles = max_candles
+        self.starts = array("d")
+        self.opens = array("d")
+        self.highs = array("d")
+        self.lows = array("d")
+        self.closes = array("d")
+        self.volumes = array("d")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, timestamp: float, price: float, size: float) -> None:
+        start = timestamp - timestamp % self.resolution
+        if self.starts and self.starts[-1] == start:
+            index = len(self.starts) - 1
+        elif not self.starts or start > self.starts[-1]:
+            self._insert(len(self.starts), start, price)
+            index = len(self.starts) - 1
+        else:
+            # A late sample for an older bucket.
+            index = bisect_left(self.starts, start)
+            if index == len(self.starts) or self.starts[index] != start:
+                self._insert(index, start, price)
+            self.highs[index] = max(self.highs[index], price)
+            self.lows[index] = min(self.lows[index], price)
+            self.volumes[index] += size
+            return
+
+        self.highs[index] = max(self.highs[index], price)
+        self.lows[index] = min(self.lows[index], price)
+        self.closes[index] = price
+        self.volumes[index] += size
+
+        if len(self.starts) > self.max_candles:
+            drop = len(self.starts) - self.max_candles
+            for column in self.columns():
+                del column[:drop]
+
+    def _insert(self, index: int, start: float, price: float) -> None:
+        for column, value in zip(self.columns(), (start, price, price, price, price, 0.0)):
+            column.insert(index, value)
+
+    def columns(self) -> tuple:
+        return (self.starts, self.opens, self.highs, self.lows, self.closes, self.volumes)
+
+    def range(self, start: float = 0, end: float = 0, limit: int = 100) -> list[dict]:
+        low = bisect_left(self.starts, start) if start else 0
+        high = bisect_right(self.starts, end) if end else len(self.starts)
+        low = max(low, high - limit)
+        return [
+            {
+                "Time": int(self.starts[index]),
+                "Open": self.opens[index],
+                "High": self.highs[index],
+                "Low": self.lows[index],
+                "Close": self.closes[index],
+                "Volume": self.volumes[index],
+            }
+            for index in range(low, high)
+        ]
+
+
+class MarketSeries:
+    """
+    Raw price and trade samples of one market plus candles at every resolution.
+
+    Trades build the OHLCV candles. Mid-price samples, stored with size 0,
+    build a separate set of price candles, used only when no trades were
+    recorded.
+    """
+
+    def __init__(self, market_id: int, store_dir: str = STORE_DIR):
+        self.market_id = market_id
+        self.timestamps = array("d")
+        self.prices = array("d")
+        self.sizes = array("d")
+        self.candles = {resolution: CandleSeries(resolution) for resolution in RESOLUTIONS}
+        self.price_candles = {
+            resolution: CandleSeries(resolution) for resolution in RESOLUTIONS
+        }
+        self.last_trade_time = 0.0
+        # Keys of the trades recorded at last_trade_time, see tradeKey.
+        self.last_trade_keys: set = set()
+        # Records in the sample file, including ones no longer held in memory.
+        self.persisted = 0
+        self.path = (
+            os.path.join(store_dir, f"market_{market_id}.samples") if store_dir else None
+        )
+        if self.path and os.path.exists(self.path):
+            self._load()
+
+    def _load(self) -> None:
+        records = array("d")
+        with open(self.path, "rb") as handle:
+            records.frombytes(handle.read())
+        usable = len(records) - len(records) % RECORD_WIDTH
+        for offset in range(0, usable, RECORD_WIDTH):
+            timestamp, price, size = records[offset : offset + RECORD_WIDTH]
+            self._add(timestamp, price, size)
+            if size:
+                if timestamp > self.last_trade_time:
+                    self.last_trade_time = timestamp
+                    self.last_trade_keys = set()
+                if timestamp == self.last_trade_time:
+                    # Trade IDs are not stored, so a reloaded trade is known by price and size.
+                    self.last_trade_keys.add((price, size))
+        self.persisted = usable // RECORD_WIDTH
+        if self.persisted > len(self.timestamps) or usable != len(records):
+            # Older samples were dropped from memory, or the last write was cut short.
+            self._rewrite()
+
+    def _rewrite(self) -> None:
+        """Replace the sample file with the samples held in memory."""
+
+        records = array("d")
+        for sample in zip(self.timestamps, self.prices, self.sizes):
+            records.extend(sample)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as handle:
+            records.tofile(handle)
+        os.replace(temporary, self.path)
+        self.persisted = len(self.timestamps)
+
+    def _add(self, timestamp: float, price: float, size: float) -> None:
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            index = bisect_right(self.timestamps, timestamp)
+            self.timestamps.insert(index, timestamp)
+            self.prices.insert(index, price)
+            self.sizes.insert(index, size)
+        else:
+            self.timestamps.append(timestamp)
+            self.prices.append(price)
+            self.sizes.append(size)
+        candles = self.candles if size else self.price_candles
+        for series in candles.values():
+            series.add(timestamp, price, size)
+
+        if len(self.timestamps) > MAX_SAMPLES:
+            drop = len(self.timestamps) - MAX_SAMPLES // 2
+            del self.timestamps[:drop]
+            del self.prices[:drop]
+            del self.sizes[:drop]
+
+    def record(self, samples: list[tuple[float, float, float]]) -> int:
+        for timestamp, price, size in samples:
+            self._add(timestamp, price, size)
+        if self.path and samples:
+            with open(self.path, "ab") as handle:
+                array("d", [value for sample in samples for value in sample]).tofile(handle)
+            self.persisted += len(samples)
+            if self.persisted > MAX_SAMPLES:
+                self._rewrite()
+        return len(samples)
+
+    def record_trades(self, rows) -> int:
+        """
+        Record trades not seen before; returns how many were new.
+
+        Trades older than the last one recorded are skipped. Trades sharing
+        its timestamp are told apart by trade ID, or by price and size when
+        KANA gives none, so a trade reported in a later poll is still kept.
+        """
+
+        samples = []
+        keys = {}
+        for row in rows if isinstance(rows, list) else []:
+            if not isinstance(row, dict):
+                continue
+            timestamp = toSeconds(toNumber(row, "timestamp", "time", "ts", "created_at"))
+            price = toNumber(row, "price", "execution_price")
+            size = toNumber(row, "size", "quantity")
+            if timestamp < self.last_trade_time or price <= 0:
+                continue
+            trade_id = row.get("trade_id", row.get("tradeId", row.get("id")))
+            key = (price, size) if trade_id is None else str(trade_id)
+            if timestamp == self.last_trade_time and (
+                key in self.last_trade_keys or (price, size) in self.last_trade_keys
+            ):
+                continue
+            if trade_id is not None and key in keys.setdefault(timestamp, set()):
+                continue
+            keys.setdefault(timestamp, set()).add(key)
+            samples.append((timestamp, price, size))
+        samples.sort()
+        if samples:
+            latest = samples[-1][0]
+            if latest > self.last_trade_time:
+                self.last_trade_time = latest
+                self.last_trade_keys = set()
+            self.last_trade_keys |= keys[latest]
+        return self.record(samples)
+
+    def record_price(self, price: float, timestamp: float | None = None) -> None:
+        if price > 0:
+            self.record([(timestamp or time.time(), price, 0.0)])
+
+    def candle_series(self, resolution: int) -> tuple[CandleSeries, str]:
+        """Trade candles of a resolution, or price candles if no trades were recorded."""
+
+        series = self.candles[resolution]
+        if len(series):
+            return series, "trades"
+        return self.price_candles[resolution], "mid prices"
+
+    def closes(self, resolution: int, period: int) -> tuple[list[float], str]:
+        series, source = self.candle_series(resolution)
+        if period <= 0:
+            return [], source
+        return list(series.closes[-period:]), source
+
+
+class TimeSeriesStore:
+    """
+    Local history of prices and trades per market.
+
+    Samples come from the recorder task (and any other component calling
+    `record_price`), so range queries and indicators are served without a
+    KANA request.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR):
+        self.store_dir = store_dir
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        self.markets: dict[int, MarketSeries] = {}
+        self.recorded: set[int] = set()
+        self._recorder = None
+
+    def series(self, market_id: int) -> MarketSeries:
+        series = self.markets.get(market_id)
+        if series is None:
+            series = self.markets[market_id] = MarketSeries(market_id, self.store_dir)
+        return series
+
+    def record_price(self, market_id: int, price: float) -> None:
+        self.series(market_id).record_price(price)
+
+    async def poll(self, market_id: int) -> dict:
+        trades, price = await asyncio.gather(
+            asyncio.to_thread(getAllTrades, market_id),
+            asyncio.to_thread(getMarketPrice, market_id),
+        )
+        series = self.series(market_id)
+        new_trades = 0
+        if "Error" not in trades:
+            new_trades = series.record_trades(apiData(trades, "Get All Trades"))
+        if "Error" not in price:
+            series.record_price(markPrice(apiData(price, "Market Price")))
+        return {"New Trades": new_trades, "Errors": [r for r in (trades, price) if "Error" in r]}
+
+    async def run(self, poll_interval: float = POLL_INTERVAL_SECONDS) -> None:
+        while self.recorded:
+            for market_id, result in zip(
+                sorted(self.recorded),
+                await asyncio.gather(*(self.poll(market_id) for market_id in sorted(self.recorded))),
+            ):
+                if result["Errors"]:
+                    print(f"Error recording market {market_id}: {result['Errors']}")
+            await asyncio.sleep(poll_interval)
+
+    def ensure_recorder(self, poll_interval: float = POLL_INTERVAL_SECONDS) -> None:
+        if self._recorder is None or self._recorder.done():
+            self._recorder = asyncio.create_task(self.run(poll_interval))
+
+
+time_series = TimeSeriesStore()
+
+
+def ema(values: list[float], period: int) -> float:
+    alpha = 2 / (period + 1)
+    average = values[0]
+    for value in values[1:]:
+        average = alpha * value + (1 - alpha) * average
+    return average
+
+
+def volatility(closes: list[float], resolution: int) -> tuple[float, float]:
+    """Standard deviation of log returns, per candle and annualized."""
+
+    returns = [
+        math.log(current / previous)
+        for previous, current in zip(closes, closes[1:])
+        if previous > 0 and current > 0
+    ]
+    if len(returns) < 2:
+        return 0.0, 0.0
+    mean = sum(returns) / len(returns)
+    deviation = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+    return deviation, deviation * math.sqrt(365 * 86400 / resolution)
+
+
+async def recordMarketHistory(market_ids: list[int]) -> dict:
+    """
+    Start recording trades and prices of markets into the local time-series store.
+
+    Args:
+        market_ids (list[int]): The IDs of the markets to record.
+
+    Returns:
+        dict: A dictionary containing the first poll result per market.
+    """
+
+    try:
+        market_ids = [int(market_id) for market_id in market_ids]
+        results = await asyncio.gather(*(time_series.poll(market_id) for market_id in market_ids))
+        time_series.recorded.update(market_ids)
+        time_series.ensure_recorder()
+        return {
+            "Recording Markets": sorted(time_series.recorded),
+            "First Poll": dict(zip(market_ids, results)),
+        }
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def getCandles(
+    market_id: int, resolution: int, start_time: int, end_time: int, limit: int
+) -> dict:
+    """
+    Get OHLCV candles of a market from the local time-series store.
+
+    Args:
+        market_id (int): The ID of the market.
+        resolution (int): Candle size in seconds: 60, 300, 900, 3600, 14400 or 86400.
+        start_time (int): Unix time of the first candle, or 0 for no lower bound.
+        end_time (int): Unix time of the last candle, or 0 for no upper bound.
+        limit (int): Maximum number of candles, most recent first kept.
+
+    Returns:
+        dict: A dictionary containing the candles in time order and whether they were built from trades or, when no trades were recorded, from mid prices.
+    """
+
+    if resolution not in RESOLUTIONS:
+        return {"Error": f"Unsupported resolution {resolution}; use one of {list(RESOLUTIONS)}."}
+    series, source = time_series.series(int(market_id)).candle_series(resolution)
+    return {
+        "Candles": series.range(start_time, end_time, limit or 100),
+        "Source": source,
+    }
+
+
+def getPriceHistory(market_id: int, start_time: int, end_time: int, limit: int) -> dict:
+    """
+    Get raw price and trade samples of a market from the local time-series store.
+
+    Args:
+        market_id (int): The ID of the market.
+        start_time (int): Unix time of the first sample, or 0 for no lower bound.
+        end_time (int): Unix time of the last sample, or 0 for no upper bound.
+        limit (int): Maximum number of samples, most recent kept.
+
+    Returns:
+        dict: A dictionary containing the samples in time order; size 0 marks a price sample.
+    """
+
+    series = time_series.series(int(market_id))
+    low = bisect_left(series.timestamps, start_time) if start_time else 0
+    high = bisect_right(series.timestamps, end_time) if end_time else len(series.timestamps)
+    low = max(low, high - (limit or 500))
+    return {
+        "Price History": [
+            {
+                "Time": series.timestamps[index],
+                "Price": series.prices[index],
+                "Size": series.sizes[index],
+            }
+            for index in range(low, high)
+        ]
+    }
+
+
+def getMarketIndicators(market_id: int, resolution: int, period: int) -> dict:
+    """
+    Compute SMA, EMA and volatility of a market's candle closes from the local store.
+
+    Args:
+        market_id (int): The ID of the market.
+        resolution (int): Candle size in seconds: 60, 300, 900, 3600, 14400 or 86400.
+        period (int): Number of most recent candles to use.
+
+    Returns:
+        dict: A dictionary containing the indicators and the number of candles used.
+    """
+
+    if resolution not in RESOLUTIONS:
+        return {"Error": f"Unsupported resolution {resolution}; use one of {list(RESOLUTIONS)}."}
+    if period <= 0:
+        return {"Error": "period must be a positive number of candles."}
+    closes, source = time_series.series(int(market_id)).closes(resolution, period)
+    if not closes:
+        return {
+            "Error": f"No history for market {market_id}; start it with recordMarketHistory."
+        }
+    per_candle, annualized = volatility(closes, resolution)
+    return {
+        "Market Indicators": {
+            "Candles Used": len(closes),
+            "Source": source,
+            "Last Close": closes[-1],
+            "SMA": sum(closes) / len(closes),
+            "EMA": ema(closes, len(closes)),
+            "Volatility": per_candle,
+            "Annualized Volatility": annualized,
+        }
+    }
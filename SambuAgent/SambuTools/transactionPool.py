@@ -0,0 +1,193 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+from aptos_sdk.account import Account
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.collapsePosition import collapsePosition
+
+load_dotenv()
+
+
+MAX_QUEUE_SIZE = int(os.environ.get("TX_POOL_MAX_QUEUE_SIZE", "32"))
+
+
+class TransactionPool:
+    """
+    Run transaction jobs for many accounts in parallel.
+
+    Every account gets its own bounded queue and a single worker, so jobs for
+    the same account are submitted one after another (keeping the on-chain
+    sequence numbers in order) while different accounts never wait on each
+    other. A full queue blocks the caller until the worker catches up.
+    """
+
+    def __init__(self, max_queue_size: int = MAX_QUEUE_SIZE):
+        self.max_queue_size = max_queue_size
+        self._loop = None
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._started_at = time.monotonic()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues and tasks belong to the loop that created them.
+            self._loop = loop
+            self._queues = {}
+            self._workers = {}
+
+    def _queue_for(self, account_key: str) -> asyncio.Queue:
+        self._bind_loop()
+        queue = self._queues.get(account_key)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._queues[account_key] = queue
+            self._workers[account_key] = asyncio.create_task(self._worker(queue))
+        return queue
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            job, future = await queue.get()
+            started_at = time.monotonic()
+            try:
+                result = await job()
+                if isinstance(result, dict) and any(
+                    str(key).startswith("Error") for key in result
+                ):
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                self._failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._busy_seconds += time.monotonic() - started_at
+                queue.task_done()
+
+    async def submit(
+        self, account_key: str, job: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """
+        Queue a job for an account and wait for its result.
+
+        Args:
+            account_key (str): Identifier of the account the job signs with.
+            job (Callable[[], Awaitable[dict]]): Coroutine factory running the transaction.
+
+        Returns:
+            dict: The result returned by the job.
+        """
+
+        queue = self._queue_for(account_key)
+        future = asyncio.get_running_loop().create_future()
+        self._submitted += 1
+        await queue.put((job, future))
+        return await future
+
+    async def run_all(self, jobs: list[tuple[str, Callable[[], Awaitable[dict]]]]) -> list:
+        """
+        Submit many account-tagged jobs and gather their results in order.
+
+        Args:
+            jobs (list[tuple[str, Callable]]): Pairs of account key and job.
+
+        Returns:
+            list: Job results (or raised exceptions) in the order given.
+        """
+
+        return await asyncio.gather(
+            *(self.submit(account_key, job) for account_key, job in jobs),
+            return_exceptions=True,
+        )
+
+    def metrics(self) -> dict:
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        finished = self._completed + self._failed
+        return {
+            "Accounts": len(self._queues),
+            "Queued": sum(queue.qsize() for queue in self._queues.values()),
+            "Submitted": self._submitted,
+            "Completed": self._completed,
+            "Failed": self._failed,
+            "Throughput (tx/s)": round(finished / elapsed, 4),
+            "Average Latency (s)": (
+                round(self._busy_seconds / finished, 4) if finished else 0.0
+            ),
+        }
+
+
+transaction_pool = TransactionPool()
+
+
+def accountKey(private_key: str) -> str:
+    private_key_hex = private_key
+    if private_key_hex.startswith("0x"):
+        private_key_hex = private_key_hex[2:]
+    account = Account.load_key(bytes.fromhex(private_key_hex))
+    return str(account.address())
+
+
+async def collapseAllPositions(private_keys: list[str], market_ids: list[int]) -> dict:
+    """
+    Collapse every position in the given markets across several accounts at once.
+
+    Args:
+        private_keys (list[str]): Private keys of the accounts.
+        market_ids (list[int]): IDs of the markets to collapse for every account.
+
+    Returns:
+        dict: Per-account transaction results and pool metrics.
+    """
+
+    try:
+        jobs = []
+        owners = []
+        for private_key in private_keys:
+            address = accountKey(private_key)
+            for market_id in market_ids:
+                jobs.append(
+                    (
+                        address,
+                        lambda key=private_key, market=market_id: collapsePosition(
+                            key, market
+                        ),
+                    )
+                )
+                owners.append((address, market_id))
+
+        results = await transaction_pool.run_all(jobs)
+
+        collapsed = {}
+        for (address, market_id), result in zip(owners, results):
+            if isinstance(result, Exception):
+                result = {"Error": f"An error occurred:, {result}"}
+            collapsed.setdefault(address, {})[str(market_id)] = result
+
+        return {
+            "Collapse Results": collapsed,
+            "Pool Metrics": transaction_pool.metrics(),
+        }
+
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def getTransactionPoolMetrics() -> dict:
+    """
+    Get throughput and queue metrics of the multi-account transaction pool.
+
+    Returns:
+        dict: A dictionary containing the pool metrics.
+    """
+
+    return {"Transaction Pool Metrics": transaction_pool.metrics()}
@@ -0,0 +1,604 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from SambuAgent.SambuTools.sambuAPI import getMarketPrice
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, markPrice
+from SambuAgent.SambuTools.riskEngine import risk_engine
+from SambuAgent.SambuTools.timeSeries import time_series
+from SambuAgent.SambuTools.collapsePosition import collapsePosition
+from SambuAgent.SambuTools.placeMarketOrder import placeMarketOrder
+from SambuAgent.responseCache import state_versions
+from SambuAgent.telemetry import isErrorResult
+from SambuAgent.toolJobs import current_chat, tool_jobs
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+POLL_INTERVAL_SECONDS = float(os.environ.get("TRIGGER_POLL_INTERVAL", "2"))
+# A trigger whose order keeps failing is re-armed this many times before it is dropped.
+TRIGGER_MAX_ATTEMPTS = int(os.environ.get("TRIGGER_MAX_ATTEMPTS", "3"))
+
+
+class Trigger:
+    __slots__ = (
+        "trigger_id",
+        "private_key",
+        "market_id",
+        "trade_side",
+        "kind",
+        "level",
+        "size",
+        "leverage",
+        "group",
+        "trail_distance",
+        "extreme",
+        "version",
+        "chat_id",
+        "attempts",
+        "firing",
+    )
+
+    def __init__(
+        self,
+        trigger_id: str,
+        private_key: str,
+        market_id: int,
+        trade_side: bool,
+        kind: str,
+        level: float,
+        size: float,
+        leverage: int,
+        group: str | None = None,
+        trail_distance: float = 0.0,
+        chat_id=None,
+    ):
+        self.trigger_id = trigger_id
+        self.private_key = private_key
+        self.market_id = market_id
+        self.trade_side = trade_side
+        self.kind = kind
+        self.level = level
+        self.size = size
+        self.leverage = leverage
+        self.group = group
+        self.trail_distance = trail_distance
+        self.extreme = level + trail_distance if trade_side else level - trail_distance
+        self.version = 0
+        self.chat_id = chat_id
+        self.attempts = 0
+        self.firing = False
+
+    def fires_below(self) -> bool:
+        # Long stops and short take-profits fire when the price falls to the level.
+        return self.trade_side == (self.kind != "take_profit")
+
+    def describe(self) -> dict:
+        return {
+            "Trigger ID": self.trigger_id,
+            "Market ID": self.market_id,
+            "Side": "long" if self.trade_side else "short",
+            "Kind": self.kind,
+            "Level": self.level,
+            "Size": self.size or "entire position",
+            "OCO Group": self.group,
+            "Trail Distance": self.trail_distance or None,
+            "Status": "firing" if self.firing else "pending",
+            "Failed Attempts": self.attempts,
+        }
+
+
+class TriggerEngine:
+    """
+    Client-side stop-loss, take-profit, trailing and OCO triggers.
+
+    Pending levels are kept in two heaps per market: a max-heap of levels that
+    fire when the price drops to them and a min-heap of levels that fire when
+    the price rises to them. A tick only pops the entries it has crossed.
+    Trailing stops sit in a third pair of heaps keyed by their high/low-water
+    mark, so only the ones the price has moved past are re-armed. Re-armed
+    entries are dropped lazily when they reach the top; a cancel rebuilds
+    its market's heaps so cancelled levels do not linger until crossed.
+
+    A crossed trigger, and its OCO siblings, stay registered while its order
+    runs and are only removed once it succeeds. A failed order re-arms them
+    and tells the chat, up to TRIGGER_MAX_ATTEMPTS times. Orders run as tasks
+    so the monitor keeps polling prices while they confirm.
+
+    Triggers belong to the chat that added them; only that chat can list or
+    cancel them.
+    """
+
+    def __init__(self):
+        self.triggers: dict[str, Trigger] = {}
+        self.groups: dict[str, set] = {}
+        # (chat ID, fired trigger record) pairs, newest last.
+        self.fired = deque(maxlen=100)
+        self._executions: set = set()
+        self._below: dict[int, list] = {}
+        self._above: dict[int, list] = {}
+        self._trail_up: dict[int, list] = {}
+        self._trail_down: dict[int, list] = {}
+        self._ids = itertools.count(1)
+        self._monitor = None
+
+    def _push(self, trigger: Trigger) -> None:
+        entry_id = (trigger.trigger_id, trigger.version)
+        if trigger.fires_below():
+            heapq.heappush(
+                self._below.setdefault(trigger.market_id, []), (-trigger.level, entry_id)
+            )
+        else:
+            heapq.heappush(
+                self._above.setdefault(trigger.market_id, []), (trigger.level, entry_id)
+            )
+        if trigger.kind == "trailing_stop":
+            if trigger.trade_side:
+                heapq.heappush(
+                    self._trail_up.setdefault(trigger.market_id, []),
+                    (trigger.extreme, entry_id),
+                )
+            else:
+                heapq.heappush(
+                    self._trail_down.setdefault(trigger.market_id, []),
+                    (-trigger.extreme, entry_id),
+                )
+
+    def _live(self, entry_id: tuple) -> Trigger | None:
+        trigger = self.triggers.get(entry_id[0])
+        if trigger is None or trigger.version != entry_id[1]:
+            return None
+        return trigger
+
+    def add(
+        self,
+        private_key: str,
+        market_id: int,
+        trade_side: bool,
+        kind: str,
+        level: float,
+        size: float = 0.0,
+        leverage: int = 1,
+        group: str | None = None,
+        trail_distance: float = 0.0,
+    ) -> Trigger:
+        trigger = Trigger(
+            str(next(self._ids)),
+            private_key,
+            market_id,
+            trade_side,
+            kind,
+            level,
+            size,
+            leverage,
+            group,
+            trail_distance,
+            current_chat.get(),
+        )
+        self.triggers[trigger.trigger_id] = trigger
+        if group:
+            self.groups.setdefault(group, set()).add(trigger.trigger_id)
+        self._push(trigger)
+        return trigger
+
+    def new_group(self) -> str:
+        return f"oco-{next(self._ids)}"
+
+    def pending_for(self, chat_id) -> list[Trigger]:
+        return [trigger for trigger in self.triggers.values() if trigger.chat_id == chat_id]
+
+    def fired_for(self, chat_id) -> list[dict]:
+        return [record for owner, record in self.fired if owner == chat_id]
+
+    def cancel(self, trigger_id: str, chat_id) -> bool:
+        trigger = self.triggers.get(trigger_id)
+        if trigger is None or trigger.chat_id != chat_id:
+            return False
+        del self.triggers[trigger_id]
+        if trigger.group:
+            self.groups.get(trigger.group, set()).discard(trigger_id)
+        self._compact(trigger.market_id)
+        return True
+
+    def _compact(self, market_id: int) -> None:
+        """Rebuild a market's heaps from its armed triggers, dropping every stale entry."""
+
+        for heaps in (self._below, self._above, self._trail_up, self._trail_down):
+            heaps.pop(market_id, None)
+        for trigger in self.triggers.values():
+            if trigger.market_id == market_id and not trigger.firing:
+                self._push(trigger)
+
+    def _group(self, trigger: Trigger) -> list[Trigger]:
+        """The trigger's registered OCO siblings."""
+
+        if not trigger.group:
+            return []
+        return [
+            self.triggers[sibling]
+            for sibling in self.groups.get(trigger.group, set())
+            if sibling != trigger.trigger_id and sibling in self.triggers
+        ]
+
+    def _hold(self, trigger: Trigger) -> None:
+        # A new version makes every heap entry of the trigger stale.
+        trigger.version += 1
+        trigger.firing = True
+
+    def _rearm(self, trigger: Trigger) -> None:
+        trigger.version += 1
+        trigger.firing = False
+        self._push(trigger)
+
+    def _finish(self, trigger: Trigger) -> None:
+        self.triggers.pop(trigger.trigger_id, None)
+        if trigger.group:
+            # One-cancels-other: the siblings go once this leg has executed.
+            for sibling in self.groups.pop(trigger.group, set()):
+                self.triggers.pop(sibling, None)
+
+    def _retry(self, trigger: Trigger) -> bool:
+        """Re-arm a trigger whose order failed; returns False once it is given up."""
+
+        for sibling in self._group(trigger):
+            self._rearm(sibling)
+        trigger.attempts += 1
+        if trigger.trigger_id not in self.triggers:
+            # Cancelled while its order was running.
+            return False
+        if trigger.attempts >= TRIGGER_MAX_ATTEMPTS:
+            self.triggers.pop(trigger.trigger_id, None)
+            if trigger.group:
+                self.groups.get(trigger.group, set()).discard(trigger.trigger_id)
+            return False
+        self._rearm(trigger)
+        return True
+
+    def _rearm_trailing(self, market_id: int, price: float) -> None:
+        up = self._trail_up.get(market_id, [])
+        while up and up[0][0] < price:
+            _, entry_id = heapq.heappop(up)
+            trigger = self._live(entry_id)
+            if trigger is None:
+                continue
+            trigger.extreme = price
+            trigger.level = price - trigger.trail_distance
+            trigger.version += 1
+            self._push(trigger)
+
+        down = self._trail_down.get(market_id, [])
+        while down and -down[0][0] > price:
+            _, entry_id = heapq.heappop(down)
+            trigger = self._live(entry_id)
+            if trigger is None:
+                continue
+            trigger.extreme = price
+            trigger.level = price + trigger.trail_distance
+            trigger.version += 1
+            self._push(trigger)
+
+    def on_price(self, market_id: int, price: float) -> list[Trigger]:
+        """Advance a market to a new price and return the triggers it crossed."""
+
+        if price <= 0:
+            return []
+        risk_engine.update_price(market_id, price)
+        self._rearm_trailing(market_id, price)
+
+        crossed = []
+        below = self._below.get(market_id, [])
+        while below and -below[0][0] >= price:
+            crossed.append(heapq.heappop(below)[1])
+        above = self._above.get(market_id, [])
+        while above and above[0][0] <= price:
+            crossed.append(heapq.heappop(above)[1])
+
+        fired = []
+        for entry_id in crossed:
+            trigger = self._live(entry_id)
+            if trigger is None:
+                continue
+            # One-cancels-other: siblings are held so they cannot fire meanwhile.
+            self._hold(trigger)
+            for sibling in self._group(trigger):
+                self._hold(sibling)
+            fired.append(trigger)
+        return fired
+
+    async def execute(self, trigger: Trigger, price: float) -> dict:
+        try:
+            if trigger.size:
+                # direction=True closes part of the existing position on KANA.
+                result = await placeMarketOrder(
+                    trigger.private_key,
+                    trigger.market_id,
+                    trigger.trade_side,
+                    True,
+                    trigger.size,
+                    trigger.leverage,
+                )
+            else:
+                result = await collapsePosition(trigger.private_key, trigger.market_id)
+        except Exception as e:
+            result = {"Error": f"An error occurred:, {e}"}
+        state_versions.bump("account")
+
+        if isErrorResult(result):
+            rearmed = self._retry(trigger)
+            await self.notify(trigger, price, result, rearmed)
+        else:
+            self._finish(trigger)
+
+        record = {**trigger.describe(), "Price": price, "Result": result}
+        record["Fired At"] = int(time.time())
+        self.fired.append((trigger.chat_id, record))
+        return record
+
+    async def notify(self, trigger: Trigger, price: float, result: dict, rearmed: bool) -> None:
+        if tool_jobs.notifier is None or trigger.chat_id is None:
+            return
+        text = (
+            f"The {trigger.kind.replace('_', ' ')} trigger {trigger.trigger_id} in market "
+            f"{trigger.market_id} crossed {price} but its order failed: {result}. "
+        )
+        if rearmed:
+            text += (
+                f"It is re-armed (attempt {trigger.attempts} of {TRIGGER_MAX_ATTEMPTS})."
+            )
+        elif trigger.attempts >= TRIGGER_MAX_ATTEMPTS:
+            text += (
+                f"It was dropped after {trigger.attempts} failed attempts; "
+                "the position is no longer protected by it."
+            )
+        else:
+            text += "It had been cancelled and was not re-armed."
+        try:
+            await tool_jobs.notifier(trigger.chat_id, text)
+        except Exception as e:
+            logger.warning(
+                "Could not notify chat %s about trigger %s: %s",
+                trigger.chat_id,
+                trigger.trigger_id,
+                e,
+            )
+
+    def fire(self, market_id: int, price: float) -> None:
+        """Start the orders of the triggers a price crossed without waiting for them."""
+
+        for trigger in self.on_price(market_id, price):
+            # The loop only keeps weak references to tasks.
+            task = asyncio.create_task(self.execute(trigger, price))
+            self._executions.add(task)
+            task.add_done_callback(self._executions.discard)
+
+    def markets(self) -> set:
+        return {trigger.market_id for trigger in self.triggers.values()}
+
+    async def run(self, poll_interval: float = POLL_INTERVAL_SECONDS) -> None:
+        """Poll prices for every market with pending triggers until none are left."""
+
+        while self.triggers:
+            markets = sorted(self.markets())
+            prices = await asyncio.gather(
+                *(asyncio.to_thread(getMarketPrice, market_id) for market_id in markets)
+            )
+            for market_id, response in zip(markets, prices):
+                if "Error" in response:
+                    print(f"Error fetching price for market {market_id}: {response}")
+                    continue
+                price = markPrice(apiData(response, "Market Price"))
+                time_series.record_price(market_id, price)
+                self.fire(market_id, price)
+            await asyncio.sleep(poll_interval)
+
+    def ensure_monitor(self, poll_interval: float = POLL_INTERVAL_SECONDS) -> None:
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self.run(poll_interval))
+
+
+trigger_engine = TriggerEngine()
+
+
+def currentPrice(market_id: int) -> float:
+    price = risk_engine.last_prices.get(market_id)
+    if price:
+        return price
+    return markPrice(apiData(getMarketPrice(market_id), "Market Price"))
+
+
+async def addStopLossTrigger(
+    private_key: str,
+    market_id: int,
+    trade_side: bool,
+    stop_price: float,
+    size: float,
+    leverage: int,
+) -> dict:
+    """
+    Add a client-side stop-loss that closes a position when the price crosses a level.
+
+    Args:
+        private_key (str): The private key of the user.
+        market_id (int): The ID of the market.
+        trade_side (bool): True for long, False for short.
+        stop_price (float): The stop price.
+        size (float): Size to close, or 0 to collapse the entire position.
+        leverage (int): The leverage of the position.
+
+    Returns:
+        dict: A dictionary containing the created trigger.
+    """
+
+    try:
+        trigger = trigger_engine.add(
+            private_key, market_id, trade_side, "stop_loss", stop_price, size, leverage
+        )
+        trigger_engine.ensure_monitor()
+        return {"Trigger Added": trigger.describe()}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+async def addTakeProfitTriggers(
+    private_key: str,
+    market_id: int,
+    trade_side: bool,
+    prices: list[float],
+    sizes: list[float],
+    leverage: int,
+) -> dict:
+    """
+    Add several client-side take-profit levels, each closing part of a position.
+
+    Args:
+        private_key (str): The private key of the user.
+        market_id (int): The ID of the market.
+        trade_side (bool): True for long, False for short.
+        prices (list[float]): Take-profit prices.
+        sizes (list[float]): Size to close at each price (0 collapses the entire position).
+        leverage (int): The leverage of the position.
+
+    Returns:
+        dict: A dictionary containing the created triggers.
+    """
+
+    try:
+        if len(prices) != len(sizes):
+            return {"Error": "prices and sizes must have the same length."}
+        triggers = [
+            trigger_engine.add(
+                private_key, market_id, trade_side, "take_profit", price, size, leverage
+            )
+            for price, size in zip(prices, sizes)
+        ]
+        trigger_engine.ensure_monitor()
+        return {"Triggers Added": [trigger.describe() for trigger in triggers]}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+async def addTrailingStopTrigger(
+    private_key: str,
+    market_id: int,
+    trade_side: bool,
+    trail_distance: float,
+    size: float,
+    leverage: int,
+) -> dict:
+    """
+    Add a client-side trailing stop that follows the best price by a fixed distance.
+
+    Args:
+        private_key (str): The private key of the user.
+        market_id (int): The ID of the market.
+        trade_side (bool): True for long, False for short.
+        trail_distance (float): Price distance the stop keeps from the best price seen.
+        size (float): Size to close, or 0 to collapse the entire position.
+        leverage (int): The leverage of the position.
+
+    Returns:
+        dict: A dictionary containing the created trigger.
+    """
+
+    try:
+        price = await asyncio.to_thread(currentPrice, market_id)
+        if not price:
+            return {"Error": f"No market price available for market {market_id}."}
+        level = price - trail_distance if trade_side else price + trail_distance
+        trigger = trigger_engine.add(
+            private_key,
+            market_id,
+            trade_side,
+            "trailing_stop",
+            level,
+            size,
+            leverage,
+            trail_distance=trail_distance,
+        )
+        trigger_engine.ensure_monitor()
+        return {"Trigger Added": trigger.describe()}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+async def addOcoTrigger(
+    private_key: str,
+    market_id: int,
+    trade_side: bool,
+    stop_price: float,
+    take_profit_price: float,
+    size: float,
+    leverage: int,
+) -> dict:
+    """
+    Add a one-cancels-other stop-loss and take-profit pair.
+
+    Args:
+        private_key (str): The private key of the user.
+        market_id (int): The ID of the market.
+        trade_side (bool): True for long, False for short.
+        stop_price (float): The stop-loss price.
+        take_profit_price (float): The take-profit price.
+        size (float): Size to close, or 0 to collapse the entire position.
+        leverage (int): The leverage of the position.
+
+    Returns:
+        dict: A dictionary containing both legs of the pair.
+    """
+
+    try:
+        group = trigger_engine.new_group()
+        legs = [
+            trigger_engine.add(
+                private_key, market_id, trade_side, kind, level, size, leverage, group
+            )
+            for kind, level in (
+                ("stop_loss", stop_price),
+                ("take_profit", take_profit_price),
+            )
+        ]
+        trigger_engine.ensure_monitor()
+        return {"Triggers Added": [leg.describe() for leg in legs]}
+    except Exception as e:
+        return {"Error": f"An error occurred:, {e}"}
+
+
+def cancelTrigger(trigger_id: str) -> dict:
+    """
+    Cancel a pending client-side trigger added in this chat.
+
+    Args:
+        trigger_id (str): The ID of the trigger.
+
+    Returns:
+        dict: A dictionary containing the cancellation result.
+    """
+
+    if trigger_engine.cancel(trigger_id, current_chat.get()):
+        return {"Trigger Cancelled": trigger_id}
+    return {"Error": f"No pending trigger with ID {trigger_id}."}
+
+
+def listTriggers() -> dict:
+    """
+    List this chat's pending client-side triggers and the most recently fired ones.
+
+    Returns:
+        dict: A dictionary containing pending and fired triggers.
+    """
+
+    chat_id = current_chat.get()
+    return {
+        "Pending Triggers": [
+            trigger.describe() for trigger in trigger_engine.pending_for(chat_id)
+        ],
+        "Fired Triggers": trigger_engine.fired_for(chat_id),
+    }
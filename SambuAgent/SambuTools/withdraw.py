@@ -14,6 +14,9 @@ import requests
 from dotenv import load_dotenv
 from typing import Any, List
 
+from SambuAgent.intentStore import recordSubmission
+from SambuAgent.telemetry import span
+
 load_dotenv()
 
 
@@ -25,7 +28,8 @@ class AptosTransactionHandler:
 
     def fetch_payload(self, api_url, params, headers):
         try:
-            response = requests.get(api_url, params=params, headers=headers)
+            with span("http_fetch"):
+                response = requests.get(api_url, params=params, headers=headers)
             response.raise_for_status()
             return response.json().get("data")
         except requests.exceptions.RequestException as e:
@@ -43,6 +47,7 @@ class AptosTransactionHandler:
             for arg, serializer in zip(arguments, types)
         ]
 
+    @span("payload_build")
     def create_transaction_payload(self, payload: dict) -> TransactionPayload:
         try:
             function_information = payload["function"].split("::")
@@ -68,15 +73,19 @@ class AptosTransactionHandler:
 
     async def submit_transaction(self, transaction_payload: TransactionPayload) -> str:
         try:
-            signed_transaction_request = (
-                await self.rest_client.create_bcs_signed_transaction(
-                    sender=self.account, payload=transaction_payload
+            with span("sign"):
+                signed_transaction_request = (
+                    await self.rest_client.create_bcs_signed_transaction(
+                        sender=self.account, payload=transaction_payload
+                    )
                 )
-            )
-            txn_hash = await self.rest_client.submit_bcs_transaction(
-                signed_transaction=signed_transaction_request
-            )
-            await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
+            with span("submit"):
+                txn_hash = await self.rest_client.submit_bcs_transaction(
+                    signed_transaction=signed_transaction_request
+                )
+            recordSubmission(txn_hash)
+            with span("confirm"):
+                await self.rest_client.wait_for_transaction(txn_hash=txn_hash)
             return txn_hash
         except Exception as e:
             print(f"Error during transaction submission: {e}")
@@ -5,7 +5,20 @@ import dotenv
 dotenv.load_dotenv("../.env")
 
 from google.adk.agents import Agent
-from google.adk.tools import LongRunningFunctionTool, google_search
+from google.adk.tools import LongRunningFunctionTool, google_search, load_memory
+
+from SambuAgent.contextWindow import context_window
+from SambuAgent.intentStore import (
+    IDEMPOTENT_TOOLS,
+    intent_store,
+    getIntentStatus,
+    releaseIntent,
+)
+from SambuAgent.marketCache import SHARED_TOOLS, market_cache
+from SambuAgent.telemetry import instrument
+from SambuAgent.toolExecutor import offload, getToolExecutorStats
+from SambuAgent.toolPolicy import tool_policy
+from SambuAgent.toolJobs import JOB_TOOLS, tool_jobs, getJobStatus, listJobs
 
 
 from SambuAgent.SambuTools.deposit import deposit
@@ -20,10 +33,12 @@ from SambuAgent.SambuTools.sambuAPI import (
     getMarketPrice,
     getLastExecutedPrice,
     getAllOpenOrderIds,
+    getOrdersFromContract,
+    getOrdersStatusById,
+    getFills,
     getPositions,
     getAllTrades,
     getDepositAndWithdrawHistory,
-    placeMarketOrder,
     signAndSendTransaction,
     fundAccount,
     getAccountBalance,
@@ -31,6 +46,8 @@ from SambuAgent.SambuTools.sambuAPI import (
 )
 
 
+from SambuAgent.SambuTools.placeMarketOrder import placeMarketOrder
+
 from SambuAgent.SambuTools.cancelAndPlaceMultipleOrders import (
     cancelAndPlaceMultipleOrders,
 )
@@ -59,6 +76,53 @@ from SambuAgent.SambuTools.settlePNL import settlePNL
 
 from SambuAgent.SambuTools.buildTransaction import buildTransaction
 
+from SambuAgent.SambuTools.transactionPool import (
+    collapseAllPositions,
+    getTransactionPoolMetrics,
+)
+
+from SambuAgent.SambuTools.portfolioSnapshot import getPortfolioSnapshot
+
+from SambuAgent.SambuTools.fundingAnalytics import getFundingSummary
+
+from SambuAgent.SambuTools.balanceSheet import getBalanceSheet
+
+from SambuAgent.SambuTools.riskEngine import syncRiskPositions, getRiskSummary
+
+from SambuAgent.SambuTools.triggerEngine import (
+    addStopLossTrigger,
+    addTakeProfitTriggers,
+    addTrailingStopTrigger,
+    addOcoTrigger,
+    cancelTrigger,
+    listTriggers,
+)
+
+from SambuAgent.SambuTools.orderReconciler import planReconcile, reconcileOrders
+
+from SambuAgent.SambuTools.orderWatcher import (
+    watchOrders,
+    unwatchOrders,
+    getWatchedOrders,
+)
+
+from SambuAgent.SambuTools.accountActivity import (
+    followAccountActivity,
+    unfollowAccountActivity,
+    getAccountActivity,
+)
+
+from SambuAgent.SambuTools.chainRegistry import getChainById, searchChains
+
+from SambuAgent.SambuTools.rpcProber import getBestRpcEndpoints, watchRpcEndpoints
+
+from SambuAgent.SambuTools.timeSeries import (
+    recordMarketHistory,
+    getCandles,
+    getPriceHistory,
+    getMarketIndicators,
+)
+
 
 MODEL = "gemini-2.0-flash"
 
@@ -67,6 +131,93 @@ warnings.filterwarnings("ignore")
 logging.basicConfig(level=logging.ERROR)
 
 
+TOOLS = [
+    # google_search,
+    deposit,
+    fetchMarketInfo,
+    perpMarketInfo,
+    getWalletBalance,
+    getWalletAptBalance,
+    getProfileAddress,
+    getNetProfileBalance,
+    getTradeHistory,
+    getMarketPrice,
+    getLastExecutedPrice,
+    getAllOpenOrderIds,
+    getOrdersFromContract,
+    getOrdersStatusById,
+    getFills,
+    getPositions,
+    getAllTrades,
+    getDepositAndWithdrawHistory,
+    placeMarketOrder,
+    cancelAndPlaceMultipleOrders,
+    cancelMultipleOrders,
+    placeMultipleOrders,
+    planReconcile,
+    reconcileOrders,
+    withdraw,
+    collapsePosition,
+    updateTakeProfit,
+    updateStopLoss,
+    limitOrder,
+    addMargin,
+    settlePNL,
+    buildTransaction,
+    signAndSendTransaction,
+    fundAccount,
+    getAccountBalance,
+    getChainIdsAndData,
+    getChainById,
+    searchChains,
+    getBestRpcEndpoints,
+    watchRpcEndpoints,
+    collapseAllPositions,
+    getTransactionPoolMetrics,
+    getPortfolioSnapshot,
+    getFundingSummary,
+    getBalanceSheet,
+    syncRiskPositions,
+    getRiskSummary,
+    addStopLossTrigger,
+    addTakeProfitTriggers,
+    addTrailingStopTrigger,
+    addOcoTrigger,
+    cancelTrigger,
+    listTriggers,
+    watchOrders,
+    unwatchOrders,
+    getWatchedOrders,
+    followAccountActivity,
+    unfollowAccountActivity,
+    getAccountActivity,
+    recordMarketHistory,
+    getCandles,
+    getPriceHistory,
+    getMarketIndicators,
+    getToolExecutorStats,
+    getJobStatus,
+    listJobs,
+    getIntentStatus,
+    releaseIntent,
+]
+
+
+def wrapTool(tool):
+    if tool.__name__ in SHARED_TOOLS:
+        # Market-level reads are shared by every chat (and every bot worker).
+        tool = market_cache.cached(tool, SHARED_TOOLS[tool.__name__])
+    wrapped = offload(tool)
+    if tool.__name__ in IDEMPOTENT_TOOLS:
+        # A repeated write returns the recorded outcome instead of submitting again.
+        wrapped = intent_store.guard(wrapped)
+    wrapped = instrument(tool_policy.apply(wrapped))
+    if tool.__name__ in JOB_TOOLS:
+        # Chain writes return a job ID at once and finish in the background.
+        wrapped = tool_jobs.background(wrapped)
+    return LongRunningFunctionTool(func=wrapped)
+
+
 root_agent = Agent(
     name="Sambu_Agent",
     model=MODEL,
@@ -77,7 +228,16 @@ root_agent = Agent(
         Account Management:
         - Check wallet balances (APT and other tokens)
         - View profile address and net balance
-        - Monitor deposit and withdrawal history
+        - Get a full portfolio snapshot (balances, positions, open orders, prices, PnL) in one call;
+          prefer it over chaining the individual balance and position tools
+        - Monitor deposit and withdrawal history; prefer getAccountActivity, which answers
+          deposits, withdrawals and transfers in and out of the wallet from the local index,
+          and offer followAccountActivity to be messaged about new activity. It does not see
+          fills, funding or liquidations caused by other accounts, so use getTradeHistory
+          for trades
+        - Report funding paid and received, net and annualized funding cost with
+          getFundingSummary (use days=30, or the days since the 1st, for "this month")
+        - Compare balances of several wallets or assets at once with getBalanceSheet
         - Execute deposits and withdrawals
         - Settle PNL
 
@@ -89,6 +249,10 @@ root_agent = Agent(
 
         Chain IDs for Market Analysis
         - Retrieve Chain IDs for market analysis.
+        - Look up a single chain with getChainById or searchChains instead of loading
+          the whole registry with getChainIdsAndData
+        - Recommend RPC endpoints with getBestRpcEndpoints, which ranks them by measured
+          latency and reachability
 
 
         Market Analysis:
@@ -97,16 +261,28 @@ root_agent = Agent(
         - Access current market prices
         - View last executed prices
         - Analyze trade history
+        - Record a market's trades and prices locally (recordMarketHistory), then read candles,
+          price history and SMA/EMA/volatility from that store instead of refetching trades
 
         Trading Operations:
-        - Place market orders
+        - Place market orders; pass wait_for_confirmation=False when the user wants the
+          fastest fill and only needs the transaction hash
         - Create limit orders
         - Manage multiple orders (place/cancel)
+        - Re-quote a grid with reconcileOrders: give it the target price levels and it
+          cancels and places only what differs from the open orders; preview it first with
+          planReconcile
         - Monitor open positions
+        - Check open orders with prices and sizes (getOrdersFromContract), an order's status
+          (getOrdersStatusById) and fills (getFills)
+        - After placing limit or multiple orders, offer to follow them with watchOrders; the
+          user is messaged when they fill or get cancelled, so there is no need to poll
         - Collapse positions
+        - Collapse positions across several accounts in parallel
         - Add margin to positions
         - Set and update take-profit levels
         - Set and update stop-loss levels
+        - Add client-side trailing stops, OCO stop/take-profit pairs and multi-level take-profits
 
         When interacting with users:
         1. Always verify their intentions clearly before executing trades
@@ -124,6 +300,8 @@ root_agent = Agent(
         - Provide confirmation and results
 
         Safety Protocols:
+        - Run syncRiskPositions for the wallet before trading so the local risk engine
+          can check orders, and use getRiskSummary for margin ratio and liquidation distance
         - Verify wallet balance before trades
         - Check position limits
         - Confirm leverage levels
@@ -136,40 +314,25 @@ root_agent = Agent(
         - Prioritize risk management
         - Provide educational context when needed
         - Monitor market conditions actively
+        - Use load_memory to recall details from older parts of the conversation
+        - Deposits, withdrawals, order placement and cancellation, position changes and
+          transfers run as background jobs: they return a Job ID straight away. Tell the
+          user the job was started and that the result will be sent to the chat; use
+          getJobStatus or listJobs when asked about it, and never repeat the call
+        - Writes are deduplicated: an identical write from this chat within a few minutes
+          returns "Duplicate" with the earlier outcome instead of running again. Report that
+          outcome; only if the user confirms they want it repeated, call releaseIntent with
+          its Intent ID and then make the call again. getIntentStatus shows what a write submitted
+
+        Summary of earlier conversation with this user (may be empty):
+        {conversation_summary?}
 
         How can I assist you with your KANA Labs perpetual trading today?
     """,
-    tools=[
-        # google_search,
-        LongRunningFunctionTool(func=deposit),
-        LongRunningFunctionTool(func=fetchMarketInfo),
-        LongRunningFunctionTool(func=perpMarketInfo),
-        LongRunningFunctionTool(func=getWalletBalance),
-        LongRunningFunctionTool(func=getWalletAptBalance),
-        LongRunningFunctionTool(func=getProfileAddress),
-        LongRunningFunctionTool(func=getNetProfileBalance),
-        LongRunningFunctionTool(func=getTradeHistory),
-        LongRunningFunctionTool(func=getMarketPrice),
-        LongRunningFunctionTool(func=getLastExecutedPrice),
-        LongRunningFunctionTool(func=getAllOpenOrderIds),
-        LongRunningFunctionTool(func=getPositions),
-        LongRunningFunctionTool(func=getAllTrades),
-        LongRunningFunctionTool(func=getDepositAndWithdrawHistory),
-        LongRunningFunctionTool(func=placeMarketOrder),
-        LongRunningFunctionTool(func=cancelAndPlaceMultipleOrders),
-        LongRunningFunctionTool(func=cancelMultipleOrders),
-        LongRunningFunctionTool(func=placeMultipleOrders),
-        LongRunningFunctionTool(func=withdraw),
-        LongRunningFunctionTool(func=collapsePosition),
-        LongRunningFunctionTool(func=updateTakeProfit),
-        LongRunningFunctionTool(func=updateStopLoss),
-        LongRunningFunctionTool(func=limitOrder),
-        LongRunningFunctionTool(func=addMargin),
-        LongRunningFunctionTool(func=settlePNL),
-        LongRunningFunctionTool(func=buildTransaction),
-        LongRunningFunctionTool(func=signAndSendTransaction),
-        LongRunningFunctionTool(func=fundAccount),
-        LongRunningFunctionTool(func=getAccountBalance),
-        LongRunningFunctionTool(func=getChainIdsAndData),
-    ],
+    # Synchronous tools run on a bounded thread pool so they never block the runner
+    # loop; reads from one turn overlap while writes are serialized per account.
+    tools=[wrapTool(tool) for tool in TOOLS] + [load_memory],
+    # Keep every model call to a sliding window of recent turns.
+    before_model_callback=context_window.before_model,
+    after_model_callback=context_window.after_model,
 )
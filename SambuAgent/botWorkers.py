@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def shardFor(chat_id, workers: int) -> int:
+    return int(chat_id) % workers
+
+
+def shardPath(path: str, index: int) -> str:
+    """sambu_sessions.db -> sambu_sessions.worker0.db"""
+
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker{index}{extension}"
+
+
+def runWorker(index: int, requests, replies, shared_cache) -> None:
+    """
+    Entry point of one bot worker process.
+
+    The worker owns its own ADK runner (through SambuBot) and answers the
+    queries of the chats sharded to it. Its sessions and memories live in
+    their own SQLite files, since a chat only ever lands on one worker.
+    Replies and background job notifications go back to the dispatcher on the
+    shared `replies` queue.
+    """
+
+    from SambuAgent.marketCache import market_cache
+    from SambuAgent.sessionStore import MEMORY_DB_PATH, SESSION_DB_PATH
+    from SambuAgent.toolJobs import tool_jobs
+    from SambuBot import answer, loadAgent
+
+    loadAgent(shardPath(SESSION_DB_PATH, index), shardPath(MEMORY_DB_PATH, index))
+    market_cache.backend = shared_cache
+
+    async def notify(chat_id, text):
+        replies.put(("notify", chat_id, text))
+
+    tool_jobs.notifier = notify
+
+    async def handle(lock, request_id, chat_id, text):
+        # One turn at a time per chat, so its session is never written concurrently.
+        async with lock:
+            try:
+                reply = await answer(chat_id, text)
+            except Exception as e:
+                logger.exception("Worker %d failed on chat %s", index, chat_id)
+                reply = f"Sorry, something went wrong: {e}"
+        replies.put(("reply", request_id, reply))
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        locks: dict = {}
+        tasks = set()
+        while True:
+            item = await loop.run_in_executor(None, requests.get)
+            if item is None:
+                break
+            request_id, chat_id, text = item
+            lock = locks.setdefault(chat_id, asyncio.Lock())
+            task = asyncio.create_task(handle(lock, request_id, chat_id, text))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(serve())
+
+
+class WorkerPool:
+    """
+    Shard chats across worker processes.
+
+    SambuBot stays a thin Telegram dispatcher: every query is sent to the
+    worker owning its chat (chat_id % workers), so a chat always lands on the
+    same runner and session while different chats use different cores.
+    """
+
+    def __init__(self, workers: int, shared_cache):
+        context = multiprocessing.get_context("spawn")
+        self.workers = workers
+        # Process.start() drops its args, so keep the proxy alive until the workers have connected.
+        self.shared_cache = shared_cache
+        self.requests = [context.Queue() for _ in range(workers)]
+        self.replies = context.Queue()
+        self.processes = [
+            context.Process(
+                target=runWorker,
+                args=(index, self.requests[index], self.replies, shared_cache),
+                name=f"sambu-worker-{index}",
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._loop = None
+        self._notifier = None
+        self._reader = None
+
+    def start(self, notifier) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._notifier = notifier
+        for process in self.processes:
+            process.start()
+        self._reader = threading.Thread(target=self._read_replies, daemon=True)
+        self._reader.start()
+
+    def _read_replies(self) -> None:
+        while True:
+            message = self.replies.get()
+            if message is None:
+                return
+            kind, key, payload = message
+            if kind == "reply":
+                self._loop.call_soon_threadsafe(self._resolve, key, payload)
+            elif kind == "notify" and self._notifier is not None:
+                asyncio.run_coroutine_threadsafe(self._notifier(key, payload), self._loop)
+
+    def _resolve(self, request_id: int, reply: str) -> None:
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+    async def dispatch(self, chat_id, text: str) -> str:
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        self.requests[shardFor(chat_id, self.workers)].put((request_id, chat_id, text))
+        return await future
+
+    def stop(self, timeout: float = 10) -> None:
+        for queue in self.requests:
+            queue.put(None)
+        for process in self.processes:
+            process.join(timeout)
+        self.replies.put(None)
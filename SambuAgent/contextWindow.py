@@ -0,0 +1,209 @@
+import json
+import os
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from google.genai import types
+
+from SambuAgent.telemetry import telemetry
+
+load_dotenv()
+
+
+# Number of most recent user turns sent to the model.
+CONTEXT_MAX_TURNS = int(os.environ.get("CONTEXT_MAX_TURNS", "10"))
+# Tool results from earlier turns above this size are replaced by a summary.
+CONTEXT_MAX_TOOL_CHARS = int(os.environ.get("CONTEXT_MAX_TOOL_CHARS", "2000"))
+# Estimated prompt tokens a request may use; older turns are dropped to stay under it.
+CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", "32000"))
+CONTEXT_SESSIONS_TRACKED = int(os.environ.get("CONTEXT_SESSIONS_TRACKED", "1024"))
+
+# Rough size of a Gemini token, until a session's reported counts calibrate it.
+CHARS_PER_TOKEN = 4
+
+
+def isUserTurn(content: types.Content) -> bool:
+    """A user message, as opposed to a tool result (which also has the user role)."""
+
+    return content.role == "user" and any(
+        part.text and not part.function_response for part in content.parts or []
+    )
+
+
+def contentChars(content: types.Content) -> int:
+    size = 0
+    for part in content.parts or []:
+        if part.text:
+            size += len(part.text)
+        elif part.function_call:
+            size += len(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            size += len(json.dumps(part.function_response.response or {}, default=str))
+    return size
+
+
+def describeValue(value) -> str:
+    if isinstance(value, dict):
+        if len(value) == 1:
+            key, inner = next(iter(value.items()))
+            return f"{key}: {describeValue(inner)}"
+        if "data" in value:
+            return describeValue(value["data"])
+        return f"object with keys {', '.join(map(str, list(value)[:8]))}"
+    if isinstance(value, list):
+        return f"list of {len(value)} items"
+    return f"{type(value).__name__} value"
+
+
+def elideResponse(part: types.Part) -> types.Part:
+    response = part.function_response
+    size = len(json.dumps(response.response or {}, default=str))
+    summary = (
+        f"{response.name} output from an earlier turn elided to keep the context "
+        f"small ({size} characters, {describeValue(response.response)}). "
+        f"Call {response.name} again if the details are needed."
+    )
+    return types.Part(
+        function_response=types.FunctionResponse(
+            id=response.id, name=response.name, response={"Summary": summary}
+        )
+    )
+
+
+class ContextWindow:
+    """
+    Bound the prompt sent to Gemini on every model call.
+
+    Registered as the agent's before/after model callbacks. Only the last
+    `max_turns` user turns are sent, large tool results from earlier turns
+    are swapped for one-line summaries, and older turns are dropped while the
+    estimated size of the request is above `max_tokens`. Session history is left
+    untouched: only Part objects of the request are replaced.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = CONTEXT_MAX_TURNS,
+        max_tool_chars: int = CONTEXT_MAX_TOOL_CHARS,
+        max_tokens: int = CONTEXT_MAX_TOKENS,
+        sessions_tracked: int = CONTEXT_SESSIONS_TRACKED,
+    ):
+        self.max_turns = max_turns
+        self.max_tool_chars = max_tool_chars
+        self.max_tokens = max_tokens
+        self.sessions_tracked = sessions_tracked
+        self.sessions: OrderedDict = OrderedDict()
+
+    def _stats_for(self, session_id: str) -> dict:
+        stats = self.sessions.get(session_id)
+        if stats is None:
+            stats = self.sessions[session_id] = {
+                "Model Calls": 0,
+                "Estimated Tokens": 0,
+                "Prompt Tokens": 0,
+                "Dropped Contents": 0,
+                "Elided Tool Outputs": 0,
+                "Request Chars": 0,
+                "Chars Per Token": CHARS_PER_TOKEN,
+            }
+            while len(self.sessions) > self.sessions_tracked:
+                evicted, _ = self.sessions.popitem(last=False)
+                telemetry.clear_gauge("sambu_context_tokens", session=evicted)
+        self.sessions.move_to_end(session_id)
+        return stats
+
+    def window(
+        self, contents: list[types.Content], start: int, elide_before: int
+    ) -> tuple[list[types.Content], int]:
+        """Contents from `start` on, with large tool results before `elide_before` summarized."""
+
+        trimmed = []
+        elided = 0
+        for index in range(start, len(contents)):
+            content = contents[index]
+            if index < elide_before and any(
+                part.function_response for part in content.parts or []
+            ):
+                parts = []
+                for part in content.parts:
+                    if (
+                        part.function_response
+                        and len(json.dumps(part.function_response.response or {}, default=str))
+                        > self.max_tool_chars
+                    ):
+                        part = elideResponse(part)
+                        elided += 1
+                    parts.append(part)
+                content = types.Content(role=content.role, parts=parts)
+            trimmed.append(content)
+        return trimmed, elided
+
+    def trim(
+        self,
+        contents: list[types.Content],
+        fixed_chars: int = 0,
+        chars_per_token: float = CHARS_PER_TOKEN,
+    ) -> tuple[list[types.Content], int, int]:
+        """
+        Fit the request into `max_turns` turns and `max_tokens` estimated tokens.
+
+        Older turns are dropped one at a time while the estimate of the request
+        about to be sent is over budget. If the current turn alone is still too
+        big, its own large tool results are summarized too, except the latest.
+        """
+
+        turn_starts = [index for index, content in enumerate(contents) if isUserTurn(content)]
+        current_turn = turn_starts[-1] if turn_starts else len(contents)
+        if len(turn_starts) > self.max_turns:
+            starts = turn_starts[-self.max_turns :]
+        else:
+            starts = [0] + turn_starts[1:]
+
+        def tokens(window):
+            return (fixed_chars + sum(contentChars(content) for content in window)) / chars_per_token
+
+        for start in starts:
+            trimmed, elided = self.window(contents, start, current_turn)
+            if tokens(trimmed) <= self.max_tokens:
+                return trimmed, start, elided
+        trimmed, elided = self.window(contents, start, len(contents) - 1)
+        return trimmed, start, elided
+
+    def before_model(self, callback_context, llm_request):
+        stats = self._stats_for(callback_context.session.id)
+        system_chars = len(str(llm_request.config.system_instruction or ""))
+        contents, dropped, elided = self.trim(
+            llm_request.contents, system_chars, stats["Chars Per Token"]
+        )
+        llm_request.contents = contents
+
+        stats["Model Calls"] += 1
+        stats["Dropped Contents"] += dropped
+        stats["Elided Tool Outputs"] += elided
+        stats["Request Chars"] = system_chars + sum(contentChars(content) for content in contents)
+        stats["Estimated Tokens"] = int(stats["Request Chars"] / stats["Chars Per Token"])
+        telemetry.set_gauge(
+            "sambu_context_tokens",
+            stats["Estimated Tokens"],
+            session=callback_context.session.id,
+        )
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        usage = llm_response.usage_metadata
+        if usage is not None and usage.prompt_token_count:
+            stats = self._stats_for(callback_context.session.id)
+            stats["Prompt Tokens"] = usage.prompt_token_count
+            if stats["Request Chars"]:
+                # Calibrate the estimate of the next request against the real count.
+                stats["Chars Per Token"] = stats["Request Chars"] / usage.prompt_token_count
+            telemetry.set_gauge(
+                "sambu_context_tokens",
+                usage.prompt_token_count,
+                session=callback_context.session.id,
+            )
+        return None
+
+
+context_window = ContextWindow()
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Local stores live here unless their own path variable says otherwise. The
+# default is next to the package, not the directory the process started in.
+DATA_DIR = os.environ.get(
+    "SAMBU_DATA_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+def dataPath(name: str) -> str:
+    """Path of a local store file in the data directory."""
+
+    return os.path.join(DATA_DIR, name)
+
+
+def openDatabase(path: str) -> sqlite3.Connection:
+    """Connect to a SQLite store, creating its directory if needed."""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    return sqlite3.connect(path, check_same_thread=False)
@@ -0,0 +1,184 @@
+import logging
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+
+from SambuAgent.agent import root_agent
+from SambuAgent.SambuTools.portfolioSnapshot import apiData, parsePositions
+from SambuAgent.telemetry import telemetry
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WALLET_ADDRESS = os.environ.get("WALLET_ADDRESS", "")
+# "my ..." queries resolve to the one configured wallet, so they are only
+# fast-routed when the bot serves a single user who opted in.
+WALLET_ROUTES = (
+    os.environ.get("FASTPATH_WALLET_ROUTES", "false").lower() == "true" and bool(WALLET_ADDRESS)
+)
+WALLET_TOOLS = {"getAllOpenOrderIds", "getPositions", "getWalletAptBalance"}
+# Used for the latency-saved estimate until a real agent turn has been timed.
+AGENT_TURN_ESTIMATE_SECONDS = float(os.environ.get("FASTPATH_AGENT_TURN_ESTIMATE", "3"))
+
+MARKET = r"(?:market\s+)?(?P<market>\d+)"
+
+ROUTES = [
+    (
+        "getMarketPrice",
+        re.compile(
+            rf"^(?:what(?:'s| is)\s+)?(?:the\s+)?(?:current\s+)?price\s+(?:of|for|on|in)\s+{MARKET}$"
+            rf"|^market\s+(?P<market2>\d+)\s+price$"
+        ),
+    ),
+    (
+        "getLastExecutedPrice",
+        re.compile(
+            rf"^(?:what(?:'s| is)\s+)?(?:the\s+)?last\s+(?:executed|traded)\s+price\s+(?:of|for|on|in)\s+{MARKET}$"
+        ),
+    ),
+    (
+        "getAllOpenOrderIds",
+        re.compile(
+            rf"^(?:show\s+|list\s+|get\s+)?(?:me\s+)?(?:my\s+)?open\s+orders\s+(?:on|in|for)\s+{MARKET}$"
+        ),
+    ),
+    (
+        "getPositions",
+        re.compile(
+            rf"^(?:show\s+|list\s+|get\s+)?(?:me\s+)?(?:my\s+)?positions?\s+(?:on|in|for)\s+{MARKET}$"
+        ),
+    ),
+    (
+        "getWalletAptBalance",
+        re.compile(
+            r"^(?:what(?:'s| is)\s+)?(?:my\s+)?(?:wallet\s+)?apt(?:os)?\s+balance$"
+        ),
+    ),
+]
+
+
+def normalizeQuery(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+
+def formatReply(tool: str, market_id: int | None, response: dict) -> str | None:
+    key = next(iter(response))
+    data = apiData(response, key)
+    if data is None:
+        return None
+
+    if tool == "getMarketPrice":
+        if isinstance(data, dict) and "bestBidPrice" in data:
+            return (
+                f"Market {market_id}: best bid {data['bestBidPrice']}, "
+                f"best ask {data.get('bestAskPrice')}."
+            )
+        return f"Market {market_id} price: {data}."
+    if tool == "getLastExecutedPrice":
+        return f"Last executed price on market {market_id}: {data}."
+    if tool == "getAllOpenOrderIds":
+        if not data:
+            return f"You have no open orders on market {market_id}."
+        return (
+            f"You have {len(data)} open order(s) on market {market_id}: "
+            f"{', '.join(str(order_id) for order_id in data)}."
+        )
+    if tool == "getPositions":
+        positions = parsePositions(data)
+        if not positions:
+            return f"You have no open positions on market {market_id}."
+        lines = [
+            f"- {'Long' if position['is_long'] else 'Short'} {position['size']} "
+            f"@ {position['entry_price']} ({position['leverage']:g}x)"
+            for position in positions
+        ]
+        return f"Your positions on market {market_id}:\n" + "\n".join(lines)
+    if tool == "getWalletAptBalance":
+        return f"Your wallet APT balance is {data}."
+    return None
+
+
+class FastRouter:
+    """
+    Answer simple, unambiguous read-only queries without a model round-trip.
+
+    A query must match one of the anchored ROUTES patterns in full; anything
+    else (or any tool error) returns None so the caller falls through to the
+    agent.
+    """
+
+    def __init__(self):
+        self.tools = {
+            tool.name: tool.func for tool in root_agent.tools if hasattr(tool, "func")
+        }
+        self.handled = 0
+        self.fallthrough = 0
+        self.seconds_saved = 0.0
+
+    def match(self, query: str) -> tuple[str, dict] | None:
+        normalized = normalizeQuery(query)
+        for tool, pattern in ROUTES:
+            if tool in WALLET_TOOLS and not WALLET_ROUTES:
+                continue
+            found = pattern.match(normalized)
+            if not found:
+                continue
+            market = found.groupdict().get("market") or found.groupdict().get("market2")
+            if tool in ("getMarketPrice", "getLastExecutedPrice"):
+                return tool, {"market_id": int(market)}
+            if tool in ("getAllOpenOrderIds", "getPositions"):
+                return tool, {"market_id": int(market), "wallet_address": WALLET_ADDRESS}
+            return tool, {"wallet_address": WALLET_ADDRESS}
+        return None
+
+    def agent_turn_seconds(self) -> float:
+        histogram = telemetry.histograms.get(("call_agent", "agent_turn"))
+        if histogram is None or not histogram.count:
+            return AGENT_TURN_ESTIMATE_SECONDS
+        return histogram.total / histogram.count
+
+    async def route(self, query: str) -> str | None:
+        started_at = time.perf_counter()
+        matched = self.match(query)
+        if matched is None:
+            self.fallthrough += 1
+            return None
+
+        tool, kwargs = matched
+        response = await self.tools[tool](**kwargs)
+        reply = None
+        if isinstance(response, dict) and response and "Error" not in response:
+            reply = formatReply(tool, kwargs.get("market_id"), response)
+        if reply is None:
+            self.fallthrough += 1
+            return None
+
+        elapsed = time.perf_counter() - started_at
+        self.handled += 1
+        self.seconds_saved += max(self.agent_turn_seconds() - elapsed, 0.0)
+        telemetry.observe("fast_path", tool, elapsed)
+        telemetry.set_gauge("sambu_fastpath_handled_total", self.handled)
+        telemetry.set_gauge("sambu_fastpath_fallthrough_total", self.fallthrough)
+        telemetry.set_gauge("sambu_fastpath_seconds_saved_total", round(self.seconds_saved, 3))
+        logger.info(
+            "Fast path answered %r with %s in %.3fs (%d handled, %.1fs saved)",
+            query,
+            tool,
+            elapsed,
+            self.handled,
+            self.seconds_saved,
+        )
+        return reply
+
+    def stats(self) -> dict:
+        return {
+            "Handled": self.handled,
+            "Fell Through": self.fallthrough,
+            "Latency Saved (s)": round(self.seconds_saved, 3),
+        }
+
+
+fast_router = FastRouter()
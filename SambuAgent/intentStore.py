@@ -0,0 +1,245 @@
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from SambuAgent.dataDir import dataPath, openDatabase
+from SambuAgent.telemetry import isErrorResult
+from SambuAgent.toolJobs import JOB_TOOLS, current_chat
+
+load_dotenv()
+
+
+INTENT_DB_PATH = os.environ.get("INTENT_DB_PATH") or dataPath("sambu_intents.db")
+# An identical write from the same chat within this window is treated as a repeat.
+INTENT_WINDOW_SECONDS = float(os.environ.get("INTENT_WINDOW_SECONDS", "300"))
+# A claim still pending after this long is assumed to belong to a crashed process.
+INTENT_PENDING_TIMEOUT = float(os.environ.get("INTENT_PENDING_TIMEOUT", "120"))
+
+# Tools that submit something on-chain or to KANA and must not run twice by accident.
+IDEMPOTENT_TOOLS = JOB_TOOLS | {"placeMarketOrder", "collapseAllPositions", "fundAccount"}
+
+# Transaction hashes submitted by the write currently running, see recordSubmission.
+submitted_hashes = contextvars.ContextVar("submitted_hashes", default=None)
+
+
+def recordSubmission(txn_hash: str) -> None:
+    """
+    Note a submitted transaction against the running intent.
+
+    Called by the transaction handlers right after submission, before waiting
+    for confirmation, so the hash is kept even when confirmation times out.
+    """
+
+    hashes = submitted_hashes.get()
+    if hashes is not None:
+        hashes.append(str(txn_hash))
+
+
+def intentId(tool: str, chat_id, kwargs: dict) -> str:
+    """Client intent ID: the tool, chat, accounts and arguments, with keys replaced by addresses."""
+
+    # The transaction handlers import this module, and toolPolicy imports them.
+    from SambuAgent.toolPolicy import callAccounts
+
+    arguments = {key: value for key, value in kwargs.items() if "private" not in key}
+    canonical = json.dumps(
+        [tool, str(chat_id), callAccounts(kwargs), arguments], sort_keys=True, default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+class IntentStore:
+    """
+    SQLite record of every write intent and what it submitted.
+
+    A write claims its intent ID before running. A repeat of a finished or
+    running intent inside the window gets the recorded outcome back instead of
+    a second submission, and so does a failed one that already submitted a
+    transaction, since that transaction may still land.
+
+    The database is opened on first use, so importing the agent does not
+    create it.
+    """
+
+    def __init__(self, path: str = INTENT_DB_PATH, window: float = INTENT_WINDOW_SECONDS):
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _db(self):
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        db = openDatabase(self.path)
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS intents (
+                intent_id TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                chat_id TEXT,
+                status TEXT NOT NULL,
+                transaction_hashes TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            )
+            """
+        )
+        db.commit()
+        return db
+
+    @staticmethod
+    def _row(row) -> dict | None:
+        if row is None:
+            return None
+        intent_id, tool, chat_id, status, hashes, result, created_at, finished_at = row
+        return {
+            "Intent ID": intent_id,
+            "Tool": tool,
+            "Chat ID": chat_id,
+            "Status": status,
+            "Transaction Hashes": json.loads(hashes),
+            "Result": json.loads(result) if result else None,
+            "Created At": int(created_at),
+            "Finished At": int(finished_at) if finished_at else None,
+        }
+
+    def get(self, intent_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM intents WHERE intent_id = ?", (intent_id,)
+            ).fetchone()
+        return self._row(row)
+
+    def claim(self, intent_id: str, tool: str, chat_id) -> dict | None:
+        """Claim an intent for a new run; returns the earlier record if this is a repeat."""
+
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT * FROM intents WHERE intent_id = ?", (intent_id,)
+            ).fetchone()
+            record = self._row(row)
+            if record is not None:
+                age = now - row[6]
+                repeat = age < self.window and (
+                    record["Status"] != "failed" or record["Transaction Hashes"]
+                )
+                if record["Status"] == "pending":
+                    repeat = age < INTENT_PENDING_TIMEOUT
+                if record["Status"] == "released":
+                    repeat = False
+                if repeat:
+                    return record
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO intents
+                    (intent_id, tool, chat_id, status, transaction_hashes, result, created_at, finished_at)
+                VALUES (?, ?, ?, 'pending', '[]', NULL, ?, NULL)
+                """,
+                (intent_id, tool, None if chat_id is None else str(chat_id), now),
+            )
+        return None
+
+    def finish(self, intent_id: str, status: str, result, hashes: list[str]) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                UPDATE intents SET status = ?, result = ?, transaction_hashes = ?, finished_at = ?
+                WHERE intent_id = ?
+                """,
+                (status, json.dumps(result, default=str), json.dumps(hashes), time.time(), intent_id),
+            )
+
+    def release(self, intent_id: str) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE intents SET status = 'released' WHERE intent_id = ? AND status != 'pending'",
+                (intent_id,),
+            )
+        return cursor.rowcount > 0
+
+    def guard(self, func):
+        """Wrap an async write tool so a repeated intent returns the recorded outcome."""
+
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            intent_id = intentId(name, current_chat.get(), kwargs)
+            earlier = self.claim(intent_id, name, current_chat.get())
+            if earlier is not None:
+                return {
+                    "Duplicate": (
+                        f"The same {name} call was already made; it was not submitted again. "
+                        "If the user really wants to repeat it, confirm with them and call "
+                        "releaseIntent with this Intent ID first."
+                    ),
+                    "Intent": earlier,
+                }
+
+            hashes = []
+            token = submitted_hashes.set(hashes)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                result = {"Error": f"An error occurred:, {e}"}
+            finally:
+                submitted_hashes.reset(token)
+            self.finish(intent_id, "failed" if isErrorResult(result) else "done", result, hashes)
+            if isinstance(result, dict):
+                result = {**result, "Intent ID": intent_id}
+                if hashes and isErrorResult(result):
+                    result["Submitted Transactions"] = hashes
+            return result
+
+        return wrapper
+
+
+intent_store = IntentStore()
+
+
+def getIntentStatus(intent_id: str) -> dict:
+    """
+    Get the recorded outcome and transaction hashes of a write by its Intent ID.
+
+    Args:
+        intent_id (str): The Intent ID returned with the write's result.
+
+    Returns:
+        dict: A dictionary containing the intent's status, result and submitted transactions.
+    """
+
+    record = intent_store.get(intent_id)
+    if record is None:
+        return {"Error": f"No intent with ID {intent_id}."}
+    return {"Intent": record}
+
+
+def releaseIntent(intent_id: str) -> dict:
+    """
+    Allow a write that was blocked as a duplicate to run again. Only use this after the user confirmed they want the same operation repeated.
+
+    Args:
+        intent_id (str): The Intent ID reported with the duplicate.
+
+    Returns:
+        dict: A dictionary confirming the intent was released.
+    """
+
+    if not intent_store.release(intent_id):
+        return {"Error": f"No finished intent with ID {intent_id}."}
+    return {"Released Intent": intent_id}
@@ -0,0 +1,69 @@
+import functools
+import os
+import time
+
+from dotenv import load_dotenv
+
+from SambuAgent.telemetry import isErrorResult
+
+load_dotenv()
+
+
+PRICE_TTL_SECONDS = float(os.environ.get("MARKET_CACHE_PRICE_TTL", "1"))
+STATIC_TTL_SECONDS = float(os.environ.get("MARKET_CACHE_STATIC_TTL", "300"))
+
+# Market-level reads that are the same for every user, with how long they stay fresh.
+SHARED_TOOLS = {
+    "getMarketPrice": PRICE_TTL_SECONDS,
+    "getLastExecutedPrice": PRICE_TTL_SECONDS,
+    "getAllTrades": PRICE_TTL_SECONDS,
+    "fetchMarketInfo": STATIC_TTL_SECONDS,
+    "perpMarketInfo": STATIC_TTL_SECONDS,
+}
+
+
+class MarketDataCache:
+    """
+    Expiring cache for market data shared by every chat.
+
+    The backend is a plain dict in a single process. With several bot
+    workers it is a `multiprocessing.Manager().dict()`, so a price fetched by
+    one worker is served to the others over local IPC instead of another
+    KANA request.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = {} if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None or entry[0] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl: float) -> None:
+        self.backend[key] = (time.time() + ttl, value)
+
+    def cached(self, func, ttl: float):
+        """Wrap a synchronous market-level tool so fresh results come from the cache."""
+
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            result = self.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                if not isErrorResult(result):
+                    self.set(key, result, ttl)
+            return result
+
+        return wrapper
+
+
+market_cache = MarketDataCache()
@@ -0,0 +1,239 @@
+import os
+import re
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from SambuAgent.telemetry import telemetry
+
+load_dotenv()
+
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+# Price answers are only as fresh as the last observed tick, so they also expire quickly.
+RESPONSE_CACHE_PRICE_TTL = float(os.environ.get("RESPONSE_CACHE_PRICE_TTL", "10"))
+# Fills, transfers and liquidations this process does not watch move account
+# state without bumping its version, so account answers expire sooner too.
+RESPONSE_CACHE_ACCOUNT_TTL = float(os.environ.get("RESPONSE_CACHE_ACCOUNT_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Read-only tools whose answer depends on a market's live price.
+MARKET_TOOLS = {"getMarketPrice", "getLastExecutedPrice", "getAllTrades"}
+# Read-only tools whose answer only changes with a KANA or chain release.
+STATIC_TOOLS = {
+    "fetchMarketInfo",
+    "perpMarketInfo",
+    "getChainIdsAndData",
+    "getChainById",
+    "searchChains",
+}
+# Read-only tools whose answer depends on the user's balances, orders or positions.
+ACCOUNT_TOOLS = {
+    "getWalletBalance",
+    "getWalletAptBalance",
+    "getProfileAddress",
+    "getNetProfileBalance",
+    "getTradeHistory",
+    "getAllOpenOrderIds",
+    "getOrdersFromContract",
+    "getOrdersStatusById",
+    "getFills",
+    "getPositions",
+    "getDepositAndWithdrawHistory",
+    "getAccountBalance",
+    "getPortfolioSnapshot",
+    "getFundingSummary",
+    "planReconcile",
+    "getBalanceSheet",
+    "syncRiskPositions",
+    "getRiskSummary",
+    "listTriggers",
+}
+# Read-only but reporting process internals, so never worth caching.
+VOLATILE_TOOLS = {
+    "getTransactionPoolMetrics",
+    "getToolExecutorStats",
+    "load_memory",
+    "getJobStatus",
+    "listJobs",
+    "getIntentStatus",
+    "watchOrders",
+    "unwatchOrders",
+    "getWatchedOrders",
+    "followAccountActivity",
+    "unfollowAccountActivity",
+    "getAccountActivity",
+    "recordMarketHistory",
+    "getCandles",
+    "getPriceHistory",
+    "getMarketIndicators",
+    "getBestRpcEndpoints",
+    "watchRpcEndpoints",
+}
+
+FILLER_WORDS = {
+    "a",
+    "an",
+    "the",
+    "please",
+    "pls",
+    "kindly",
+    "hey",
+    "hi",
+    "hello",
+    "sambu",
+    "can",
+    "could",
+    "would",
+    "you",
+    "tell",
+    "show",
+    "me",
+}
+
+
+class StateVersions:
+    """
+    Monotonic version counters for the state cached answers depend on.
+
+    ("market", market_id) moves when a new price is observed for a market and
+    ("account", None) moves whenever something may have changed the user's
+    balances, orders or positions: a write, a fired trigger, a watched order's
+    event or newly indexed account activity.
+    """
+
+    def __init__(self):
+        self._versions: dict[tuple, int] = {}
+
+    def get(self, kind: str, key=None) -> int:
+        return self._versions.get((kind, key), 0)
+
+    def bump(self, kind: str, key=None) -> None:
+        self._versions[(kind, key)] = self._versions.get((kind, key), 0) + 1
+
+
+state_versions = StateVersions()
+
+
+def normalizeQuery(query: str) -> str:
+    words = re.findall(r"[a-z0-9_.]+", query.lower())
+    return " ".join(word.strip(".") for word in words if word not in FILLER_WORDS)
+
+
+def callDependencies(tool_calls: list[tuple[str, dict]]) -> tuple[set, bool] | None:
+    """
+    Work out what a turn's answer depends on from the tools it called.
+
+    Returns the set of (kind, key) dependencies and whether any of them is a
+    live price, or None when the turn must not be cached: it called a write or
+    volatile tool, or no tool at all. A reply without tool calls comes from
+    the conversation ("yes", "do it"), so replaying it elsewhere would be wrong.
+    """
+
+    if not tool_calls:
+        return None
+    dependencies = set()
+    priced = False
+    for name, args in tool_calls:
+        args = args or {}
+        market_ids = args.get("market_ids") or (
+            [args["market_id"]] if "market_id" in args else []
+        )
+        if name in MARKET_TOOLS:
+            priced = True
+            dependencies.update(("market", int(market_id)) for market_id in market_ids)
+        elif name in ACCOUNT_TOOLS:
+            dependencies.add(("account", None))
+            if name == "getPortfolioSnapshot":
+                priced = True
+                dependencies.update(
+                    ("market", int(market_id)) for market_id in market_ids
+                )
+        elif name not in STATIC_TOOLS:
+            return None
+    return dependencies, priced
+
+
+class ResponseCache:
+    """
+    LRU cache of agent replies keyed by user and normalized query.
+
+    Each entry remembers the state versions it was built from and is dropped
+    as soon as one of them moves or its TTL runs out.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL,
+        price_ttl: float = RESPONSE_CACHE_PRICE_TTL,
+        account_ttl: float = RESPONSE_CACHE_ACCOUNT_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        versions: StateVersions = state_versions,
+    ):
+        self.ttl = ttl
+        self.price_ttl = price_ttl
+        self.account_ttl = account_ttl
+        self.max_entries = max_entries
+        self.versions = versions
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, user_id: str, query: str) -> str | None:
+        key = (user_id, normalizeQuery(query))
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, dependencies, reply = entry
+            fresh = expires_at >= time.monotonic() and all(
+                self.versions.get(kind, dep_key) == version
+                for kind, dep_key, version in dependencies
+            )
+            if fresh:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                telemetry.set_gauge("sambu_response_cache_hits_total", self.hits)
+                return reply
+            del self._entries[key]
+
+        self.misses += 1
+        telemetry.set_gauge("sambu_response_cache_misses_total", self.misses)
+        return None
+
+    def store(
+        self, user_id: str, query: str, reply: str, tool_calls: list[tuple[str, dict]]
+    ) -> bool:
+        """Cache a reply if its answer came from read tools; a write invalidates account answers."""
+
+        found = callDependencies(tool_calls)
+        if found is None:
+            if any(
+                name not in VOLATILE_TOOLS and name not in STATIC_TOOLS
+                for name, _ in tool_calls
+            ):
+                self.versions.bump("account")
+            return False
+
+        dependencies, priced = found
+        ttl = min(self.ttl, self.price_ttl) if priced else self.ttl
+        if ("account", None) in dependencies:
+            ttl = min(ttl, self.account_ttl)
+        entry = (
+            time.monotonic() + ttl,
+            tuple(
+                (kind, key, self.versions.get(kind, key)) for kind, key in dependencies
+            ),
+            reply,
+        )
+        key = (user_id, normalizeQuery(query))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+response_cache = ResponseCache()
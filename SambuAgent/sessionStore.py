@@ -0,0 +1,271 @@
+import os
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.memory import SqliteMemoryService
+from google.adk.sessions.sqlite_session_service import SqliteSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.state import State
+
+from SambuAgent.dataDir import dataPath
+
+load_dotenv()
+
+
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH") or dataPath("sambu_sessions.db")
+MEMORY_DB_PATH = os.environ.get("MEMORY_DB_PATH") or dataPath("sambu_memory.db")
+# A session is compacted once it holds more than SESSION_COMPACT_AFTER events,
+# keeping roughly the SESSION_KEEP_EVENTS most recent ones.
+SESSION_COMPACT_AFTER = int(os.environ.get("SESSION_COMPACT_AFTER", "400"))
+SESSION_KEEP_EVENTS = int(os.environ.get("SESSION_KEEP_EVENTS", "200"))
+SESSION_SUMMARY_MAX_CHARS = int(os.environ.get("SESSION_SUMMARY_MAX_CHARS", "4000"))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "1024"))
+
+SUMMARY_KEY = "conversation_summary"
+SUMMARY_LINE_CHARS = 200
+COMPACTION_AUTHOR = "session_compaction"
+# The compacted copy of a session is built under its ID plus this suffix first.
+STAGING_SUFFIX = ".compacting"
+# State shared with other sessions, or never stored; not part of a session's own state.
+SHARED_STATE_PREFIXES = (State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX)
+
+
+def eventText(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text).strip()
+
+
+def summarizeEvents(events: list[Event], previous: str = "") -> str:
+    """
+    Fold dropped events into the running summary.
+
+    Only the text of user messages and agent replies is kept, one shortened
+    line each; tool calls and tool results are left out. The oldest lines go
+    first when the summary outgrows SESSION_SUMMARY_MAX_CHARS.
+    """
+
+    lines = [previous] if previous else []
+    for event in events:
+        text = " ".join(eventText(event).split())
+        if not text:
+            continue
+        speaker = "User" if event.author == "user" else "Sambu"
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[: SUMMARY_LINE_CHARS - 3] + "..."
+        lines.append(f"{speaker}: {text}")
+
+    summary = "\n".join(lines)
+    if len(summary) > SESSION_SUMMARY_MAX_CHARS:
+        summary = summary[-SESSION_SUMMARY_MAX_CHARS:]
+        summary = summary[summary.find("\n") + 1 :]
+    return summary
+
+
+def sessionState(state: dict) -> dict:
+    """The keys of a merged session state that belong to the session itself."""
+
+    return {key: value for key, value in state.items() if not key.startswith(SHARED_STATE_PREFIXES)}
+
+
+class CompactingSessionService(SqliteSessionService):
+    """
+    SQLite session store that keeps every chat's history bounded.
+
+    `compact` moves the oldest events of a long session into the memory
+    service and a short text summary in the session state, so the runner
+    only ever loads a window of recent events.
+
+    Nothing is deleted before its replacement is stored: the dropped turns go
+    to memory first, and the compacted session is built under a staging ID
+    before the original is replaced from it. A compaction event closes both
+    the original, right before the swap, and the finished staging copy, so
+    `recover` can tell which one to keep after an interruption.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SESSION_DB_PATH,
+        memory_service: SqliteMemoryService | None = None,
+        compact_after: int = SESSION_COMPACT_AFTER,
+        keep_events: int = SESSION_KEEP_EVENTS,
+    ):
+        super().__init__(db_path)
+        self.memory_service = memory_service
+        self.compact_after = compact_after
+        self.keep_events = keep_events
+        self.compactions = 0
+        self.events_compacted = 0
+
+    async def rebuild(
+        self, app_name: str, user_id: str, session_id: str, state: dict, events: list[Event]
+    ):
+        """Create a session with the given state and events, and return it."""
+
+        rebuilt = await self.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        for event in events:
+            # The state already holds what these deltas set, and replaying
+            # app: or user: deltas would undo newer shared state.
+            await self.append_event(
+                rebuilt,
+                event.model_copy(
+                    update={"actions": event.actions.model_copy(update={"state_delta": {}})}
+                ),
+            )
+        return rebuilt
+
+    async def recover(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Finish a compaction that stopped mid-swap; returns True if the session was restored."""
+
+        staging_id = session_id + STAGING_SUFFIX
+        staged = await self.get_session(
+            app_name=app_name, user_id=user_id, session_id=staging_id
+        )
+        if staged is None:
+            return False
+        complete = bool(staged.events) and staged.events[-1].author == COMPACTION_AUTHOR
+        original = await self.get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=1),
+        )
+        # An original still ending in its compaction event was never deleted.
+        intact = (
+            original is not None
+            and bool(original.events)
+            and original.events[-1].author == COMPACTION_AUTHOR
+        )
+        restored = False
+        if complete and not intact:
+            # The original was deleted, or only partly rebuilt, before the swap finished.
+            if original is not None:
+                await self.delete_session(
+                    app_name=app_name, user_id=user_id, session_id=session_id
+                )
+            await self.rebuild(
+                app_name, user_id, session_id, sessionState(staged.state), staged.events[:-1]
+            )
+            restored = True
+        await self.delete_session(app_name=app_name, user_id=user_id, session_id=staging_id)
+        return restored
+
+    async def compact(self, app_name: str, user_id: str, session_id: str) -> int:
+        """
+        Compact one session if it is over the limit and return the number of events dropped.
+
+        Only the public session API is used: the dropped turns are added to
+        memory, the summary is stored with a state-only event, and the session
+        is recreated from its state and the events that are kept.
+        """
+
+        await self.recover(app_name, user_id, session_id)
+        probe = await self.get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=self.compact_after + 1),
+        )
+        if probe is None or len(probe.events) <= self.compact_after:
+            return 0
+
+        session = await self.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        events = list(session.events)
+        # Cut right before a user message so no tool call is separated
+        # from its response.
+        cut = max(
+            (
+                index
+                for index, event in enumerate(events[: len(events) - self.keep_events])
+                if event.author == "user"
+            ),
+            default=0,
+        )
+        if cut == 0:
+            return 0
+        dropped, kept = events[:cut], events[cut:]
+
+        if self.memory_service is not None:
+            await self.memory_service.add_events_to_memory(
+                app_name=app_name,
+                user_id=user_id,
+                events=dropped,
+                session_id=session_id,
+            )
+
+        summary = summarizeEvents(dropped, session.state.get(SUMMARY_KEY, ""))
+        await self.append_event(
+            session,
+            Event(
+                author=COMPACTION_AUTHOR,
+                actions=EventActions(state_delta={SUMMARY_KEY: summary}),
+            ),
+        )
+        state = sessionState(session.state)
+
+        staging_id = session_id + STAGING_SUFFIX
+        await self.delete_session(app_name=app_name, user_id=user_id, session_id=staging_id)
+        staged = await self.rebuild(app_name, user_id, staging_id, state, kept)
+        await self.append_event(staged, Event(author=COMPACTION_AUTHOR))
+        await self.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        await self.rebuild(app_name, user_id, session_id, state, kept)
+        await self.delete_session(app_name=app_name, user_id=user_id, session_id=staging_id)
+
+        self.compactions += 1
+        self.events_compacted += len(dropped)
+        return len(dropped)
+
+
+class ChatSessions:
+    """
+    Lazily map Telegram chats to persistent sessions.
+
+    A chat's session is looked up (or created) the first time it writes and
+    only its ids are remembered, in a bounded LRU, so memory stays flat no
+    matter how many chats the bot has seen.
+    """
+
+    def __init__(
+        self,
+        session_service: CompactingSessionService,
+        app_name: str,
+        cache_size: int = SESSION_CACHE_SIZE,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.cache_size = cache_size
+        self._known: OrderedDict = OrderedDict()
+
+    async def session_for(self, chat_id) -> tuple[str, str]:
+        user_id = str(chat_id)
+        session_id = f"chat-{chat_id}"
+        if user_id in self._known:
+            self._known.move_to_end(user_id)
+            return user_id, session_id
+
+        await self.session_service.recover(self.app_name, user_id, session_id)
+        session = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=0),
+        )
+        if session is None:
+            await self.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+
+        self._known[user_id] = session_id
+        while len(self._known) > self.cache_size:
+            self._known.popitem(last=False)
+        return user_id, session_id
+
+    async def compact(self, user_id: str, session_id: str) -> int:
+        return await self.session_service.compact(self.app_name, user_id, session_id)
@@ -0,0 +1,254 @@
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from opentelemetry import trace
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+tracer = trace.get_tracer("sambu")
+current_tool = contextvars.ContextVar("current_tool", default="unknown")
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(BUCKETS) and value > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which `q` of the observations fall."""
+
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+# Descriptions of the metrics set through set_gauge; names ending in _total
+# are monotonic and exported as counters.
+METRIC_HELP = {
+    "sambu_context_tokens": "Prompt tokens of the latest model call, per session.",
+    "sambu_fastpath_handled_total": "Queries answered by the fast path.",
+    "sambu_fastpath_fallthrough_total": "Queries the fast path passed on to the agent.",
+    "sambu_fastpath_seconds_saved_total": "Estimated agent time saved by the fast path.",
+    "sambu_response_cache_hits_total": "Replies served from the response cache.",
+    "sambu_response_cache_misses_total": "Queries not found in the response cache.",
+}
+
+
+class Telemetry:
+    """Per tool and stage latency histograms plus error counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: dict[tuple, Histogram] = {}
+        self.errors: dict[tuple, int] = {}
+        self.gauges: dict[tuple, float] = {}
+
+    def observe(self, tool: str, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get((tool, stage))
+            if histogram is None:
+                histogram = self.histograms[(tool, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def count_error(self, tool: str, stage: str) -> None:
+        with self._lock:
+            self.errors[(tool, stage)] = self.errors.get((tool, stage), 0) + 1
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def clear_gauge(self, name: str, **labels) -> None:
+        with self._lock:
+            self.gauges.pop((name, tuple(sorted(labels.items()))), None)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                f"{tool}.{stage}": {
+                    "Count": histogram.count,
+                    "Errors": self.errors.get((tool, stage), 0),
+                    "Average (s)": round(histogram.total / histogram.count, 6),
+                    "p95 (s)": histogram.quantile(0.95),
+                }
+                for (tool, stage), histogram in sorted(self.histograms.items())
+            }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP sambu_tool_duration_seconds Latency of tool calls and their stages.",
+            "# TYPE sambu_tool_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (tool, stage), histogram in sorted(self.histograms.items()):
+                labels = f'tool="{tool}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'sambu_tool_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'sambu_tool_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"sambu_tool_duration_seconds_sum{{{labels}}} {histogram.total}")
+                lines.append(f"sambu_tool_duration_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += [
+                "# HELP sambu_tool_errors_total Failed tool calls and stages.",
+                "# TYPE sambu_tool_errors_total counter",
+            ]
+            for (tool, stage), count in sorted(self.errors.items()):
+                lines.append(f'sambu_tool_errors_total{{tool="{tool}",stage="{stage}"}} {count}')
+
+            # HELP and TYPE go once per metric name, before all of its samples.
+            previous = None
+            for (name, labels), value in sorted(self.gauges.items()):
+                if name != previous:
+                    previous = name
+                    kind = "counter" if name.endswith("_total") else "gauge"
+                    help_text = METRIC_HELP.get(name, name.replace("_", " "))
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                rendered = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry()
+
+
+@contextmanager
+def span(stage: str, tool: str | None = None, **attributes):
+    """
+    Time one stage of a tool call (http_fetch, payload_build, sign, submit, confirm).
+
+    The stage is recorded in the local histograms and emitted as an
+    OpenTelemetry span, so any configured exporter receives it as well.
+    """
+
+    tool = tool or current_tool.get()
+    started_at = time.perf_counter()
+    with tracer.start_as_current_span(
+        f"{tool}.{stage}", attributes={"sambu.tool": tool, "sambu.stage": stage, **attributes}
+    ) as otel_span:
+        try:
+            yield otel_span
+        except Exception as e:
+            telemetry.count_error(tool, stage)
+            otel_span.record_exception(e)
+            otel_span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            telemetry.observe(tool, stage, time.perf_counter() - started_at)
+
+
+def isErrorResult(result) -> bool:
+    return isinstance(result, dict) and any(
+        str(key).lower().startswith("error") for key in result
+    )
+
+
+def instrument(func):
+    """Wrap a tool so every call is timed and its error results are counted."""
+
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_tool.set(name)
+            try:
+                with span("total", name):
+                    result = await func(*args, **kwargs)
+                if isErrorResult(result):
+                    telemetry.count_error(name, "total")
+                return result
+            finally:
+                current_tool.reset(token)
+
+    else:
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = current_tool.set(name)
+            try:
+                with span("total", name):
+                    result = func(*args, **kwargs)
+                if isErrorResult(result):
+                    telemetry.count_error(name, "total")
+                return result
+            finally:
+                current_tool.reset(token)
+
+    return wrapper
+
+
+def configureTracing() -> None:
+    """Export spans over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set."""
+
+    if not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"OTLP exporter unavailable, traces stay local: {e}")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "sambu"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+def startMetricsServer(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve the Prometheus text format on /metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
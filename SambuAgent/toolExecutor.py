@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from SambuAgent.telemetry import telemetry
+
+
+THREAD_POOL_SIZE = int(os.environ.get("TOOL_THREAD_POOL_SIZE", "16"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("TOOL_MAX_CONCURRENCY", "4"))
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("TOOL_TIMEOUT_SECONDS", "30"))
+
+# Tools that are heavy enough to deserve a tighter cap than the default.
+TOOL_CONCURRENCY = {
+    "getChainIdsAndData": 2,
+    "getAllTrades": 2,
+    "getTradeHistory": 2,
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=THREAD_POOL_SIZE, thread_name_prefix="sambu-tool"
+)
+
+
+class ToolLimiter:
+    """Per-tool concurrency cap and counters for a synchronous tool."""
+
+    def __init__(self, name: str, max_concurrency: int, timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.queue_seconds = 0.0
+        self._loop = None
+        self._semaphore = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def stats(self) -> dict:
+        return {
+            "In Flight": self.in_flight,
+            "Waiting": self.waiting,
+            "Calls": self.calls,
+            "Timeouts": self.timeouts,
+            "Max Concurrency": self.max_concurrency,
+            "Average Queue Delay (s)": (
+                round(self.queue_seconds / self.calls, 6) if self.calls else 0.0
+            ),
+        }
+
+
+limiters: dict[str, ToolLimiter] = {}
+
+
+def offload(
+    func,
+    max_concurrency: int | None = None,
+    timeout: float | None = None,
+):
+    """
+    Run a synchronous tool on the shared thread pool instead of the event loop.
+
+    The returned coroutine function keeps the tool's name, docstring and
+    signature, so ADK builds the same declaration for it. Async tools are
+    returned unchanged.
+    """
+
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    name = func.__name__
+    limiter = limiters[name] = ToolLimiter(
+        name,
+        max_concurrency or TOOL_CONCURRENCY.get(name, DEFAULT_MAX_CONCURRENCY),
+        timeout or DEFAULT_TIMEOUT_SECONDS,
+    )
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = limiter.semaphore()
+        queued_at = time.perf_counter()
+        started = {}
+
+        limiter.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            limiter.waiting -= 1
+        limiter.in_flight += 1
+
+        def run():
+            started["at"] = time.perf_counter()
+            return func(*args, **kwargs)
+
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(executor, context.run, run)
+
+        def release(_):
+            # The slot is held until the thread is done, even after a timeout,
+            # so a stuck call keeps counting against the tool's cap.
+            limiter.in_flight -= 1
+            semaphore.release()
+
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), limiter.timeout)
+        except asyncio.TimeoutError:
+            limiter.timeouts += 1
+            telemetry.count_error(name, "timeout")
+            return {"Error": f"{name} timed out after {limiter.timeout} seconds."}
+        finally:
+            delay = started.get("at", time.perf_counter()) - queued_at
+            limiter.calls += 1
+            limiter.queue_seconds += delay
+            telemetry.observe(name, "queue_wait", delay)
+
+    return wrapper
+
+
+def getToolExecutorStats() -> dict:
+    """
+    Get queueing delay, in-flight calls and timeouts of the synchronous tool thread pool.
+
+    Returns:
+        dict: A dictionary containing per-tool executor statistics.
+    """
+
+    return {
+        "Tool Executor": {
+            name: limiter.stats()
+            for name, limiter in sorted(limiters.items())
+            if limiter.calls or limiter.in_flight or limiter.waiting
+        }
+    }
@@ -0,0 +1,246 @@
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from SambuAgent.responseCache import state_versions
+from SambuAgent.telemetry import isErrorResult
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", "500"))
+
+# Write tools that wait for an on-chain confirmation; the agent gets a job ID
+# back straight away instead of holding the turn open.
+JOB_TOOLS = {
+    "deposit",
+    "withdraw",
+    "limitOrder",
+    "placeMultipleOrders",
+    "cancelMultipleOrders",
+    "cancelAndPlaceMultipleOrders",
+    "reconcileOrders",
+    "collapsePosition",
+    "collapseAllPositions",
+    "addMargin",
+    "updateTakeProfit",
+    "updateStopLoss",
+    "settlePNL",
+    "signAndSendTransaction",
+}
+
+# Arguments that hold a private key even though their name does not say so.
+KEY_ARGUMENTS = {"signAndSendTransaction": {"sender_address"}}
+
+# Telegram chat the current agent turn is answering, set by the bot.
+current_chat = contextvars.ContextVar("current_chat", default=None)
+
+
+def publicArguments(tool: str, arguments: dict) -> dict:
+    """Job arguments safe to list, with private keys replaced by the addresses they sign for."""
+
+    secret = {key for key in arguments if "private" in key} | KEY_ARGUMENTS.get(tool, set())
+    public = {key: value for key, value in arguments.items() if key not in secret}
+    keys = []
+    for key in secret & arguments.keys():
+        value = arguments[key]
+        keys += value if isinstance(value, (list, tuple)) else [value]
+    if keys:
+        # transactionPool imports the transaction handlers, which import this module.
+        from SambuAgent.SambuTools.transactionPool import accountKey
+
+        accounts = []
+        for key in keys:
+            try:
+                accounts.append(accountKey(str(key)))
+            except Exception:
+                accounts.append("invalid key")
+        public["accounts"] = accounts
+    return public
+
+
+class Job:
+    __slots__ = (
+        "job_id",
+        "tool",
+        "arguments",
+        "chat_id",
+        "status",
+        "result",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+
+    def __init__(self, tool: str, arguments: dict, chat_id=None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.tool = tool
+        # Private keys never end up in job listings.
+        self.arguments = publicArguments(tool, arguments)
+        self.chat_id = chat_id
+        self.status = "queued"
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def describe(self) -> dict:
+        return {
+            "Job ID": self.job_id,
+            "Tool": self.tool,
+            "Arguments": self.arguments,
+            "Status": self.status,
+            "Result": self.result,
+            "Created At": int(self.created_at),
+            "Duration (s)": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at and self.started_at
+                else None
+            ),
+        }
+
+
+class ToolJobQueue:
+    """
+    Run long write tools in the background.
+
+    `submit` records a job and returns at once; a fixed set of workers runs
+    the queued calls and, when a notifier is set, pushes the outcome to the
+    chat that asked for it. Finished jobs are kept in a bounded history for
+    `getJobStatus`.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history_size: int = JOB_HISTORY_SIZE):
+        self.workers = workers
+        self.history_size = history_size
+        self.jobs: OrderedDict = OrderedDict()
+        # Async callable (chat_id, text) used to push finished jobs to Telegram.
+        self.notifier = None
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+
+    def _bind_loop(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Workers start from an empty context so they do not keep the
+            # chat of whichever turn happened to start them.
+            self._tasks = [
+                contextvars.Context().run(asyncio.create_task, self._worker())
+                for _ in range(self.workers)
+            ]
+        return self._queue
+
+    async def _worker(self) -> None:
+        while True:
+            job, call = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            # The tool runs on behalf of the chat that queued it.
+            token = current_chat.set(job.chat_id)
+            try:
+                job.result = await call()
+                job.status = "failed" if isErrorResult(job.result) else "done"
+            except Exception as e:
+                job.result = {"Error": f"An error occurred:, {e}"}
+                job.status = "failed"
+            finally:
+                current_chat.reset(token)
+                job.finished_at = time.time()
+                state_versions.bump("account")
+                self._queue.task_done()
+            await self._notify(job)
+
+    async def _notify(self, job: Job) -> None:
+        if self.notifier is None or job.chat_id is None:
+            return
+        outcome = "finished" if job.status == "done" else "failed"
+        text = (
+            f"Job {job.job_id} ({job.tool}) {outcome}:\n"
+            f"{json.dumps(job.result, default=str, indent=2)[:3500]}"
+        )
+        try:
+            await self.notifier(job.chat_id, text)
+        except Exception as e:
+            logger.warning("Could not notify chat %s about job %s: %s", job.chat_id, job.job_id, e)
+
+    def submit(self, tool: str, call, arguments: dict) -> Job:
+        queue = self._bind_loop()
+        job = Job(tool, arguments, current_chat.get())
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.history_size:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            del self.jobs[oldest_id]
+        queue.put_nowait((job, call))
+        return job
+
+    def background(self, func):
+        """Wrap an async tool so calling it queues a job and returns its ID."""
+
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            job = self.submit(name, functools.partial(func, *args, **kwargs), kwargs)
+            return {
+                "Job ID": job.job_id,
+                "Status": job.status,
+                "Message": (
+                    f"{name} is running in the background. The result will be sent "
+                    "to this chat when it is done; use getJobStatus to check on it."
+                ),
+            }
+
+        return wrapper
+
+
+tool_jobs = ToolJobQueue()
+
+
+def getJobStatus(job_id: str) -> dict:
+    """
+    Get the status and result of a background job started by a write tool.
+
+    Args:
+        job_id (str): The Job ID returned when the tool was called.
+
+    Returns:
+        dict: A dictionary containing the job's status and, once finished, its result.
+    """
+
+    job = tool_jobs.jobs.get(job_id)
+    if job is None:
+        return {"Error": f"No job with ID {job_id}."}
+    return {"Job": job.describe()}
+
+
+def listJobs() -> dict:
+    """
+    List recent background jobs and their status.
+
+    Returns:
+        dict: A dictionary containing the chat's most recent jobs, newest first.
+    """
+
+    chat_id = current_chat.get()
+    jobs = [
+        job.describe()
+        for job in reversed(tool_jobs.jobs.values())
+        if chat_id is None or job.chat_id == chat_id
+    ]
+    return {"Jobs": jobs[:20]}
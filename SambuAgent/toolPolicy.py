@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import os
+import time
+from contextlib import AsyncExitStack
+
+from SambuAgent.responseCache import (
+    ACCOUNT_TOOLS,
+    MARKET_TOOLS,
+    STATIC_TOOLS,
+    VOLATILE_TOOLS,
+)
+from SambuAgent.SambuTools.transactionPool import accountKey
+from SambuAgent.telemetry import telemetry
+
+
+# Read-only tools from one model turn that may run at the same time.
+MAX_PARALLEL_READS = int(os.environ.get("TOOL_MAX_PARALLEL_READS", "8"))
+
+PARALLEL_SAFE_TOOLS = MARKET_TOOLS | STATIC_TOOLS | ACCOUNT_TOOLS | VOLATILE_TOOLS
+
+
+def callAccounts(kwargs: dict) -> list[str]:
+    """Accounts a write call acts on, as addresses where a private key was given."""
+
+    accounts = set()
+    private_keys = list(kwargs.get("private_keys") or [])
+    if kwargs.get("private_key"):
+        private_keys.append(kwargs["private_key"])
+    for private_key in private_keys:
+        try:
+            accounts.add(accountKey(private_key))
+        except Exception:
+            accounts.add(str(private_key))
+    for name in ("sender_address", "wallet_address"):
+        if kwargs.get(name):
+            accounts.add(str(kwargs[name]))
+    return sorted(accounts) or ["default"]
+
+
+class ToolPolicy:
+    """
+    Decide how the tool calls of one model turn may overlap.
+
+    ADK already dispatches every function call of a turn concurrently and
+    merges the responses back in call order. Read-only tools are let through
+    up to `max_parallel_reads` at a time; any other tool is treated as a write
+    and holds a lock on each account it touches, so two writes for the same
+    account never race for a sequence number while other accounts proceed.
+    """
+
+    def __init__(self, max_parallel_reads: int = MAX_PARALLEL_READS):
+        self.max_parallel_reads = max_parallel_reads
+        self._loop = None
+        self._reads = None
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._reads = asyncio.Semaphore(self.max_parallel_reads)
+            self._locks = {}
+
+    def _lock_for(self, account: str) -> asyncio.Lock:
+        lock = self._locks.get(account)
+        if lock is None:
+            lock = self._locks[account] = asyncio.Lock()
+        return lock
+
+    def apply(self, func):
+        """Wrap an async tool so its calls follow the read/write policy."""
+
+        name = func.__name__
+        parallel_safe = name in PARALLEL_SAFE_TOOLS
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            self._bind_loop()
+            queued_at = time.perf_counter()
+            async with AsyncExitStack() as stack:
+                if parallel_safe:
+                    await stack.enter_async_context(self._reads)
+                else:
+                    # Sorted order, so multi-account writes cannot deadlock.
+                    for account in callAccounts(kwargs):
+                        await stack.enter_async_context(self._lock_for(account))
+                telemetry.observe(name, "policy_wait", time.perf_counter() - queued_at)
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+
+tool_policy = ToolPolicy()
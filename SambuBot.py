@@ -2,18 +2,16 @@
 # pylint: disable=unused-argument
 # This program is dedicated to the public domain under the CC0 license.
 
-import os, uuid, asyncio
+import os, uuid, asyncio, multiprocessing
 
 import uvicorn
 
-from google.adk.memory import InMemoryMemoryService
-from google.adk.runners import Runner
-
-from google.adk.sessions import InMemorySessionService, Session
-
 from google.genai import types
 
-from SambuAgent.agent import root_agent
+from SambuAgent.botWorkers import WorkerPool
+from SambuAgent.responseCache import response_cache
+from SambuAgent.telemetry import configureTracing, span, startMetricsServer
+from SambuAgent.toolJobs import current_chat, tool_jobs
 
 
 import logging, os
@@ -26,6 +24,7 @@ load_dotenv(".env")
 from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     ContextTypes,
     ConversationHandler,
@@ -42,63 +41,124 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
-session_service = InMemorySessionService()
-memory_service = InMemoryMemoryService()
+APP_NAME = "SambuAgent"
+QUERY = range(1)
 
+# Built by loadAgent, only in processes that answer chats.
+runner = None
+chat_sessions = None
+fast_router = None
 
-APP_NAME = "SambuAgent"
-USER_ID = str(uuid.uuid4())
-SESSION_ID = str(uuid.uuid4())  # Using a fixed ID for simplicity
-SESSION = None
+TOKEN = f"{os.environ.get('SAMBUBOT_TOKEN')}"
+# Number of worker processes chats are sharded over; 1 runs everything in-process.
+BOT_WORKERS = int(os.environ.get("BOT_WORKERS", "1"))
+# Updates handled at once across chats; each chat's own updates still run in order.
+BOT_CONCURRENT_UPDATES = int(os.environ.get("BOT_CONCURRENT_UPDATES", "64"))
+worker_pool = None
+print(TOKEN)
 
 
-async def initialize_session():
-    SESSION = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
-    SESSION_ID = SESSION.id
-    print(f"Session:  {SESSION}")
-    # await memory_service.add_session_to_memory(session=SESSION)
-    return SESSION, SESSION_ID
+def loadAgent(session_db_path: str | None = None, memory_db_path: str | None = None) -> None:
+    """Build the agent runner and the session stores.
 
+    The dispatcher of a worker pool never calls this, so it does not load the
+    agent, its tools or the session databases.
+    """
+    global runner, chat_sessions, fast_router
+    if runner is not None:
+        return
 
-SESSION, SESSION_ID = asyncio.run(initialize_session())
-QUERY = range(1)
+    from google.adk.memory import SqliteMemoryService
+    from google.adk.runners import Runner
 
-runner = Runner(
-    agent=root_agent,  # The agent we want to run
-    app_name=APP_NAME,  # Associates runs with our app
-    session_service=session_service,  # Uses our session manager
-)
+    from SambuAgent.agent import root_agent
+    from SambuAgent.fastRouter import fast_router as router
+    from SambuAgent.sessionStore import (
+        MEMORY_DB_PATH,
+        SESSION_DB_PATH,
+        ChatSessions,
+        CompactingSessionService,
+    )
 
-TOKEN = f"{os.environ.get('SAMBUBOT_TOKEN')}"
-print(TOKEN)
+    memory_service = SqliteMemoryService(memory_db_path or MEMORY_DB_PATH)
+    # Conversations survive restarts; each chat gets its own session, loaded on first use.
+    session_service = CompactingSessionService(
+        session_db_path or SESSION_DB_PATH, memory_service=memory_service
+    )
+    chat_sessions = ChatSessions(session_service, APP_NAME)
+    fast_router = router
+    runner = Runner(
+        agent=root_agent,  # The agent we want to run
+        app_name=APP_NAME,  # Associates runs with our app
+        session_service=session_service,  # Uses our session manager
+        memory_service=memory_service,
+    )
 
 
-async def call_agent(runner, user_id, session_id, query):
-    """Sends a query to the agent and prints the final response."""
-    print(f"\n>>> User Query: {query}")
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates of different chats concurrently, but each chat's in arrival order."""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: dict = {}
+        self._waiting: dict = {}
+
+    async def do_process_update(self, update, coroutine) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        chat_id = chat.id if chat is not None else None
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        self._waiting[chat_id] = self._waiting.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._waiting[chat_id] -= 1
+            if not self._waiting[chat_id]:
+                del self._waiting[chat_id]
+                del self._locks[chat_id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
 
-    root_agent.run_async
+
+async def call_agent(runner, user_id, session_id, query, tool_calls=None):
+    """Sends a query to the agent and prints the final response.
+
+    When `tool_calls` is a list, the (name, args) of every tool the agent
+    called during the turn is appended to it.
+    """
+    print(f"\n>>> User Query: {query}")
 
     # Prepare the user's message in ADK format
     content = types.Content(role="user", parts=[types.Part(text=query)])
 
     final_response_text = "Agent did not produce a final response."  # Default
 
-    async for event in runner.run_async(
-        user_id=user_id, session_id=session_id, new_message=content
-    ):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                # Assuming text response in the first part
-                final_response_text = event.content.parts[0].text
-            elif (
-                event.actions and event.actions.escalate
-            ):  # Handle potential errors/escalations
-                final_response_text = (
-                    f"Agent escalated: {event.error_message or 'No specific message.'}"
+    with span("agent_turn", "call_agent"):
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=content
+        ):
+            if tool_calls is not None:
+                tool_calls.extend(
+                    (call.name, call.args) for call in event.get_function_calls()
                 )
-            # Add more checks here if needed (e.g., specific error codes)
-            break  # Stop processing events once the final response is found
+            # Every tool is long-running, so its function call event is also
+            # flagged final; keep going until the tool has run and the model answered.
+            if event.is_final_response() and not event.get_function_calls():
+                if event.content and event.content.parts:
+                    # Assuming text response in the first part
+                    final_response_text = event.content.parts[0].text
+                elif (
+                    event.actions and event.actions.escalate
+                ):  # Handle potential errors/escalations
+                    final_response_text = (
+                        f"Agent escalated: {event.error_message or 'No specific message.'}"
+                    )
+                # Add more checks here if needed (e.g., specific error codes)
+                break  # Stop processing events once the final response is found
 
     print(f"<<< Agent Response: {final_response_text}")
     print(f"Response:  {final_response_text}")
@@ -122,15 +182,37 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return QUERY
 
 
+async def answer(chat_id, text: str) -> str:
+    """Answers one message from a chat, through the fast path, the cache or the agent."""
+    user_id, session_id = await chat_sessions.session_for(chat_id)
+    # Background jobs started during this turn report back to this chat.
+    current_chat.set(chat_id)
+
+    # Simple lookups are answered directly; everything else goes to the agent.
+    reply = await fast_router.route(text)
+    if reply is None:
+        reply = response_cache.get(user_id, text)
+    if reply is None:
+        tool_calls = []
+        reply = await call_agent(runner, user_id, session_id, text, tool_calls)
+        if not reply.startswith(("Agent did not", "Agent escalated")):
+            response_cache.store(user_id, text, reply, tool_calls)
+        await chat_sessions.compact(user_id, session_id)
+
+    return reply
+
+
 async def query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Stores query and processes output."""
     user = update.message.from_user
     logger.info("Query from %s: %s", user.first_name, update.message.text)
 
-    await update.message.reply_text(
-        await call_agent(runner, USER_ID, SESSION_ID, update.message.text),
-        reply_markup=ReplyKeyboardRemove(),
-    )
+    if worker_pool is not None:
+        reply = await worker_pool.dispatch(update.effective_chat.id, update.message.text)
+    else:
+        reply = await answer(update.effective_chat.id, update.message.text)
+
+    await update.message.reply_text(reply, reply_markup=ReplyKeyboardRemove())
 
     return ConversationHandler.WAITING
 
@@ -148,8 +230,42 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 def main() -> None:
     """Run the bot."""
+    global worker_pool
+
+    configureTracing()
+    if os.environ.get("METRICS_PORT"):
+        # Prometheus scrape target for per-tool latency histograms and error counters.
+        startMetricsServer(int(os.environ["METRICS_PORT"]))
+
+    async def notify(chat_id, text):
+        await application.bot.send_message(chat_id=chat_id, text=text)
+
+    async def post_init(application: Application) -> None:
+        if worker_pool is not None:
+            worker_pool.start(notify)
+
+    async def post_shutdown(application: Application) -> None:
+        if worker_pool is not None:
+            worker_pool.stop()
+
+    if BOT_WORKERS > 1:
+        # This process only talks to Telegram; chats are sharded over worker
+        # processes that share market data through a manager-backed dict.
+        manager = multiprocessing.Manager()
+        worker_pool = WorkerPool(BOT_WORKERS, manager.dict())
+    else:
+        loadAgent()
+        tool_jobs.notifier = notify
+
     # Create the Application and pass it your bot's token.
-    application = Application.builder().token(TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor(BOT_CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
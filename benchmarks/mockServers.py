@@ -0,0 +1,380 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+TYPE_ARGUMENT = "0x1::aptos_coin::AptosCoin"
+MODULE = "0x1::perpetual_scripts"
+ADDRESS = "0x" + "ab" * 32
+
+
+class StandInServer:
+    """
+    Base for the local KANA and Aptos stand-ins.
+
+    Every request sleeps for `latency` seconds (plus up to `jitter` extra) and
+    fails with HTTP 500 with probability `error_rate`, so benchmarks can model
+    slow or flaky upstreams.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _serve(self, method: str):
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                server.requests += 1
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+
+                if random.random() < server.error_rate:
+                    server.errors += 1
+                    status, payload = 500, {"message": "Injected error"}
+                else:
+                    status, payload = server.route(method, url.path, query, body)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        raise NotImplementedError
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def kanaResponse(data) -> dict:
+    return {"success": True, "message": "Fetched successfully", "data": data}
+
+
+def entryPayload(function: str, arguments: list) -> dict:
+    return kanaResponse(
+        {
+            "function": f"{MODULE}::{function}",
+            "functionArguments": arguments,
+            "typeArguments": [TYPE_ARGUMENT],
+        }
+    )
+
+
+class MockKanaServer(StandInServer):
+    """Serves the KANA perps REST endpoints used by SambuTools with canned data."""
+
+    def __init__(self, *args, markets: tuple = (66, 501), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.markets = markets
+        self.prices = {market_id: 10.0 + market_id / 100 for market_id in markets}
+
+    def market_price(self, market_id: int) -> float:
+        price = self.prices.setdefault(market_id, 10.0)
+        price *= 1 + random.uniform(-0.001, 0.001)
+        self.prices[market_id] = price
+        return round(price, 4)
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+        market_id = int(query.get("marketId", self.markets[0]))
+        json_body = json.loads(body or b"{}")
+
+        if method == "POST":
+            market_id = int(json_body.get("marketId", market_id))
+            count = len(json_body.get("sizes") or json_body.get("cancelOrderIds") or [])
+            cancel_ids = [int(order_id) for order_id in json_body.get("cancelOrderIds", [])]
+            if endpoint == "placeMultipleOrders":
+                return 200, entryPayload(
+                    "place_multiple_orders",
+                    [market_id, [False] * count, [True] * count, [False] * count]
+                    + [[1000] * count] * 3
+                    + [[0] * count] * 3,
+                )
+            if endpoint == "cancelMultipleOrders":
+                return 200, entryPayload(
+                    "cancel_multiple_orders",
+                    [market_id, cancel_ids, [True] * len(cancel_ids)],
+                )
+            if endpoint == "cancelAndPlaceMultipleOrders":
+                count = len(json_body.get("sizes", []))
+                return 200, entryPayload(
+                    "cancel_and_place_multiple_orders",
+                    [market_id, cancel_ids, [True] * len(cancel_ids)]
+                    + [[False] * count, [True] * count, [False] * count]
+                    + [[1000] * count] * 3
+                    + [[0] * count] * 3,
+                )
+            return 404, {"message": f"Unknown endpoint {endpoint}"}
+
+        price = self.market_price(market_id)
+        wallet = query.get("userAddress", ADDRESS)
+        now = int(time.time())
+        reads = {
+            "getMarketInfo": lambda: [
+                {"market_id": market_id, "base_name": "APT/USDC", "lot_size": 1000}
+            ],
+            "getPerpetualAssetsInfo": lambda: [
+                {"market_id": market_id, "max_leverage": 20, "maintenance_margin": 0.05}
+            ],
+            "getAccountAptBalance": lambda: 12.5,
+            "getProfileAddress": lambda: ADDRESS,
+            "getNetProfileBalance": lambda: 100.0,
+            "getMarketPrice": lambda: {
+                "bestAskPrice": round(price * 1.0005, 4),
+                "bestBidPrice": round(price * 0.9995, 4),
+            },
+            "getLastPlacedPrice": lambda: price,
+            "getAllOpenOrderIds": lambda: [str(1000 + index) for index in range(5)],
+            "getPositions": lambda: [
+                {
+                    "address": wallet,
+                    "market_id": str(market_id),
+                    "leverage": 2,
+                    "trade_side": True,
+                    "size": "2",
+                    "entry_price": str(round(price * 0.98, 4)),
+                    "margin": str(round(price * 0.98, 4)),
+                    "liq_price": str(round(price * 0.5, 4)),
+                }
+            ],
+            "getTradeHistory": lambda: self.trades(market_id, price, now, 50),
+            "getAllTrades": lambda: self.trades(market_id, price, now, 200),
+            "getFills": lambda: self.trades(market_id, price, now, 20),
+            "getOpenOrdersFromContract": lambda: [
+                {"order_id": str(1000 + index), "price": price, "size": 1}
+                for index in range(5)
+            ],
+            "getPositionsFromContract": lambda: [],
+            "fetchOrderStatusById": lambda: {
+                "order_id": query.get("orderId"),
+                "status": "Open",
+            },
+            "getFundingHistory": lambda: [
+                {
+                    "market_id": str(market_id),
+                    "funding_fee": "-0.0125",
+                    "timestamp": now - index * 3600,
+                }
+                for index in range(24)
+            ],
+            "getDepositAndWithdrawHistory": lambda: [
+                {"amount": "100", "type": "deposit", "timestamp": now - 86400}
+            ],
+        }
+        if endpoint in reads:
+            return 200, kanaResponse(reads[endpoint]())
+
+        payloads = {
+            "placeLimitOrder": lambda: entryPayload(
+                "place_limit_order",
+                [str(market_id), "true", "false", "1000", "5000", "2", "1", "0", "0"],
+            ),
+            "placeMarketOrder": lambda: entryPayload(
+                "place_market_order",
+                [str(market_id), "true", "false", "1000", "2", "0", "0"],
+            ),
+            "collapsePosition": lambda: entryPayload("collapse_position", [str(market_id)]),
+            "addMargin": lambda: entryPayload("add_margin", [str(market_id), "true", "1000"]),
+            "updateTakeProfit": lambda: entryPayload(
+                "update_take_profit", [str(market_id), "true", "1000"]
+            ),
+            "updateStopLoss": lambda: entryPayload(
+                "update_stop_loss", [str(market_id), "true", "1000"]
+            ),
+            "deposit": lambda: entryPayload("deposit", [ADDRESS, "1000"]),
+            "withdrawSpecifiMarket": lambda: entryPayload("withdraw", [ADDRESS, "1000"]),
+            "settlePnl": lambda: entryPayload("settle_pnl", [ADDRESS, "1000"]),
+        }
+        if endpoint in payloads:
+            return 200, payloads[endpoint]()
+
+        return 404, {"message": f"Unknown endpoint {endpoint}"}
+
+    @staticmethod
+    def trades(market_id: int, price: float, now: int, count: int) -> list:
+        return [
+            {
+                "market_id": str(market_id),
+                "price": round(price * (1 + random.uniform(-0.01, 0.01)), 4),
+                "size": str(random.randint(1, 10)),
+                "side": random.choice([True, False]),
+                "timestamp": now - index * 60,
+            }
+            for index in range(count)
+        ]
+
+
+class MockRpcEndpoint(StandInServer):
+    """
+    EVM JSON-RPC endpoint that answers `eth_chainId` with `chain_id`.
+
+    Latency, jitter and error rate come from StandInServer, so several of
+    these make a test bed for the RPC prober's ranking.
+    """
+
+    def __init__(self, *args, chain_id: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chain_id = chain_id
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        request = json.loads(body or b"{}")
+        if request.get("method") == "eth_chainId":
+            result = hex(self.chain_id)
+        elif request.get("method") == "eth_blockNumber":
+            result = hex(int(time.time()))
+        else:
+            return 200, {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {"code": -32601, "message": "Method not found"},
+            }
+        return 200, {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+
+class FakeAptosNode(StandInServer):
+    """
+    Minimal Aptos fullnode and faucet.
+
+    Submitted transactions stay pending for `confirm_delay` seconds before they
+    are reported as committed. The node API is served under `/v1`, like a
+    real fullnode's, and the faucet's `/mint` at the root.
+    """
+
+    def __init__(self, *args, confirm_delay: float = 0.0, chain_id: int = 4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.confirm_delay = confirm_delay
+        self.chain_id = chain_id
+        self.version = 1
+        self.sequence_numbers: dict[str, int] = {}
+        self.transactions: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record_transaction(self, body: bytes, sender: str = ADDRESS) -> str:
+        txn_hash = "0x" + hashlib.sha3_256(body + str(time.time_ns()).encode()).hexdigest()
+        with self._lock:
+            self.version += 1
+            self.sequence_numbers[sender] = self.sequence_numbers.get(sender, 0) + 1
+            self.transactions[txn_hash] = {
+                "hash": txn_hash,
+                "version": str(self.version),
+                "sender": sender,
+                "submitted_at": time.monotonic(),
+            }
+        return txn_hash
+
+    def route(self, method: str, path: str, query: dict, body: bytes):
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["mint"] and method == "POST":
+            return 200, [self.record_transaction(body, query.get("address", ADDRESS))]
+
+        if parts[:1] != ["v1"]:
+            return 404, {"message": f"Unknown path {path}"}
+        parts = parts[1:]
+
+        if not parts:
+            return 200, {
+                "chain_id": self.chain_id,
+                "epoch": "1",
+                "ledger_version": str(self.version),
+                "block_height": str(self.version),
+                "ledger_timestamp": str(int(time.time() * 1_000_000)),
+                "node_role": "full_node",
+            }
+
+        if parts[0] == "accounts" and len(parts) >= 2:
+            address = parts[1]
+            if len(parts) >= 4 and parts[2] == "balance":
+                return 200, 1_000_000_000
+            if len(parts) == 2:
+                return 200, {
+                    "sequence_number": str(self.sequence_numbers.get(address, 0)),
+                    "authentication_key": address,
+                }
+            if parts[2] == "transactions":
+                return 200, []
+            return 200, []
+
+        if parts[0] == "transactions":
+            if method == "POST" and len(parts) == 1:
+                return 202, {"hash": self.record_transaction(body)}
+            if method == "POST" and parts[1:] == ["simulate"]:
+                return 200, [
+                    {"success": True, "gas_used": "12", "gas_unit_price": "100"}
+                ]
+            if len(parts) == 3 and parts[1] == "by_hash":
+                transaction = self.transactions.get(parts[2])
+                if transaction is None:
+                    return 404, {"message": "Transaction not found"}
+                pending = (
+                    time.monotonic() - transaction["submitted_at"] < self.confirm_delay
+                )
+                return 200, {
+                    "type": "pending_transaction" if pending else "user_transaction",
+                    "hash": transaction["hash"],
+                    "version": transaction["version"],
+                    "sender": transaction["sender"],
+                    "success": not pending,
+                    "vm_status": "Executed successfully",
+                    "gas_used": "12",
+                    "events": [],
+                }
+
+        if parts[0] == "view" and method == "POST":
+            return 200, ["1000000000"]
+
+        return 404, {"message": f"Unknown path {path}"}
@@ -0,0 +1,361 @@
+"""
+Benchmark every SambuTools function and the `call_agent` path against local
+stand-ins for the KANA REST API and an Aptos node.
+
+Run from the repository root:
+
+    python -m benchmarks.runBenchmarks --iterations 50 --concurrency 8 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.mockServers import MockKanaServer, FakeAptosNode
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def isError(result) -> bool:
+    return isinstance(result, dict) and any(str(key).startswith("Error") for key in result)
+
+
+async def invoke(func, kwargs: dict):
+    if inspect.iscoroutinefunction(func):
+        return await func(**kwargs)
+    return await asyncio.to_thread(func, **kwargs)
+
+
+async def measureLatency(func, kwargs: dict, iterations: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                result = await invoke(func, kwargs)
+                errors += isError(result)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "p50 (ms)": round(percentile(latencies, 50) * 1000, 2),
+        "p95 (ms)": round(percentile(latencies, 95) * 1000, 2),
+        "p99 (ms)": round(percentile(latencies, 99) * 1000, 2),
+        "Throughput (calls/s)": round(iterations / elapsed, 2),
+        "Errors": errors,
+    }
+
+
+async def measureAllocations(func, kwargs: dict, iterations: int) -> dict:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(iterations):
+            try:
+                await invoke(func, kwargs)
+            except Exception:
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocated_blocks = sum(
+        max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno")
+    )
+    return {
+        "Peak KiB": round((peak - baseline) / 1024, 1),
+        "Retained Blocks/call": round(allocated_blocks / iterations, 1),
+    }
+
+
+def toolCases(private_key: str, wallet: str, market_id: int) -> list:
+    from SambuAgent import agent
+    from SambuAgent.SambuTools.portfolioSnapshot import snapshot_cache
+
+    async def coldPortfolioSnapshot(wallet_address: str, market_ids: list[int]) -> dict:
+        snapshot_cache.clear()
+        return await agent.getPortfolioSnapshot(wallet_address, market_ids)
+
+    key = {"private_key": private_key}
+    market = {"market_id": market_id}
+    owner = {"market_id": market_id, "wallet_address": wallet}
+    return [
+        ("fetchMarketInfo", agent.fetchMarketInfo, market),
+        ("perpMarketInfo", agent.perpMarketInfo, market),
+        ("getWalletBalance", agent.getWalletBalance, {"wallet_address": wallet}),
+        ("getWalletAptBalance", agent.getWalletAptBalance, {"wallet_address": wallet}),
+        ("getProfileAddress", agent.getProfileAddress, {"wallet_address": wallet}),
+        ("getNetProfileBalance", agent.getNetProfileBalance, {"wallet_address": wallet}),
+        ("getTradeHistory", agent.getTradeHistory, {"wallet_address": wallet}),
+        ("getMarketPrice", agent.getMarketPrice, market),
+        ("getLastExecutedPrice", agent.getLastExecutedPrice, market),
+        ("getAllOpenOrderIds", agent.getAllOpenOrderIds, owner),
+        ("getPositions", agent.getPositions, owner),
+        ("getAllTrades", agent.getAllTrades, market),
+        (
+            "getDepositAndWithdrawHistory",
+            agent.getDepositAndWithdrawHistory,
+            {"wallet_address": wallet},
+        ),
+        ("getChainIdsAndData", agent.getChainIdsAndData, {}),
+        ("getAccountBalance", agent.getAccountBalance, {"wallet_address": private_key}),
+        (
+            "getPortfolioSnapshot (cold)",
+            coldPortfolioSnapshot,
+            {"wallet_address": wallet, "market_ids": [market_id]},
+        ),
+        (
+            "getPortfolioSnapshot",
+            agent.getPortfolioSnapshot,
+            {"wallet_address": wallet, "market_ids": [market_id]},
+        ),
+        (
+            "limitOrder",
+            agent.limitOrder,
+            {
+                **key,
+                **market,
+                "trade_side": True,
+                "direction": False,
+                "size": 1,
+                "price": 10,
+                "leverage": 2,
+            },
+        ),
+        (
+            "placeMarketOrder",
+            agent.placeMarketOrder,
+            {**key, **market, "trade_side": True, "direction": False, "size": 1, "leverage": 2},
+        ),
+        (
+            "placeMultipleOrders",
+            agent.placeMultipleOrders,
+            {
+                **key,
+                **market,
+                "order_types": [True] * 4,
+                "trade_sides": [True] * 4,
+                "directions": [False] * 4,
+                "sizes": [1.0] * 4,
+                "prices": [10.0] * 4,
+                "leverage": [2] * 4,
+            },
+        ),
+        (
+            "cancelMultipleOrders",
+            agent.cancelMultipleOrders,
+            {**key, **market, "order_ids": [1001, 1002], "order_sides": [True, True]},
+        ),
+        (
+            "cancelAndPlaceMultipleOrders",
+            agent.cancelAndPlaceMultipleOrders,
+            {
+                **key,
+                **market,
+                "order_ids": [1001],
+                "order_sides": [True],
+                "order_types": [True],
+                "trade_sides": [True],
+                "directions": [False],
+                "sizes": [1.0],
+                "prices": [10.0],
+                "leverages": [2],
+            },
+        ),
+        ("collapsePosition", agent.collapsePosition, {**key, **market}),
+        ("addMargin", agent.addMargin, {**key, **market, "trade_side": True, "amount": 10}),
+        (
+            "updateTakeProfit",
+            agent.updateTakeProfit,
+            {**key, **market, "trade_side": True, "new_take_profit_price": 12},
+        ),
+        (
+            "updateStopLoss",
+            agent.updateStopLoss,
+            {**key, **market, "trade_side": True, "new_stop_loss_price": 8},
+        ),
+        ("deposit", agent.deposit, {"amount": 10, "user_address": wallet}),
+        (
+            "withdraw",
+            agent.withdraw,
+            {**key, **market, "amount": 10, "wallet_address": wallet},
+        ),
+        ("settlePNL", agent.settlePNL, {**key, **market, "wallet_address": wallet}),
+        (
+            "buildTransaction",
+            agent.buildTransaction,
+            {"sender_address": private_key, "receiver_address": wallet, "amount": 10},
+        ),
+        (
+            "signAndSendTransaction",
+            agent.signAndSendTransaction,
+            {"sender_address": private_key, "amount": 10},
+        ),
+    ]
+
+
+def stubbedAgentCase(market_id: int):
+    """Build a `call_agent` case whose model asks for one price lookup, then answers."""
+
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    from SambuAgent.agent import root_agent
+    from SambuBot import APP_NAME, call_agent
+
+    class StubLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream: bool = False):
+            last = llm_request.contents[-1] if llm_request.contents else None
+            answered = last is not None and any(
+                part.function_response for part in last.parts or []
+            )
+            if answered:
+                part = types.Part(text=f"Market {market_id} price fetched.")
+            else:
+                part = types.Part(
+                    function_call=types.FunctionCall(
+                        name="getMarketPrice", args={"market_id": market_id}
+                    )
+                )
+            yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    agent = root_agent.clone(update={"model": StubLlm(model="stub")})
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+
+    async def callAgent(query: str) -> str:
+        session = await session_service.create_session(app_name=APP_NAME, user_id="bench")
+        return await call_agent(runner, "bench", session.id, query)
+
+    return ("call_agent (stub model)", callAgent, {"query": f"price of market {market_id}"})
+
+
+def buildCases(args) -> list:
+    from aptos_sdk.account import Account
+
+    account = Account.generate()
+    private_key = account.private_key.hex()
+    wallet = str(account.address())
+
+    from SambuAgent.telemetry import instrument
+
+    # Instrument like agent.py does so stage spans are attributed to each tool.
+    cases = [
+        (name, instrument(func), kwargs)
+        for name, func, kwargs in toolCases(private_key, wallet, args.market_id)
+    ]
+    if not args.skip_agent:
+        cases.append(stubbedAgentCase(args.market_id))
+    if args.tools:
+        wanted = set(args.tools.split(","))
+        cases = [case for case in cases if case[0].split(" ")[0] in wanted]
+    return cases
+
+
+async def runBenchmarks(args, cases: list) -> list[dict]:
+    report = []
+    for name, func, kwargs in cases:
+        row = {"Tool": name}
+        row.update(await measureLatency(func, kwargs, args.iterations, args.concurrency))
+        if args.alloc_iterations:
+            row.update(await measureAllocations(func, kwargs, args.alloc_iterations))
+        report.append(row)
+        print(f"  {name}: p50={row['p50 (ms)']}ms errors={row['Errors']}", file=sys.stderr)
+    return report
+
+
+def printTable(report: list[dict]) -> None:
+    if not report:
+        return
+    columns = list(report[0])
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in report)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in report:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark SambuTools against local stand-ins.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--alloc-iterations", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--confirm-delay", type=float, default=0.0)
+    parser.add_argument("--market-id", type=int, default=66)
+    parser.add_argument("--tools", help="Comma separated tool names to run.")
+    parser.add_argument("--skip-agent", action="store_true")
+    parser.add_argument("--json", help="Write the report to this file as JSON.")
+    parser.add_argument(
+        "--stages", action="store_true", help="Also print per-stage telemetry spans."
+    )
+    args = parser.parse_args()
+
+    server_options = {
+        "latency": args.latency_ms / 1000,
+        "jitter": args.jitter_ms / 1000,
+        "error_rate": args.error_rate,
+    }
+    with MockKanaServer(**server_options) as kana, FakeAptosNode(
+        confirm_delay=args.confirm_delay, **server_options
+    ) as node:
+        # Tool modules read these at import or call time, so set them first.
+        os.environ.update(
+            {
+                "KANA_BASE_URL": kana.url,
+                "KANA_API_KEY": "benchmark",
+                "APTOS_BASE_URL": f"{node.url}/v1",
+                "APTOS_NODE_URL": f"{node.url}/v1",
+                "APTOS_FAUCET_URL": node.url,
+                "WALLET_ADDRESS": "0x" + "ab" * 32,
+                "SAMBUBOT_TOKEN": "benchmark",
+            }
+        )
+        # Tools and call_agent print as they run; keep stdout for the report.
+        with contextlib.redirect_stdout(sys.stderr):
+            report = asyncio.run(runBenchmarks(args, buildCases(args)))
+
+    printTable(report)
+    if args.stages:
+        from SambuAgent.telemetry import telemetry
+
+        print()
+        printTable(
+            [{"Span": name, **values} for name, values in telemetry.summary().items()]
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()